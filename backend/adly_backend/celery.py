@@ -0,0 +1,22 @@
+"""
+Celery application for adly_backend.
+
+Workers are started per queue so each generation type scales independently:
+
+    celery -A adly_backend worker -Q generation.text
+    celery -A adly_backend worker -Q generation.image
+    celery -A adly_backend worker -Q generation.video
+    celery -A adly_backend worker -Q generation.media
+    celery -A adly_backend worker -Q crawling
+    celery -A adly_backend worker -Q publishing
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "adly_backend.settings")
+
+app = Celery("adly_backend")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
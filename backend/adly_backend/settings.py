@@ -149,6 +149,28 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Storage backends; generated media is copied from providers into `generated_media`
+# (filesystem by default, S3/MinIO with GENERATED_MEDIA_STORAGE=s3)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "generated_media": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {"location": MEDIA_ROOT, "base_url": MEDIA_URL},
+    },
+}
+if config('GENERATED_MEDIA_STORAGE', default='filesystem') == 's3':
+    STORAGES["generated_media"] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": config('AWS_STORAGE_BUCKET_NAME', default='adly-media-assets'),
+            "endpoint_url": config('AWS_S3_ENDPOINT_URL', default=None),  # MinIO / S3-compatible
+            "region_name": config('AWS_S3_REGION_NAME', default=None),
+            "custom_domain": config('AWS_S3_CUSTOM_DOMAIN', default=None),
+            "file_overwrite": False,
+        },
+    }
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -217,13 +239,58 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_ROUTES = {
+    'content_creation.run_text_generation': {'queue': 'generation.text'},
+    'content_creation.run_image_generation': {'queue': 'generation.image'},
+    'content_creation.run_video_generation': {'queue': 'generation.video'},
+    'content_creation.poll_video_renders': {'queue': 'generation.video'},
+    'content_creation.ingest_asset_media': {'queue': 'generation.media'},
+    'content_creation.generate_asset_renditions': {'queue': 'generation.media'},
+    'content_creation.encode_asset_variants': {'queue': 'generation.media'},
+    'content_creation.crawl_products': {'queue': 'crawling'},
+    'ad_platforms.upload_meta_video': {'queue': 'publishing'},
+    'ad_platforms.resume_meta_uploads': {'queue': 'publishing'},
+    'ad_platforms.refresh_meta_pages': {'queue': 'publishing'},
+    'ad_platforms.refresh_expiring_tokens': {'queue': 'publishing'},
+    'ad_platforms.refresh_provider_tokens': {'queue': 'publishing'},
+}
+CELERY_BEAT_SCHEDULE = {
+    'poll-video-renders': {
+        'task': 'content_creation.poll_video_renders',
+        'schedule': 15.0,  # seconds; each job's own next_poll_at decides whether it is checked
+    },
+    'resume-meta-uploads': {
+        'task': 'ad_platforms.resume_meta_uploads',
+        'schedule': 60.0,
+    },
+    'refresh-expiring-tokens': {
+        'task': 'ad_platforms.refresh_expiring_tokens',
+        'schedule': 300.0,  # each account's jittered token_refresh_at decides whether it is refreshed
+    },
+}
+# Run tasks inline instead of sending them to the broker (tests / local R&D without Redis)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = False
 
 # Content Creation API Keys
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 HEYGEN_API_KEY = config('HEYGEN_API_KEY', default='')
+HEYGEN_WEBHOOK_SECRET = config('HEYGEN_WEBHOOK_SECRET', default='')
 STABILITY_API_KEY = config('STABILITY_API_KEY', default='')
 ELEVENLABS_API_KEY = config('ELEVENLABS_API_KEY', default='')
 
+# Shared HTTP connection pool used by content providers
+PROVIDER_HTTP = {
+    'POOL_CONNECTIONS': 10,  # distinct provider hosts kept alive
+    'POOL_MAXSIZE': config('PROVIDER_HTTP_POOL_MAXSIZE', default=32, cast=int),  # connections per host
+    'CONNECT_TIMEOUT': 5,  # seconds
+    'READ_TIMEOUT': config('PROVIDER_HTTP_READ_TIMEOUT', default=60, cast=int),  # seconds
+    'MAX_RETRIES': 2,  # idempotent requests only
+}
+
 # File Upload Configuration
 FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
@@ -236,6 +303,98 @@ CONTENT_GENERATION = {
     'SUPPORTED_IMAGE_FORMATS': ['jpg', 'jpeg', 'png', 'webp'],
     'DEFAULT_LANGUAGE': 'ar',
     'ENABLE_CULTURAL_CONTEXT': True,
+    'RESULT_CACHE_ENABLED': config('GENERATION_RESULT_CACHE_ENABLED', default=True, cast=bool),
+    'RESULT_CACHE_TTL': config('GENERATION_RESULT_CACHE_TTL', default=86400, cast=int),  # seconds
+    'RESULT_CACHE_LOCAL_MAX_ENTRIES': 1024,
+    'RESULT_CACHE_MAX_ENTRY_BYTES': 256 * 1024,
+    # Max concurrent calls per provider when fanning out variations
+    'PROVIDER_CONCURRENCY': {
+        'default': 4,
+        'openai': 8,
+        'huggingface': 4,
+        'stability': 4,
+        'heygen': 5,
+    },
+    # Text provider failover: rolling health window shared through Redis
+    'PROVIDER_ROUTING': {
+        # Failover order; 'openai' still returns placeholder copy, so it is not a backup yet
+        'TEXT_PROVIDERS': ['huggingface'],
+        'WINDOW': 50,  # samples kept per provider
+        'MIN_SAMPLES': 5,
+        'ERROR_RATE_THRESHOLD': 0.5,  # opens the circuit
+        'OPEN_SECONDS': 60,
+        'LATENCY_BUDGET_MS': 10000,  # p95 above this deprioritises the provider
+    },
+    # Provider-side video renders: per-job adaptive polling (webhooks are the fast path)
+    'VIDEO_POLLING': {
+        'BATCH_SIZE': 200,  # renders checked per batch, concurrently
+        'MAX_BATCHES_PER_RUN': 10,
+        'RENDER_SECONDS_PER_VIDEO_SECOND': 2,  # first check after the expected render time
+        'MIN_DELAY_SECONDS': 10,
+        'MAX_DELAY_SECONDS': 300,
+        'LEASE_SECONDS': 120,  # claimed jobs are not re-checked by an overlapping run
+        'MAX_RENDER_SECONDS': 3600,
+    },
+    # Catalog text generation: jobs packed into one structured request
+    'TEXT_BATCH': {
+        'ITEMS_PER_REQUEST': 25,
+        'MAX_ATTEMPTS': 3,  # items with unusable output are retried in a smaller request
+    },
+    # Provider media copied into STORAGES[STORAGE] after a job completes
+    'MEDIA_INGEST': {
+        'ENABLED': config('MEDIA_INGEST_ENABLED', default=True, cast=bool),
+        'STORAGE': 'generated_media',
+        'PREFIX': 'generated',
+        'CHUNK_SIZE': 1024 * 1024,  # bytes held in memory per file while copying
+        'MAX_BYTES': 2 * 1024 * 1024 * 1024,
+    },
+    # Library previews built after ingestion (videos need ffmpeg on the media workers)
+    'RENDITIONS': {
+        'ENABLED': config('RENDITIONS_ENABLED', default=True, cast=bool),
+        'THUMBNAIL_WIDTHS': [256, 640],
+        'WEBP_QUALITY': 80,
+        'POSTER_OFFSET_SECONDS': 1,
+        'PREVIEW_SECONDS': 6,
+        'PREVIEW_WIDTH': 480,
+        'PREVIEW_BITRATE': '400k',
+        'FFMPEG_BINARY': config('FFMPEG_BINARY', default='ffmpeg'),
+        'FFMPEG_TIMEOUT_SECONDS': 120,
+    },
+    # Platform-spec variants encoded before publishing (0 workers encodes inline)
+    'TRANSCODING': {
+        'WORKERS': config('TRANSCODE_WORKERS', default=2, cast=int),
+        'FFMPEG_BINARY': config('FFMPEG_BINARY', default='ffmpeg'),
+        'FFPROBE_BINARY': config('FFPROBE_BINARY', default='ffprobe'),
+        'FFMPEG_TIMEOUT_SECONDS': 600,
+    },
+    # Bulk product analysis: concurrent crawl of product URLs on the crawling queue
+    'PRODUCT_CRAWL': {
+        'MAX_URLS': 10000,  # per bulk request or store catalog sync
+        'CATALOG_PAGE_SIZE': 250,  # products per Shopify products.json request (its maximum)
+        'GLOBAL_CONCURRENCY': config('PRODUCT_CRAWL_CONCURRENCY', default=32, cast=int),
+        'PER_DOMAIN_CONCURRENCY': 4,
+        'DOMAIN_DELAY_SECONDS': 0.25,  # politeness gap between requests to one domain
+        'TIMEOUT_SECONDS': 15,
+        'MAX_ATTEMPTS': 3,  # timeouts, connection errors, 429 and 5xx are retried
+        'RETRY_BACKOFF_SECONDS': 1,  # doubled per attempt, Retry-After wins when larger
+        'BATCH_SIZE': 100,  # analyses written per bulk upsert
+        'USER_AGENT': 'Mozilla/5.0 (compatible; AdlyProductBot/1.0)',
+    },
+    # Product analyses younger than this are not revalidated on a refresh
+    'PRODUCT_REFRESH_MAX_AGE_SECONDS': 3600,
+    # Idle interval before a keep-alive comment on the job events stream
+    'JOB_EVENTS_HEARTBEAT_SECONDS': 15,
+    # Token buckets shared by all workers through Redis (rate in calls/second)
+    'RATE_LIMITS': {
+        'PROVIDERS': {
+            'openai': {'rate': 8, 'burst': 16},
+            'huggingface': {'rate': 4, 'burst': 8},
+            'stability': {'rate': 2, 'burst': 8},
+            'heygen': {'rate': 1, 'burst': 5},
+        },
+        'WORKSPACE_SHARE': 0.5,  # max fraction of a provider's rate one workspace may use
+        'MAX_WAIT_SECONDS': 30,  # longer waits requeue the job instead of blocking the worker
+    },
 }
 
 # Frontend URL
@@ -252,6 +411,40 @@ SNAPCHAT_REDIRECT_BASE_URL = config('SNAPCHAT_REDIRECT_BASE_URL', default='http:
 META_APP_ID = config('META_APP_ID', default='')
 META_APP_SECRET = config('META_APP_SECRET', default='')
 META_REDIRECT_BASE_URL = config('META_REDIRECT_BASE_URL', default='http://localhost:8000/api/v1/ad-accounts/oauth/meta/callback/')
+META_GRAPH_URL = config('META_GRAPH_URL', default='https://graph.facebook.com/v20.0')
+# Chunked video uploads to Meta, run on the publishing queue
+META_VIDEO_UPLOAD = {
+    'GRAPH_VIDEO_URL': config('META_GRAPH_VIDEO_URL', default='https://graph-video.facebook.com/v20.0'),
+    'STORAGE': 'generated_media',  # where posted files are staged for the background upload
+    'CHUNK_TIMEOUT_SECONDS': 120,
+    'CHUNK_MAX_ATTEMPTS': 4,  # per chunk, within one task run
+    'RETRY_BACKOFF_SECONDS': 2,  # doubled per chunk attempt
+    'TASK_MAX_RETRIES': 10,  # task runs after transient failures before the upload is failed
+    'LEASE_SECONDS': 300,
+    'STALLED_AFTER_SECONDS': 600,  # idle active uploads re-queued by the resume sweep
+}
+# Cached page inventory behind the page picker, served stale while a refresh runs
+META_PAGES = {
+    'TTL_SECONDS': config('META_PAGES_TTL_SECONDS', default=900, cast=int),
+    'PAGE_SIZE': 100,  # pages per /me/accounts request, cursors are followed to the end
+    'TIMEOUT_SECONDS': 15,
+    'LEASE_SECONDS': 300,
+}
+
+# Ad account access tokens refreshed in the background ahead of expiry
+TOKEN_REFRESH = {
+    'LEAD_SECONDS': config('TOKEN_REFRESH_LEAD_SECONDS', default=1800, cast=int),  # refresh this long before expiry
+    'JITTER': 0.25,  # extra random fraction of the lead, spreads refreshes out
+    'BATCH_SIZE': 200,  # due accounts taken per provider each sweep
+    'PROVIDER_CONCURRENCY': {'meta': 4, 'snapchat': 2, 'youtube': 4, 'linkedin': 2},
+    'DEFAULT_CONCURRENCY': 2,
+    'DEFAULT_EXPIRES_IN': 3600,  # when a provider omits expires_in
+    'TIMEOUT_SECONDS': 15,
+    'LEASE_SECONDS': 300,
+    'RETRY_BASE_SECONDS': 60,  # doubled per consecutive transient failure
+    'RETRY_MAX_SECONDS': 1800,
+    'MAX_FAILURES': 5,  # transient failures tolerated once the token has expired
+}
 LINKEDIN_CLIENT_ID = config('LINKEDIN_CLIENT_ID', default='')
 LINKEDIN_CLIENT_SECRET = config('LINKEDIN_CLIENT_SECRET', default='')
 LINKEDIN_REDIRECT_BASE_URL = config('LINKEDIN_REDIRECT_BASE_URL', default='http://localhost:8000/api/v1/ad-accounts/oauth/linkedin/callback/')
@@ -21,6 +21,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 from apps.ad_platforms.v1.views.oauth import twitter_callback, snapchat_callback, meta_callback, linkedin_callback, youtube_callback
+from apps.content_creation.v1.views.webhooks import heygen_webhook
 
 def health_check(request):
     return JsonResponse({'status': 'healthy', 'message': 'ADLY API is running'})
@@ -36,6 +37,7 @@ urlpatterns = [
     path("api/v1/ad-accounts/oauth/meta/callback/", meta_callback, name="meta_oauth_callback"),
     path("api/v1/ad-accounts/oauth/linkedin/callback/", linkedin_callback, name="linkedin_oauth_callback"),
     path("api/v1/ad-accounts/oauth/youtube/callback/", youtube_callback, name="youtube_oauth_callback"),
+    path("api/v1/content/webhooks/heygen/", heygen_webhook, name="heygen_webhook"),
     path("o/", include("oauth2_provider.urls", namespace="oauth2_provider")),
     path("health/", health_check, name="health_check"),
 ]
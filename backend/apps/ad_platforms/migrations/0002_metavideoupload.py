@@ -0,0 +1,115 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("workspaces", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("ad_platforms", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="adaccount",
+            name="provider",
+            field=models.CharField(
+                choices=[
+                    ("twitter", "Twitter"),
+                    ("snapchat", "Snapchat"),
+                    ("meta", "Meta"),
+                    ("linkedin", "LinkedIn"),
+                    ("youtube", "YouTube"),
+                    ("tiktok", "TikTok"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.CreateModel(
+            name="MetaVideoUpload",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("source_name", models.CharField(max_length=1024)),
+                ("delete_source", models.BooleanField(default=False)),
+                ("file_size", models.BigIntegerField()),
+                (
+                    "upload_session_id",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("video_id", models.CharField(blank=True, default="", max_length=255)),
+                ("start_offset", models.BigIntegerField(default=0)),
+                ("end_offset", models.BigIntegerField(default=0)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("transferring", "Transferring"),
+                            ("finishing", "Finishing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("creative", models.JSONField(blank=True, default=dict)),
+                (
+                    "creative_id",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("error_message", models.TextField(blank=True, null=True)),
+                ("locked_until", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="video_uploads",
+                        to="ad_platforms.adaccount",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="meta_video_uploads",
+                        to="workspaces.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "meta_video_uploads",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "updated_at"], name="meta_upload_status_idx"
+                    )
+                ],
+            },
+        ),
+    ]
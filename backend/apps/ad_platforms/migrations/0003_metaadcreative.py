@@ -0,0 +1,117 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("content_creation", "0006_assetvariant"),
+        ("workspaces", "0001_initial"),
+        ("ad_platforms", "0002_metavideoupload"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MetaAdCreative",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("image", "Image"), ("video", "Video")],
+                        default="image",
+                        max_length=10,
+                    ),
+                ),
+                ("name", models.CharField(blank=True, default="", max_length=255)),
+                ("page_id", models.CharField(max_length=255)),
+                ("message", models.TextField(blank=True, default="")),
+                ("link_url", models.URLField(blank=True, default="", max_length=2048)),
+                (
+                    "image_hash",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                (
+                    "creative_id",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("created", "Created"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                ("error_message", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ad_creatives",
+                        to="ad_platforms.adaccount",
+                    ),
+                ),
+                (
+                    "asset",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="meta_ad_creatives",
+                        to="content_creation.contentasset",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "video_upload",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ad_creatives",
+                        to="ad_platforms.metavideoupload",
+                    ),
+                ),
+                (
+                    "workspace",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="meta_ad_creatives",
+                        to="workspaces.workspace",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "meta_ad_creatives",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
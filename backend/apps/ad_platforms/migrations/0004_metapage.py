@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ad_platforms", "0003_metaadcreative"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adaccount",
+            name="pages_refresh_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adaccount",
+            name="pages_synced_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="MetaPage",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("page_id", models.CharField(max_length=255)),
+                ("name", models.CharField(blank=True, default="", max_length=255)),
+                ("category", models.CharField(blank=True, default="", max_length=255)),
+                ("synced_at", models.DateTimeField()),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="meta_pages",
+                        to="ad_platforms.adaccount",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "meta_pages",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="metapage",
+            constraint=models.UniqueConstraint(
+                fields=("account", "page_id"), name="unique_meta_page_per_account"
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ad_platforms", "0004_metapage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adaccount",
+            name="token_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adaccount",
+            name="token_refresh_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adaccount",
+            name="token_refresh_failures",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="adaccount",
+            name="token_refresh_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="adaccount",
+            name="token_refreshed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
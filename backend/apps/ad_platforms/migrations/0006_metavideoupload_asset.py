@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0006_assetvariant"),
+        ("ad_platforms", "0005_adaccount_token_expiry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="metavideoupload",
+            name="asset",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="meta_video_uploads",
+                to="content_creation.contentasset",
+            ),
+        ),
+        migrations.AddField(
+            model_name="metavideoupload",
+            name="variant_spec",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AlterField(
+            model_name="metavideoupload",
+            name="file_size",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="metavideoupload",
+            name="source_name",
+            field=models.CharField(blank=True, default="", max_length=1024),
+        ),
+    ]
@@ -31,6 +31,15 @@ class AdAccount(models.Model):
     scopes = models.JSONField(default=list, blank=True)
     metadata = models.JSONField(default=dict, blank=True)
     status = models.CharField(max_length=50, choices=STATUSES, default="connected")
+    # Meta page inventory cache: last full sync, and the lease of a running refresh
+    pages_synced_at = models.DateTimeField(null=True, blank=True)
+    pages_refresh_until = models.DateTimeField(null=True, blank=True)
+    # Access token lifetime and the background refresh scheduled ahead of it
+    token_expires_at = models.DateTimeField(null=True, blank=True)
+    token_refresh_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    token_refreshed_at = models.DateTimeField(null=True, blank=True)
+    token_refresh_failures = models.PositiveSmallIntegerField(default=0)
+    token_refresh_until = models.DateTimeField(null=True, blank=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -41,3 +50,116 @@ class AdAccount(models.Model):
 
     def __str__(self):
         return f"{self.workspace_id} - {self.provider} - {self.external_account_id or self.account_name or self.id}"
+
+
+class MetaVideoUpload(models.Model):
+    """Resumable chunked upload of a video to a Meta ad account.
+
+    Offsets are persisted after every chunk so a restarted worker continues
+    from the last acknowledged byte instead of starting over.
+    """
+
+    STATUSES = [
+        ("pending", "Pending"),
+        ("transferring", "Transferring"),
+        ("finishing", "Finishing"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+    ACTIVE_STATUSES = ("pending", "transferring", "finishing")
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="meta_video_uploads")
+    account = models.ForeignKey(AdAccount, on_delete=models.CASCADE, related_name="video_uploads")
+    # File in the generated media storage; staged copies of posted files are deleted when done
+    source_name = models.CharField(max_length=1024, blank=True, default="")
+    delete_source = models.BooleanField(default=False)
+    file_size = models.BigIntegerField(default=0)
+    # Library asset encoded to variant_spec by the upload task; source_name is set once encoded
+    asset = models.ForeignKey(
+        "content_creation.ContentAsset", on_delete=models.SET_NULL, null=True, blank=True, related_name="meta_video_uploads"
+    )
+    variant_spec = models.CharField(max_length=64, blank=True, default="")
+    upload_session_id = models.CharField(max_length=255, blank=True, default="")
+    video_id = models.CharField(max_length=255, blank=True, default="")
+    start_offset = models.BigIntegerField(default=0)
+    end_offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUSES, default="pending")
+    # Ad creative created once the video is uploaded: page_id, message, name
+    creative = models.JSONField(default=dict, blank=True)
+    creative_id = models.CharField(max_length=255, blank=True, default="")
+    error_message = models.TextField(blank=True, null=True)
+    # Lease held by the worker currently transferring
+    locked_until = models.DateTimeField(blank=True, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = "meta_video_uploads"
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "updated_at"], name="meta_upload_status_idx")]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.video_id or self.id} ({self.status})"
+
+
+class MetaAdCreative(models.Model):
+    """Ad creative published to a Meta ad account, with its per-item outcome"""
+
+    STATUSES = [
+        ("pending", "Pending"),
+        ("created", "Created"),
+        ("failed", "Failed"),
+    ]
+    KINDS = [
+        ("image", "Image"),
+        ("video", "Video"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name="meta_ad_creatives")
+    account = models.ForeignKey(AdAccount, on_delete=models.CASCADE, related_name="ad_creatives")
+    asset = models.ForeignKey("content_creation.ContentAsset", on_delete=models.SET_NULL, null=True, blank=True, related_name="meta_ad_creatives")
+    video_upload = models.ForeignKey(MetaVideoUpload, on_delete=models.SET_NULL, null=True, blank=True, related_name="ad_creatives")
+    kind = models.CharField(max_length=10, choices=KINDS, default="image")
+    name = models.CharField(max_length=255, blank=True, default="")
+    page_id = models.CharField(max_length=255)
+    message = models.TextField(blank=True, default="")
+    link_url = models.URLField(max_length=2048, blank=True, default="")
+    image_hash = models.CharField(max_length=255, blank=True, default="")
+    creative_id = models.CharField(max_length=255, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUSES, default="pending")
+    error_message = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "meta_ad_creatives"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.creative_id or self.id} ({self.status})"
+
+
+class MetaPage(models.Model):
+    """Facebook page the token of a Meta ad account can publish as, cached from /me/accounts"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.ForeignKey(AdAccount, on_delete=models.CASCADE, related_name="meta_pages")
+    page_id = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, blank=True, default="")
+    category = models.CharField(max_length=255, blank=True, default="")
+    synced_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "meta_pages"
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(fields=["account", "page_id"], name="unique_meta_page_per_account"),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.name or self.page_id}"
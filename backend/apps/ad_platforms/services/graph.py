@@ -0,0 +1,169 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+import requests
+from django.conf import settings
+from apps.content_creation.services.providers.http_client import get_provider_session
+
+# Graph error codes worth retrying: unknown, service, and throttling errors
+TRANSIENT_ERROR_CODES = {1, 2, 4, 17, 32, 341, 613}
+
+# Operations per call to the batch endpoint
+MAX_BATCH_SIZE = 50
+
+
+class GraphError(Exception):
+    def __init__(self, message, status=None, code=None, subcode=None, transient=False):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.subcode = subcode
+        self.transient = transient
+
+    @classmethod
+    def from_response(cls, status: int, body: Any) -> "GraphError":
+        detail = body.get("error") if isinstance(body, dict) else None
+        detail = detail if isinstance(detail, dict) else {}
+        return cls(
+            detail.get("error_user_msg") or detail.get("message") or f"Graph request failed ({status}): {body}",
+            status=status,
+            code=detail.get("code"),
+            subcode=detail.get("error_subcode"),
+            transient=status >= 500 or bool(detail.get("is_transient")) or detail.get("code") in TRANSIENT_ERROR_CODES,
+        )
+
+
+@dataclass
+class GraphRequest:
+    """One operation of a batch call.
+
+    Named operations can be referenced by later ones in the same batch with
+    `GraphClient.ref(name, jsonpath)`; set `depends_on` so both are always
+    sent together.
+    """
+
+    method: str
+    relative_url: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    name: Optional[str] = None
+    depends_on: Optional[str] = None
+    # Attached uploads by label: (filename, file object, content type)
+    files: Dict[str, Tuple[str, BinaryIO, str]] = field(default_factory=dict)
+
+
+class GraphClient:
+    """Meta Graph API client for single calls and the batch endpoint"""
+
+    def __init__(self, access_token: Optional[str], base_url: Optional[str] = None, session=None, timeout: int = 30):
+        self.access_token = access_token
+        self.base_url = base_url or settings.META_GRAPH_URL
+        self.session = session or get_provider_session()
+        self.timeout = timeout
+
+    @staticmethod
+    def ref(name: str, path: str) -> str:
+        """Placeholder Meta replaces with a value from an earlier operation's response"""
+        return f"{{result={name}:{path}}}"
+
+    def get(self, path: str, **params) -> Dict[str, Any]:
+        return self._call("GET", path, params=params)
+
+    def post(self, path: str, data: Optional[Dict[str, Any]] = None, files=None) -> Dict[str, Any]:
+        return self._call("POST", path, data=data or {}, files=files)
+
+    def batch(self, operations: List[GraphRequest]) -> List[Union[Dict[str, Any], GraphError]]:
+        """Run operations in as few batch calls as possible.
+
+        Results line up with `operations`: the decoded response body, or a
+        GraphError for that operation alone (including dependents that did not
+        run because what they referenced failed). A batch call that fails
+        becomes that GraphError for each operation it carried; results of the
+        calls already made are kept, since Meta has applied them.
+        """
+        results: List[Union[Dict[str, Any], GraphError]] = [None] * len(operations)
+        for chunk in self._chunks(operations):
+            payload, files = [], {}
+            for index in chunk:
+                operation = operations[index]
+                entry = {"method": operation.method, "relative_url": operation.relative_url}
+                if operation.params:
+                    encoded = urlencode({key: self._encode(value) for key, value in operation.params.items()})
+                    if operation.method == "GET":
+                        entry["relative_url"] += ("&" if "?" in entry["relative_url"] else "?") + encoded
+                    else:
+                        entry["body"] = encoded
+                if operation.name:
+                    entry["name"] = operation.name
+                    # Named responses are dropped by default; we map every result back
+                    entry["omit_response_on_success"] = False
+                if operation.files:
+                    attached = []
+                    for upload in operation.files.values():
+                        key = f"file{len(files)}"
+                        files[key] = upload
+                        attached.append(key)
+                    entry["attached_files"] = ",".join(attached)
+                payload.append(entry)
+
+            try:
+                responses = self._call("POST", "", data={"batch": json.dumps(payload), "include_headers": "false"}, files=files or None)
+            except GraphError as e:
+                for index in chunk:
+                    results[index] = e
+                continue
+            for index, response in zip(chunk, responses):
+                results[index] = self._result(response)
+        return results
+
+    def _chunks(self, operations: List[GraphRequest]) -> List[List[int]]:
+        """Group operations with their dependencies, then pack groups into batches"""
+        groups: List[List[int]] = []
+        group_of: Dict[str, int] = {}
+        for index, operation in enumerate(operations):
+            if operation.depends_on in group_of:
+                group = group_of[operation.depends_on]
+                groups[group].append(index)
+            else:
+                group = len(groups)
+                groups.append([index])
+            if operation.name:
+                group_of[operation.name] = group
+
+        chunks: List[List[int]] = []
+        for group in groups:
+            if chunks and len(chunks[-1]) + len(group) <= MAX_BATCH_SIZE:
+                chunks[-1].extend(group)
+            else:
+                chunks.append(list(group))
+        return chunks
+
+    def _result(self, response: Optional[Dict[str, Any]]) -> Union[Dict[str, Any], GraphError]:
+        if response is None:
+            return GraphError("Not run: an operation it depends on failed")
+        try:
+            body = json.loads(response.get("body") or "{}")
+        except ValueError:
+            body = {"error": {"message": response.get("body")}}
+        if response.get("code") != 200:
+            return GraphError.from_response(response.get("code") or 500, body)
+        return body
+
+    def _call(self, method: str, path: str, params=None, data=None, files=None) -> Any:
+        url = f"{self.base_url}/{path}" if path else f"{self.base_url}/"
+        auth = {"access_token": self.access_token} if self.access_token else {}
+        try:
+            if method == "GET":
+                response = self.session.get(url, params={**params, **auth}, timeout=self.timeout)
+            else:
+                response = self.session.post(url, data={**data, **auth}, files=files, timeout=self.timeout)
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise GraphError(f"Graph request failed: {e}", transient=True)
+        if response.status_code != 200 or (isinstance(body, dict) and "error" in body):
+            raise GraphError.from_response(response.status_code, body)
+        return body
+
+    @staticmethod
+    def _encode(value: Any) -> str:
+        return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
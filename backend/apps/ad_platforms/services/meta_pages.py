@@ -0,0 +1,74 @@
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.ad_platforms.models import AdAccount, MetaPage
+from apps.ad_platforms.services.graph import GraphClient
+
+
+def page_settings() -> Dict[str, Any]:
+    return getattr(settings, "META_PAGES", {})
+
+
+def pages_are_stale(account: AdAccount) -> bool:
+    if account.pages_synced_at is None:
+        return True
+    return timezone.now() - account.pages_synced_at > timedelta(seconds=page_settings().get("TTL_SECONDS", 900))
+
+
+def claim_pages_refresh(account: AdAccount) -> bool:
+    """Take the refresh lease so one worker syncs an account at a time"""
+    now = timezone.now()
+    lease_end = now + timedelta(seconds=page_settings().get("LEASE_SECONDS", 300))
+    return bool(
+        AdAccount.objects.filter(pk=account.pk)
+        .filter(Q(pages_refresh_until__isnull=True) | Q(pages_refresh_until__lt=now))
+        .update(pages_refresh_until=lease_end)
+    )
+
+
+def release_pages_refresh(account: AdAccount):
+    AdAccount.objects.filter(pk=account.pk).update(pages_refresh_until=None)
+
+
+def sync_pages(account: AdAccount, client: Optional[GraphClient] = None) -> int:
+    """Fetch every page of /me/accounts, following cursors, and replace the cached inventory.
+
+    Raises GraphError without touching the cache if any page of results fails,
+    so a partial listing never replaces a complete one.
+    """
+    config = page_settings()
+    client = client or GraphClient(account.access_token, timeout=config.get("TIMEOUT_SECONDS", 15))
+    synced_at = timezone.now()
+
+    pages: Dict[str, MetaPage] = {}
+    params = {"fields": "id,name,category", "limit": config.get("PAGE_SIZE", 100)}
+    while True:
+        data = client.get("me/accounts", **params)
+        for entry in data.get("data") or []:
+            pages[entry["id"]] = MetaPage(
+                account=account,
+                page_id=entry["id"],
+                name=(entry.get("name") or "")[:255],
+                category=(entry.get("category") or "")[:255],
+                synced_at=synced_at,
+            )
+        after = ((data.get("paging") or {}).get("cursors") or {}).get("after")
+        if not (data.get("paging") or {}).get("next") or not after:
+            break
+        params["after"] = after
+
+    with transaction.atomic():
+        MetaPage.objects.bulk_create(
+            list(pages.values()),
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["account", "page_id"],
+            update_fields=["name", "category", "synced_at"],
+        )
+        MetaPage.objects.filter(account=account, synced_at__lt=synced_at).delete()
+        AdAccount.objects.filter(pk=account.pk).update(pages_synced_at=synced_at)
+    account.pages_synced_at = synced_at
+    return len(pages)
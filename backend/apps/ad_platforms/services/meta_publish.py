@@ -0,0 +1,158 @@
+import logging
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+from apps.ad_platforms.models import AdAccount, MetaAdCreative, MetaVideoUpload
+from apps.ad_platforms.services.graph import GraphClient, GraphError, GraphRequest
+from apps.ad_platforms.services.meta_upload import upload_storage
+from apps.ad_platforms.tasks import queue_meta_upload
+from apps.content_creation.services.transcoding import PLATFORM_SPECS, TranscodeError, Transcoder
+
+logger = logging.getLogger(__name__)
+
+
+class MetaPublisher:
+    """Publishes ad creatives to one Meta ad account.
+
+    Each image creative needs an adimages upload and an adcreatives call that
+    uses the returned hash; both go into Graph batch calls, the creative
+    referencing the image by JSONPath, so N creatives cost a few round-trips
+    instead of 2N. Outcomes are recorded per item on MetaAdCreative, and any
+    error preparing or sending an item fails that item's creative. Videos
+    are handed to the resumable upload task, which also encodes library
+    videos to the placement's spec and creates their creative.
+    """
+
+    def __init__(self, account: AdAccount, user=None, client: Optional[GraphClient] = None, transcoder: Optional[Transcoder] = None):
+        self.account = account
+        self.user = user
+        self.client = client or GraphClient(account.access_token)
+        self._transcoder = transcoder
+
+    @property
+    def transcoder(self) -> Transcoder:
+        if self._transcoder is None:
+            self._transcoder = Transcoder()
+        return self._transcoder
+
+    def publish(self, page_id: str, items: List[Dict[str, Any]], link_url: str = "", placement: str = "feed") -> List[MetaAdCreative]:
+        """Create one creative per item: {asset | media, creative_type, message, name}"""
+        creatives, images = [], []
+        for item in items:
+            asset = item.get("asset")
+            if asset is not None:
+                kind = "video" if asset.type == "video" else "image"
+            else:
+                kind = "video" if item.get("creative_type") == "video" else "image"
+            creative = MetaAdCreative.objects.create(
+                workspace_id=self.account.workspace_id,
+                account=self.account,
+                asset=asset,
+                kind=kind,
+                name=item.get("name") or "ADLY Creative",
+                page_id=page_id,
+                message=item.get("message") or "",
+                link_url=link_url or "",
+                created_by=self.user,
+            )
+            creatives.append(creative)
+            try:
+                if kind == "video":
+                    self._queue_video(creative, item, placement)
+                else:
+                    images.append((creative, self._image_media(item, placement)))
+            except TranscodeError as e:
+                self._fail(creative, str(e))
+            except Exception as e:
+                logger.exception("preparing meta creative %s failed", creative.id)
+                self._fail(creative, str(e) or e.__class__.__name__)
+
+        if images:
+            try:
+                self._publish_images(images)
+            finally:
+                for _, media in images:
+                    media[1].close()
+        return creatives
+
+    def _image_media(self, item: Dict[str, Any], placement: str):
+        if item.get("asset") is not None:
+            variant = self.transcoder.variant(item["asset"], f"meta_{placement}_image")
+            return os.path.basename(variant.storage_name), self.transcoder.open(variant), variant.mime_type
+        media = item.get("media")
+        if media is None:
+            raise TranscodeError("No media to upload")
+        return media.name, media, media.content_type or "application/octet-stream"
+
+    def _publish_images(self, images):
+        act_id = f"act_{self.account.external_account_id}"
+        operations = []
+        for index, (creative, media) in enumerate(images):
+            name = f"image{index}"
+            operations.append(GraphRequest("POST", f"{act_id}/adimages", name=name, files={"bytes": media}))
+            operations.append(GraphRequest("POST", f"{act_id}/adcreatives", depends_on=name, params={
+                "name": creative.name,
+                "object_story_spec": {
+                    "page_id": creative.page_id,
+                    "link_data": {
+                        "image_hash": GraphClient.ref(name, "$.images.*.hash"),
+                        "link": creative.link_url,
+                        "message": creative.message,
+                    },
+                },
+            }))
+
+        try:
+            results = self.client.batch(operations)
+        except Exception as e:
+            logger.exception("meta batch upload for account %s failed", self.account.id)
+            for creative, _ in images:
+                self._fail(creative, str(e) or e.__class__.__name__)
+            return
+
+        for index, (creative, _) in enumerate(images):
+            image_result, creative_result = results[2 * index], results[2 * index + 1]
+            if isinstance(image_result, GraphError):
+                self._fail(creative, f"Image upload failed: {image_result}")
+                continue
+            creative.image_hash = next(iter(image_result.get("images", {}).values()), {}).get("hash", "")
+            if isinstance(creative_result, GraphError):
+                self._fail(creative, f"Creative creation failed: {creative_result}")
+                continue
+            creative.creative_id = creative_result.get("id", "")
+            creative.status = "created"
+            creative.save(update_fields=["image_hash", "creative_id", "status", "updated_at"])
+
+    def _queue_video(self, creative: MetaAdCreative, item: Dict[str, Any], placement: str):
+        asset, variant_spec = item.get("asset"), ""
+        if asset is not None:
+            # Encoding can take minutes; the upload task does it before starting the upload
+            variant_spec = f"meta_{placement}_video"
+            if variant_spec not in PLATFORM_SPECS:
+                raise TranscodeError(f"Unknown platform spec '{variant_spec}'")
+            source_name, file_size, delete_source = "", 0, False
+        elif item.get("media") is not None:
+            media = item["media"]
+            source_name = upload_storage().save(f"uploads/meta/{uuid.uuid4()}/{media.name}", media)
+            file_size, delete_source = media.size, True
+        else:
+            raise TranscodeError("No media to upload")
+
+        creative.video_upload = MetaVideoUpload.objects.create(
+            workspace_id=self.account.workspace_id,
+            account=self.account,
+            asset=asset,
+            variant_spec=variant_spec,
+            source_name=source_name,
+            delete_source=delete_source,
+            file_size=file_size,
+            creative={"page_id": creative.page_id, "message": creative.message, "name": creative.name},
+            created_by=self.user,
+        )
+        creative.save(update_fields=["video_upload", "updated_at"])
+        queue_meta_upload(creative.video_upload)
+
+    def _fail(self, creative: MetaAdCreative, error: str):
+        creative.status = "failed"
+        creative.error_message = error
+        creative.save(update_fields=["image_hash", "status", "error_message", "updated_at"])
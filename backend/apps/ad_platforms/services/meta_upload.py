@@ -0,0 +1,218 @@
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+import requests
+from django.conf import settings
+from django.core.files.storage import storages
+from django.db.models import Q
+from django.utils import timezone
+from apps.ad_platforms.models import MetaAdCreative, MetaVideoUpload
+from apps.ad_platforms.services.graph import TRANSIENT_ERROR_CODES, GraphClient, GraphError
+from apps.content_creation.services.providers.http_client import get_provider_session
+from apps.content_creation.services.transcoding import TranscodeError, Transcoder
+
+logger = logging.getLogger(__name__)
+
+def upload_settings() -> Dict[str, Any]:
+    return getattr(settings, "META_VIDEO_UPLOAD", {})
+
+
+def upload_storage():
+    return storages[upload_settings().get("STORAGE", "generated_media")]
+
+
+class MetaUploadError(Exception):
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+
+class MetaVideoUploader:
+    """Client for the chunked /advideos upload (start, transfer, finish).
+
+    Meta dictates each chunk's byte range in the previous response, so chunks
+    go one after another; a failed chunk is retried on its own with backoff,
+    and the acknowledged offsets are saved after every chunk.
+    """
+
+    def __init__(self, session=None, storage=None, transcoder: Optional[Transcoder] = None):
+        self.config = upload_settings()
+        self.session = session or get_provider_session()
+        self.storage = storage or upload_storage()
+        self._transcoder = transcoder
+        self.timeout = self.config.get("CHUNK_TIMEOUT_SECONDS", 120)
+        self.max_attempts = self.config.get("CHUNK_MAX_ATTEMPTS", 4)
+        self.backoff = self.config.get("RETRY_BACKOFF_SECONDS", 2)
+
+    def run(self, upload: MetaVideoUpload) -> bool:
+        """Advance the upload as far as possible; returns False if another worker holds it.
+
+        Transient failures raise MetaUploadError(transient=True) with progress
+        saved; permanent ones mark the upload failed.
+        """
+        if upload.status not in MetaVideoUpload.ACTIVE_STATUSES or not self._claim(upload):
+            return False
+        try:
+            if upload.status == "pending":
+                if not upload.source_name:
+                    self._encode(upload)
+                self._start(upload)
+            if upload.status == "transferring":
+                self._transfer(upload)
+            if upload.status == "finishing":
+                self._finish(upload)
+        except MetaUploadError as e:
+            if not e.transient:
+                self.fail(upload, str(e))
+            raise
+        except (KeyError, ValueError) as e:
+            error = MetaUploadError(f"Unexpected Meta response: {e!r}")
+            self.fail(upload, str(error))
+            raise error
+        finally:
+            MetaVideoUpload.objects.filter(pk=upload.pk).update(locked_until=None)
+        return True
+
+    def fail(self, upload: MetaVideoUpload, error: str):
+        upload.status = "failed"
+        upload.error_message = error
+        upload.completed_at = timezone.now()
+        upload.save(update_fields=["status", "error_message", "completed_at", "updated_at"])
+        MetaAdCreative.objects.filter(video_upload=upload).update(status="failed", error_message=error, updated_at=upload.completed_at)
+        self._discard_source(upload)
+
+    def _claim(self, upload: MetaVideoUpload) -> bool:
+        now = timezone.now()
+        return bool(
+            MetaVideoUpload.objects.filter(pk=upload.pk)
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .update(locked_until=self._lease_end())
+        )
+
+    def _lease_end(self):
+        return timezone.now() + timedelta(seconds=self.config.get("LEASE_SECONDS", 300))
+
+    def _encode(self, upload: MetaVideoUpload):
+        """Encode the library asset to the placement's spec and upload that variant"""
+        if upload.asset_id is None:
+            raise MetaUploadError("The asset to upload no longer exists")
+        transcoder = self._transcoder or Transcoder()
+        # An encode may outlast the lease; hold the upload for the whole ffmpeg timeout
+        MetaVideoUpload.objects.filter(pk=upload.pk).update(
+            locked_until=self._lease_end() + timedelta(seconds=transcoder.timeout)
+        )
+        try:
+            variant = transcoder.variant(upload.asset, upload.variant_spec)
+        except TranscodeError as e:
+            raise MetaUploadError(f"Video encoding failed: {e}")
+        upload.source_name = variant.storage_name
+        upload.file_size = variant.size
+        upload.save(update_fields=["source_name", "file_size", "updated_at"])
+
+    def _start(self, upload: MetaVideoUpload):
+        data = self._post(upload, {"upload_phase": "start", "file_size": upload.file_size})
+        upload.upload_session_id = data["upload_session_id"]
+        upload.video_id = data.get("video_id", "")
+        upload.start_offset = int(data["start_offset"])
+        upload.end_offset = int(data["end_offset"])
+        upload.status = "transferring"
+        upload.save(update_fields=["upload_session_id", "video_id", "start_offset", "end_offset", "status", "updated_at"])
+
+    def _transfer(self, upload: MetaVideoUpload):
+        with self.storage.open(upload.source_name, "rb") as source:
+            while upload.start_offset < upload.end_offset:
+                source.seek(upload.start_offset)
+                chunk = source.read(upload.end_offset - upload.start_offset)
+                data = self._post(
+                    upload,
+                    {"upload_phase": "transfer", "upload_session_id": upload.upload_session_id, "start_offset": upload.start_offset},
+                    files={"video_file_chunk": ("chunk", chunk, "application/octet-stream")},
+                )
+                upload.start_offset = int(data["start_offset"])
+                upload.end_offset = int(data["end_offset"])
+                upload.locked_until = self._lease_end()
+                upload.save(update_fields=["start_offset", "end_offset", "locked_until", "updated_at"])
+
+        upload.status = "finishing"
+        upload.save(update_fields=["status", "updated_at"])
+
+    def _finish(self, upload: MetaVideoUpload):
+        data = self._post(upload, {
+            "upload_phase": "finish",
+            "upload_session_id": upload.upload_session_id,
+            "title": upload.creative.get("name") or "ADLY Video",
+        })
+        if not data.get("success", True):
+            raise MetaUploadError(f"Meta did not accept the upload: {data}")
+
+        if upload.creative.get("page_id") and not upload.creative_id:
+            upload.creative_id = self._create_creative(upload)
+        upload.status = "completed"
+        upload.completed_at = timezone.now()
+        upload.save(update_fields=["creative_id", "status", "completed_at", "updated_at"])
+        if upload.creative_id:
+            MetaAdCreative.objects.filter(video_upload=upload).update(
+                creative_id=upload.creative_id, status="created", updated_at=upload.completed_at
+            )
+        self._discard_source(upload)
+
+    def _create_creative(self, upload: MetaVideoUpload) -> str:
+        object_story_spec = {
+            "page_id": upload.creative["page_id"],
+            "video_data": {"video_id": upload.video_id, "message": upload.creative.get("message") or ""},
+        }
+        client = GraphClient(upload.account.access_token, session=self.session, timeout=self.timeout)
+        try:
+            data = client.post(f"act_{upload.account.external_account_id}/adcreatives", {
+                "object_story_spec": json.dumps(object_story_spec),
+                "name": upload.creative.get("name") or "ADLY Creative",
+            })
+        except GraphError as e:
+            raise MetaUploadError(f"Meta adcreatives failed: {e}", transient=e.transient)
+        return data.get("id", "")
+
+    def _post(self, upload: MetaVideoUpload, data: Dict[str, Any], files=None) -> Dict[str, Any]:
+        """POST an upload phase to /advideos, retrying transient errors with backoff"""
+        url = f"{self.config.get('GRAPH_VIDEO_URL')}/act_{upload.account.external_account_id}/advideos"
+        data = {**data, "access_token": upload.account.access_token}
+
+        error: Optional[MetaUploadError] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(min(30, self.backoff * 2 ** (attempt - 1)))
+            try:
+                response = self.session.post(url, data=data, files=files, timeout=self.timeout)
+                body = response.json()
+            except (requests.RequestException, ValueError) as e:
+                error = MetaUploadError(f"Meta request failed: {e}", transient=True)
+                continue
+            if response.status_code == 200 and "error" not in body:
+                return body
+
+            detail = body.get("error") or {}
+            error = MetaUploadError(
+                f"Meta {data['upload_phase']} failed ({response.status_code}): {detail.get('message') or body}",
+                transient=response.status_code >= 500 or bool(detail.get("is_transient")) or detail.get("code") in TRANSIENT_ERROR_CODES,
+            )
+            if not error.transient:
+                break
+        raise error
+
+    def _discard_source(self, upload: MetaVideoUpload):
+        if upload.delete_source:
+            try:
+                self.storage.delete(upload.source_name)
+            except Exception as e:
+                logger.warning("Could not delete staged upload %s: %s", upload.source_name, e)
+
+
+def stalled_uploads():
+    """Active uploads no worker has touched recently (lost task, restarted worker)"""
+    now = timezone.now()
+    stalled_after = timedelta(seconds=upload_settings().get("STALLED_AFTER_SECONDS", 600))
+    return (
+        MetaVideoUpload.objects.filter(status__in=MetaVideoUpload.ACTIVE_STATUSES, updated_at__lt=now - stalled_after)
+        .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+    )
@@ -0,0 +1,176 @@
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+import requests
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from apps.ad_platforms.models import AdAccount
+from apps.ad_platforms.services.graph import GraphClient, GraphError
+from apps.content_creation.services.providers.http_client import get_provider_session
+
+logger = logging.getLogger(__name__)
+
+# OAuth2 token endpoints accepting grant_type=refresh_token, with their client credentials settings
+OAUTH2_TOKEN_URLS = {
+    "snapchat": ("https://accounts.snapchat.com/login/oauth2/access_token", "SNAPCHAT_CLIENT_ID", "SNAPCHAT_CLIENT_SECRET"),
+    "youtube": ("https://oauth2.googleapis.com/token", "YOUTUBE_CLIENT_ID", "YOUTUBE_CLIENT_SECRET"),
+    "linkedin": ("https://www.linkedin.com/oauth/v2/accessToken", "LINKEDIN_CLIENT_ID", "LINKEDIN_CLIENT_SECRET"),
+}
+
+REFRESHABLE_PROVIDERS = (*OAUTH2_TOKEN_URLS, "meta")
+
+
+def token_settings() -> Dict[str, Any]:
+    return getattr(settings, "TOKEN_REFRESH", {})
+
+
+class TokenRefreshError(Exception):
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def schedule_token_refresh(account: AdAccount, expires_in: Optional[Any]):
+    """Record when the access token expires and pick a jittered time to refresh it.
+
+    Refreshes land LEAD_SECONDS before expiry, spread over JITTER of that lead,
+    so accounts connected together do not all hit the provider in one sweep.
+    """
+    try:
+        expires_in = int(expires_in)
+    except (TypeError, ValueError):
+        return
+    config = token_settings()
+    now = timezone.now()
+    lead = min(config.get("LEAD_SECONDS", 3600) * (1 + random.uniform(0, config.get("JITTER", 0.25))), expires_in / 2)
+    account.token_expires_at = now + timedelta(seconds=expires_in)
+    account.token_refresh_at = account.token_expires_at - timedelta(seconds=lead)
+    account.token_refresh_failures = 0
+    AdAccount.objects.filter(pk=account.pk).update(
+        token_expires_at=account.token_expires_at,
+        token_refresh_at=account.token_refresh_at,
+        token_refresh_failures=0,
+    )
+
+
+def due_accounts():
+    """Connected accounts whose scheduled refresh time has passed and that no worker holds"""
+    now = timezone.now()
+    return (
+        AdAccount.objects.filter(status="connected", provider__in=REFRESHABLE_PROVIDERS, token_refresh_at__lte=now)
+        .filter(Q(token_refresh_until__isnull=True) | Q(token_refresh_until__lt=now))
+        .order_by("token_refresh_at")
+    )
+
+
+class TokenRefresher:
+    """Refreshes access tokens for a batch of accounts of one provider.
+
+    Token requests run on a small thread pool sized per provider; claiming the
+    accounts and saving the outcomes stays on the calling thread.
+    """
+
+    def __init__(self, session=None):
+        self.config = token_settings()
+        self.session = session or get_provider_session()
+        self.timeout = self.config.get("TIMEOUT_SECONDS", 15)
+
+    def refresh_many(self, provider: str, accounts: Iterable[AdAccount]) -> Dict[str, int]:
+        claimed = [account for account in accounts if self._claim(account)]
+        outcome = {"refreshed": 0, "retry": 0, "failed": 0}
+        if not claimed:
+            return outcome
+
+        workers = self.config.get("PROVIDER_CONCURRENCY", {}).get(provider, self.config.get("DEFAULT_CONCURRENCY", 2))
+        with ThreadPoolExecutor(max_workers=min(workers, len(claimed)), thread_name_prefix=f"token-refresh-{provider}") as pool:
+            futures = {pool.submit(self.exchange, account): account for account in claimed}
+            for future in as_completed(futures):
+                account = futures[future]
+                try:
+                    self._save(account, future.result())
+                    outcome["refreshed"] += 1
+                except TokenRefreshError as e:
+                    outcome["failed" if e.permanent else "retry"] += 1
+                    self._record_failure(account, e)
+                finally:
+                    AdAccount.objects.filter(pk=account.pk).update(token_refresh_until=None)
+        return outcome
+
+    def exchange(self, account: AdAccount) -> Dict[str, Any]:
+        """Ask the provider for a new token; runs off the main thread, so no database access"""
+        if account.provider == "meta":
+            return self._exchange_meta(account)
+        if not account.refresh_token:
+            raise TokenRefreshError("No refresh token; reconnect the account", permanent=True)
+
+        url, client_id_setting, client_secret_setting = OAUTH2_TOKEN_URLS[account.provider]
+        try:
+            response = self.session.post(url, data={
+                "grant_type": "refresh_token",
+                "refresh_token": account.refresh_token,
+                "client_id": getattr(settings, client_id_setting, ""),
+                "client_secret": getattr(settings, client_secret_setting, ""),
+            }, timeout=self.timeout)
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise TokenRefreshError(f"Token request failed: {e}")
+        if response.status_code != 200 or not body.get("access_token"):
+            # Revoked or expired grants come back as 4xx; rate limits and outages are worth retrying
+            raise TokenRefreshError(
+                f"Token refresh failed ({response.status_code}): {body.get('error_description') or body.get('error') or body}",
+                permanent=400 <= response.status_code < 500 and response.status_code != 429,
+            )
+        return body
+
+    def _exchange_meta(self, account: AdAccount) -> Dict[str, Any]:
+        # Long-lived Meta tokens are renewed by exchanging the current one before it expires
+        client = GraphClient(None, session=self.session, timeout=self.timeout)
+        try:
+            body = client.get(
+                "oauth/access_token",
+                grant_type="fb_exchange_token",
+                client_id=getattr(settings, "META_APP_ID", ""),
+                client_secret=getattr(settings, "META_APP_SECRET", ""),
+                fb_exchange_token=account.access_token or "",
+            )
+        except GraphError as e:
+            raise TokenRefreshError(f"Token exchange failed: {e}", permanent=not e.transient and e.status is not None)
+        if not body.get("access_token"):
+            raise TokenRefreshError(f"Token exchange returned no token: {body}")
+        return body
+
+    def _claim(self, account: AdAccount) -> bool:
+        now = timezone.now()
+        return bool(
+            AdAccount.objects.filter(pk=account.pk)
+            .filter(Q(token_refresh_until__isnull=True) | Q(token_refresh_until__lt=now))
+            .update(token_refresh_until=now + timedelta(seconds=self.config.get("LEASE_SECONDS", 300)))
+        )
+
+    def _save(self, account: AdAccount, body: Dict[str, Any]):
+        account.access_token = body["access_token"]
+        # Providers that rotate refresh tokens return a new one; others keep the old
+        account.refresh_token = body.get("refresh_token") or account.refresh_token
+        account.token_refreshed_at = timezone.now()
+        account.save(update_fields=["access_token", "refresh_token", "token_refreshed_at", "updated_at"])
+        schedule_token_refresh(account, body.get("expires_in") or self.config.get("DEFAULT_EXPIRES_IN", 3600))
+
+    def _record_failure(self, account: AdAccount, error: TokenRefreshError):
+        account.token_refresh_failures += 1
+        metadata = {**(account.metadata or {}), "token_error": str(error)}
+        expired = account.token_expires_at is not None and account.token_expires_at <= timezone.now()
+        if error.permanent or (expired and account.token_refresh_failures >= self.config.get("MAX_FAILURES", 5)):
+            logger.warning("token refresh for %s account %s failed permanently: %s", account.provider, account.pk, error)
+            AdAccount.objects.filter(pk=account.pk).update(
+                status="error", metadata=metadata, token_refresh_failures=account.token_refresh_failures, token_refresh_at=None
+            )
+            return
+        backoff = min(self.config.get("RETRY_MAX_SECONDS", 1800), self.config.get("RETRY_BASE_SECONDS", 60) * 2 ** account.token_refresh_failures)
+        AdAccount.objects.filter(pk=account.pk).update(
+            metadata=metadata,
+            token_refresh_failures=account.token_refresh_failures,
+            token_refresh_at=timezone.now() + timedelta(seconds=backoff * random.uniform(0.8, 1.2)),
+        )
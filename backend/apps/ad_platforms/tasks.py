@@ -0,0 +1,102 @@
+import logging
+from celery import shared_task
+from django.db import transaction
+from kombu.exceptions import OperationalError
+from apps.ad_platforms.models import AdAccount, MetaVideoUpload
+from apps.ad_platforms.services.graph import GraphError
+from apps.ad_platforms.services.meta_pages import claim_pages_refresh, release_pages_refresh, sync_pages
+from apps.ad_platforms.services.token_refresh import REFRESHABLE_PROVIDERS, TokenRefresher, due_accounts, token_settings
+from apps.ad_platforms.services.meta_upload import MetaUploadError, MetaVideoUploader, stalled_uploads, upload_settings
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="ad_platforms.upload_meta_video", max_retries=None)
+def upload_meta_video(self, upload_id):
+    """Run (or resume) a chunked Meta video upload on the publishing queue"""
+    upload = MetaVideoUpload.objects.select_related("account").filter(pk=upload_id).first()
+    if upload is None:
+        logger.warning("meta video upload %s no longer exists", upload_id)
+        return
+
+    uploader = MetaVideoUploader()
+    try:
+        uploader.run(upload)
+    except MetaUploadError as e:
+        if not e.transient:
+            return
+        if self.request.retries >= upload_settings().get("TASK_MAX_RETRIES", 10):
+            uploader.fail(upload, str(e))
+            return
+        raise self.retry(countdown=min(600, 30 * 2 ** self.request.retries))
+
+
+@shared_task(name="ad_platforms.resume_meta_uploads")
+def resume_meta_uploads():
+    """Re-queue uploads whose task was lost, e.g. to a worker restart"""
+    resumed = 0
+    for upload_id in stalled_uploads().values_list("id", flat=True):
+        enqueue_meta_upload(upload_id)
+        resumed += 1
+    return resumed
+
+
+def enqueue_meta_upload(upload_id):
+    """Send the upload task; if the broker is down the resume sweep picks it up later"""
+    try:
+        upload_meta_video.apply_async(args=[str(upload_id)], retry=False)
+    except OperationalError as e:
+        logger.warning("Broker unavailable (%s), meta upload %s left for the resume sweep", e, upload_id)
+
+
+def queue_meta_upload(upload: MetaVideoUpload):
+    transaction.on_commit(lambda: enqueue_meta_upload(upload.id))
+
+
+@shared_task(name="ad_platforms.refresh_meta_pages")
+def refresh_meta_pages(account_id):
+    """Re-sync an account's page inventory; the caller holds the refresh lease"""
+    account = AdAccount.objects.filter(pk=account_id, provider="meta").first()
+    if account is None:
+        return
+    try:
+        sync_pages(account)
+    except GraphError as e:
+        logger.warning("meta pages refresh for account %s failed: %s", account_id, e)
+    finally:
+        release_pages_refresh(account)
+
+
+def queue_pages_refresh(account: AdAccount) -> bool:
+    """Refresh in the background unless a refresh is already running"""
+    if not claim_pages_refresh(account):
+        return False
+    try:
+        refresh_meta_pages.apply_async(args=[str(account.pk)], retry=False)
+    except OperationalError as e:
+        logger.warning("Broker unavailable (%s), meta pages of account %s not refreshed", e, account.pk)
+        release_pages_refresh(account)
+        return False
+    return True
+
+
+@shared_task(name="ad_platforms.refresh_expiring_tokens")
+def refresh_expiring_tokens():
+    """Queue one refresh batch per provider for accounts whose token refresh is due"""
+    queued = 0
+    batch_size = token_settings().get("BATCH_SIZE", 200)
+    for provider in REFRESHABLE_PROVIDERS:
+        account_ids = [str(pk) for pk in due_accounts().filter(provider=provider).values_list("id", flat=True)[:batch_size]]
+        if account_ids:
+            refresh_provider_tokens.delay(provider, account_ids)
+            queued += len(account_ids)
+    return queued
+
+
+@shared_task(name="ad_platforms.refresh_provider_tokens")
+def refresh_provider_tokens(provider, account_ids):
+    """Refresh one provider's due accounts with that provider's concurrency limit"""
+    accounts = due_accounts().filter(provider=provider, pk__in=account_ids)
+    outcome = TokenRefresher().refresh_many(provider, accounts)
+    logger.info("%s token refresh: %s", provider, outcome)
+    return outcome
@@ -0,0 +1,468 @@
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import timedelta
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from apps.authentication.models import User
+from apps.workspaces.models import Workspace, WorkspaceMember
+from apps.ad_platforms.models import AdAccount, MetaAdCreative, MetaVideoUpload
+from apps.ad_platforms.services.meta_publish import MetaPublisher
+from apps.ad_platforms.services.meta_upload import MetaVideoUploader
+from apps.ad_platforms.tasks import refresh_expiring_tokens, refresh_meta_pages, resume_meta_uploads
+from apps.content_creation.models import ContentAsset, MediaBlob
+from apps.content_creation.services.transcoding import TranscodeError, Transcoder
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FakeGraph:
+    """In-memory Graph API: the batch endpoint, and /advideos dictating 1 MiB chunks"""
+
+    def __init__(self):
+        self.received = bytearray()
+        self.file_size = 0
+        self.calls = []
+        self.fail_transfers = 0
+        self.batches = []
+        # 1-based numbers of batch calls that fail as a whole
+        self.failing_batches = set()
+        self.pages = []
+
+    def handle(self, path, fields):
+        if path.endswith("/"):
+            return self._batch(fields)
+        phase = fields.get("upload_phase")
+        self.calls.append(phase or path.rsplit("/", 1)[-1])
+        if path.endswith("/adcreatives"):
+            return 200, {"id": "creative-1"}
+        if phase == "start":
+            self.file_size = int(fields["file_size"])
+            return 200, {"upload_session_id": "session-1", "video_id": "video-1", **self._range(0)}
+        if phase == "transfer":
+            if self.fail_transfers:
+                self.fail_transfers -= 1
+                return 500, {"error": {"message": "Service temporarily unavailable", "code": 2, "is_transient": True}}
+            start = int(fields["start_offset"])
+            self.received[start:start + len(fields["video_file_chunk"])] = fields["video_file_chunk"]
+            return 200, self._range(start + len(fields["video_file_chunk"]))
+        if phase == "finish":
+            return 200, {"success": True}
+        return 400, {"error": {"message": "Unknown phase", "code": 100}}
+
+    def get(self, path, params):
+        self.calls.append(path.rsplit("/", 1)[-1])
+        if path.endswith("/oauth/access_token"):
+            if params["fb_exchange_token"] == "revoked":
+                return 400, {"error": {"message": "Error validating access token", "code": 190}}
+            return 200, {"access_token": f"renewed-{params['fb_exchange_token']}", "expires_in": 5184000}
+        if not path.endswith("/me/accounts"):
+            return 404, {"error": {"message": "Unknown path", "code": 803}}
+        start = int(params.get("after", 0))
+        end = start + int(params["limit"])
+        body = {"data": self.pages[start:end], "paging": {"cursors": {"after": str(end)}}}
+        if end < len(self.pages):
+            body["paging"]["next"] = f"https://graph.facebook.com{path}?after={end}"
+        return 200, body
+
+    def _batch(self, fields):
+        operations = json.loads(fields["batch"])
+        self.batches.append(operations)
+        if len(self.batches) in self.failing_batches:
+            return 500, {"error": {"message": "Service temporarily unavailable", "code": 2, "is_transient": True}}
+        responses, named = [], {}
+        for operation in operations:
+            params = {key: values[0] for key, values in parse_qs(operation.get("body", "")).items()}
+            references = re.findall(r"\{result=(\w+):", " ".join(params.values()))
+            if any(named.get(name) is None for name in references):
+                responses.append(None)
+                continue
+            for name in references:
+                params = {key: value.replace(f"{{result={name}:$.images.*.hash}}", named[name]) for key, value in params.items()}
+
+            relative_url = urlsplit(operation["relative_url"]).path
+            if relative_url.endswith("/adimages"):
+                data = fields[operation["attached_files"]]
+                if data.startswith(b"bad"):
+                    code, body, result = 400, {"error": {"message": "Invalid image", "code": 100}}, None
+                else:
+                    result = f"hash-{len(named)}"
+                    code, body = 200, {"images": {"bytes": {"hash": result}}}
+            elif relative_url.endswith("/adcreatives"):
+                spec = json.loads(params["object_story_spec"])
+                if spec["link_data"]["message"] == "reject":
+                    code, body, result = 400, {"error": {"message": "Invalid parameter", "code": 100}}, None
+                else:
+                    code, body, result = 200, {"id": f"creative-{spec['link_data']['image_hash']}"}, True
+            else:
+                code, body, result = 404, {"error": {"message": "Unknown path", "code": 803}}, None
+            if operation.get("name"):
+                named[operation["name"]] = result
+            responses.append({"code": code, "body": json.dumps(body)})
+        return 200, responses
+
+    def _range(self, start):
+        return {"start_offset": str(start), "end_offset": str(min(self.file_size, start + CHUNK_SIZE))}
+
+
+class FakeGraphTestCase(APITestCase):
+    """Runs the real clients against a local fake Graph API"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.graph = graph = FakeGraph()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                content_type = self.headers["Content-Type"]
+                if content_type.startswith("multipart/"):
+                    message = BytesParser(policy=default_policy).parsebytes(
+                        f"Content-Type: {content_type}\r\n\r\n".encode() + body
+                    )
+                    fields = {}
+                    for part in message.iter_parts():
+                        value = part.get_payload(decode=True)
+                        name = part.get_param("name", header="content-disposition")
+                        fields[name] = value if part.get_filename() else value.decode()
+                else:
+                    fields = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+                self._reply(*graph.handle(self.path, fields))
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                self._reply(*graph.get(url.path, {key: values[0] for key, values in parse_qs(url.query).items()}))
+
+            def _reply(self, code, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.graph_url = f"http://127.0.0.1:{cls.server.server_port}/v20.0"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.graph.__init__()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                "generated_media": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": media_root.name, "base_url": "/media/"},
+                },
+            },
+            META_GRAPH_URL=self.graph_url,
+            META_VIDEO_UPLOAD={
+                **settings.META_VIDEO_UPLOAD,
+                "GRAPH_VIDEO_URL": self.graph_url,
+                "RETRY_BACKOFF_SECONDS": 0,
+            },
+            CELERY_TASK_ALWAYS_EAGER=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.storage = storages["generated_media"]
+
+        self.user = User.objects.create_user(username="publish@example.com", email="publish@example.com", password="x")
+        self.workspace = Workspace.objects.create(name="Publish", slug="publish", owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role="owner")
+        self.account = AdAccount.objects.create(
+            workspace=self.workspace, provider="meta", external_account_id="123", access_token="token"
+        )
+
+
+class MetaVideoUploadTest(FakeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        self.video = os.urandom(2 * CHUNK_SIZE + 4321)
+
+    def _upload(self):
+        name = self.storage.save("uploads/meta/source.mp4", ContentFile(self.video))
+        return MetaVideoUpload.objects.create(
+            workspace=self.workspace, account=self.account, source_name=name, file_size=len(self.video),
+            creative={"page_id": "page-1", "message": "Ramadan offer"},
+        )
+
+    def test_video_upload_runs_in_background(self):
+        self.client.force_authenticate(user=self.user)
+        url = f"/api/v1/workspaces/{self.workspace.id}/ad-accounts/v1/ad-accounts/meta/upload-ad/"
+        media = SimpleUploadedFile("ad.mp4", self.video, content_type="video/mp4")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"page_id": "page-1", "creative_type": "video", "media": media})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        upload = MetaVideoUpload.objects.get(pk=response.data["id"])
+        self.assertEqual(upload.status, "completed")
+        self.assertEqual((upload.video_id, upload.creative_id), ("video-1", "creative-1"))
+        self.assertEqual(bytes(self.graph.received), self.video)
+        self.assertFalse(self.storage.exists(upload.source_name))
+
+        status_response = self.client.get(f"{url.replace('upload-ad/', '')}uploads/{upload.id}/")
+        self.assertEqual(status_response.data["bytes_transferred"], len(self.video))
+
+    def test_failed_chunk_is_retried(self):
+        self.graph.fail_transfers = 1
+        upload = self._upload()
+
+        MetaVideoUploader().run(upload)
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "completed")
+        self.assertEqual(self.graph.calls.count("transfer"), 4)
+        self.assertEqual(bytes(self.graph.received), self.video)
+
+    def test_interrupted_upload_resumes_from_saved_offset(self):
+        upload = self._upload()
+        uploader = MetaVideoUploader()
+        post = uploader.session.post
+        transfers = []
+
+        def crash_after_first_chunk(url, data=None, **kwargs):
+            if data.get("upload_phase") == "transfer":
+                transfers.append(data["start_offset"])
+                if len(transfers) == 2:
+                    raise RuntimeError("worker killed")
+            return post(url, data=data, **kwargs)
+
+        with mock.patch.object(uploader.session, "post", side_effect=crash_after_first_chunk):
+            with self.assertRaises(RuntimeError):
+                uploader.run(upload)
+
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.start_offset), ("transferring", CHUNK_SIZE))
+
+        # Only uploads idle past STALLED_AFTER_SECONDS are picked up by the sweep
+        MetaVideoUpload.objects.filter(pk=upload.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(resume_meta_uploads(), 1)
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "completed")
+        self.assertEqual(self.graph.calls.count("start"), 1)
+        self.assertEqual(bytes(self.graph.received), self.video)
+
+
+    def _video_asset(self):
+        name = self.storage.save("generated/video.mp4", ContentFile(self.video))
+        blob = MediaBlob.objects.create(sha256="v" * 64, storage_name=name, size=len(self.video), mime_type="video/mp4", ref_count=1)
+        return ContentAsset.objects.create(
+            workspace=self.workspace, type="video", name="Video", file_url=self.storage.url(name), blob=blob
+        )
+
+    def test_library_video_is_encoded_by_the_upload_task(self):
+        self.client.force_authenticate(user=self.user)
+        url = f"/api/v1/workspaces/{self.workspace.id}/ad-accounts/v1/ad-accounts/meta/upload-ad/"
+        asset = self._video_asset()
+        variant = mock.Mock(storage_name=asset.blob.storage_name, size=len(self.video))
+
+        with mock.patch.object(Transcoder, "variant", return_value=variant) as encode:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(url, {"page_id": "page-1", "asset_id": str(asset.id)})
+
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            encode.assert_not_called()
+            upload = MetaVideoUpload.objects.get(pk=response.data["id"])
+            self.assertEqual((upload.status, upload.source_name, upload.variant_spec), ("pending", "", "meta_feed_video"))
+
+            for callback in callbacks:
+                callback()
+
+        encode.assert_called_once()
+        upload.refresh_from_db()
+        self.assertEqual((upload.status, upload.file_size), ("completed", len(self.video)))
+        self.assertEqual(bytes(self.graph.received), self.video)
+        self.assertTrue(self.storage.exists(upload.source_name))
+
+    def test_encode_failure_is_recorded_on_the_creative(self):
+        asset = self._video_asset()
+
+        with mock.patch.object(Transcoder, "variant", side_effect=TranscodeError("ffmpeg is not installed")):
+            with self.captureOnCommitCallbacks(execute=True):
+                creative = MetaPublisher(self.account, user=self.user).publish("page-1", [{"asset": asset}])[0]
+
+        creative.refresh_from_db()
+        self.assertEqual((creative.status, creative.video_upload.status), ("failed", "failed"))
+        self.assertIn("ffmpeg is not installed", creative.error_message)
+        self.assertEqual(self.graph.calls, [])
+
+
+class MetaPublishTest(FakeGraphTestCase):
+    def _image_asset(self, index):
+        buffer = io.BytesIO()
+        Image.new("RGB", (400, 300), (index * 60, 120, 200)).save(buffer, "JPEG")
+        name = self.storage.save(f"generated/image{index}.jpg", ContentFile(buffer.getvalue()))
+        blob = MediaBlob.objects.create(sha256=str(index) * 64, storage_name=name, size=buffer.tell(), mime_type="image/jpeg", ref_count=1)
+        return ContentAsset.objects.create(
+            workspace=self.workspace, type="image", name=f"Image {index}", file_url=self.storage.url(name), blob=blob
+        )
+
+    def test_publishing_images_takes_one_round_trip(self):
+        self.client.force_authenticate(user=self.user)
+        url = f"/api/v1/workspaces/{self.workspace.id}/ad-accounts/v1/ad-accounts/meta/publish-creatives/"
+        assets = [self._image_asset(index) for index in range(3)]
+
+        response = self.client.post(url, {
+            "page_id": "page-1",
+            "link_url": "https://shop.example.com",
+            "items": [{"asset_id": str(asset.id), "message": f"Offer {asset.name}"} for asset in assets],
+        }, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.graph.batches), 1)
+        self.assertEqual(len(self.graph.batches[0]), 6)
+        self.assertEqual(
+            [(c["status"], c["creative_id"], c["asset"]) for c in response.data["creatives"]],
+            [("created", f"creative-hash-{index}", asset.id) for index, asset in enumerate(assets)],
+        )
+
+    def test_failures_are_reported_per_item(self):
+        items = [
+            {"media": SimpleUploadedFile("ok.jpg", b"image", content_type="image/jpeg"), "message": "ok"},
+            {"media": SimpleUploadedFile("bad.jpg", b"bad image", content_type="image/jpeg"), "message": "ok"},
+            {"media": SimpleUploadedFile("rejected.jpg", b"image", content_type="image/jpeg"), "message": "reject"},
+        ]
+
+        creatives = MetaPublisher(self.account, user=self.user).publish("page-1", items)
+
+        self.assertEqual([c.status for c in creatives], ["created", "failed", "failed"])
+        self.assertIn("Invalid image", creatives[1].error_message)
+        self.assertIn("Invalid parameter", creatives[2].error_message)
+        self.assertEqual(creatives[2].image_hash, "hash-2")
+        self.assertEqual(MetaAdCreative.objects.filter(status="created").count(), 1)
+        self.assertEqual(len(self.graph.batches), 1)
+
+    def test_failed_batch_call_fails_only_its_own_items(self):
+        self.graph.failing_batches = {2}
+        items = [
+            {"media": SimpleUploadedFile(f"{index}.jpg", b"image", content_type="image/jpeg"), "message": "ok"}
+            for index in range(3)
+        ]
+
+        # One image and its creative per batch call
+        with mock.patch("apps.ad_platforms.services.graph.MAX_BATCH_SIZE", 2):
+            creatives = MetaPublisher(self.account, user=self.user).publish("page-1", items)
+
+        self.assertEqual(len(self.graph.batches), 3)
+        self.assertEqual([c.status for c in creatives], ["created", "failed", "created"])
+        self.assertIn("temporarily unavailable", creatives[1].error_message)
+
+    def test_unexpected_errors_fail_the_item_not_the_request(self):
+        self.client.force_authenticate(user=self.user)
+        url = f"/api/v1/workspaces/{self.workspace.id}/ad-accounts/v1/ad-accounts/meta/upload-ad/"
+        asset = self._image_asset(0)
+
+        with mock.patch.object(Transcoder, "variant", side_effect=OSError("storage unavailable")):
+            response = self.client.post(url, {"page_id": "page-1", "asset_id": str(asset.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_502_BAD_GATEWAY)
+        self.assertEqual((response.data["error"], response.data["detail"]), ("meta_upload_failed", "storage unavailable"))
+        self.assertEqual(MetaAdCreative.objects.get(asset=asset).status, "failed")
+        self.assertEqual(self.graph.batches, [])
+
+
+class MetaPagesTest(FakeGraphTestCase):
+    def setUp(self):
+        super().setUp()
+        self.graph.pages = [{"id": f"page-{index}", "name": f"Store {index:04d}", "category": "Retail"} for index in range(250)]
+        self.client.force_authenticate(user=self.user)
+        self.url = f"/api/v1/workspaces/{self.workspace.id}/ad-accounts/v1/ad-accounts/meta/pages/"
+
+    def test_first_listing_follows_every_cursor(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["pages"]), 250)
+        self.assertEqual(self.graph.calls.count("accounts"), 3)
+
+        response = self.client.get(self.url, {"search": "store 0249"})
+        self.assertEqual([page["id"] for page in response.data["pages"]], ["page-249"])
+        self.assertEqual(self.graph.calls.count("accounts"), 3)
+
+    def test_stale_listing_is_served_while_refreshing(self):
+        self.client.get(self.url)
+        self.graph.pages = self.graph.pages[:100] + [{"id": "page-new", "name": "New store", "category": "Retail"}]
+        AdAccount.objects.filter(pk=self.account.pk).update(pages_synced_at=timezone.now() - timedelta(hours=1))
+
+        with mock.patch.object(refresh_meta_pages, "apply_async") as apply_async:
+            response = self.client.get(self.url)
+            again = self.client.get(self.url)
+
+        # Answered from the cache without waiting on Meta, one refresh queued
+        self.assertEqual(len(response.data["pages"]), 250)
+        self.assertEqual((response.data["refreshing"], again.data["refreshing"]), (True, False))
+        self.assertEqual(self.graph.calls.count("accounts"), 3)
+        apply_async.assert_called_once_with(args=[str(self.account.pk)], retry=False)
+
+        refresh_meta_pages(str(self.account.pk))
+
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.pages_refresh_until)
+        self.assertEqual(self.account.meta_pages.count(), 101)
+        self.assertTrue(self.account.meta_pages.filter(page_id="page-new").exists())
+
+
+class TokenRefreshTest(FakeGraphTestCase):
+    def _account(self, external_id, token, refresh_in):
+        return AdAccount.objects.create(
+            workspace=self.workspace, provider="meta", external_account_id=external_id, access_token=token,
+            token_expires_at=timezone.now() + timedelta(days=1), token_refresh_at=timezone.now() + refresh_in,
+        )
+
+    def test_due_tokens_are_refreshed_ahead_of_expiry(self):
+        due = [self._account(f"due-{index}", f"token-{index}", timedelta(minutes=-1)) for index in range(3)]
+        later = self._account("later", "token-later", timedelta(hours=1))
+
+        self.assertEqual(refresh_expiring_tokens(), 3)
+
+        for index, account in enumerate(due):
+            account.refresh_from_db()
+            self.assertEqual(account.access_token, f"renewed-token-{index}")
+            self.assertIsNone(account.token_refresh_until)
+            lead = account.token_expires_at - account.token_refresh_at
+            self.assertTrue(timedelta(seconds=1800) <= lead <= timedelta(seconds=1800 * 1.25))
+            self.assertGreater(account.token_expires_at, timezone.now() + timedelta(days=59))
+        later.refresh_from_db()
+        self.assertEqual(later.access_token, "token-later")
+        self.assertEqual(refresh_expiring_tokens(), 0)
+
+    def test_revoked_token_marks_account_error(self):
+        account = self._account("revoked", "revoked", timedelta(minutes=-1))
+
+        refresh_expiring_tokens()
+
+        account.refresh_from_db()
+        self.assertEqual(account.status, "error")
+        self.assertIsNone(account.token_refresh_at)
+        self.assertIn("Error validating access token", account.metadata["token_error"])
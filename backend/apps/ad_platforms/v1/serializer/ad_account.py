@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from apps.ad_platforms.models import AdAccount
+from apps.ad_platforms.models import AdAccount, MetaAdCreative, MetaVideoUpload
 
 
 class AdAccountSerializer(serializers.ModelSerializer):
@@ -29,3 +29,61 @@ class AdAccountConnectSerializer(serializers.Serializer):
     refresh_token = serializers.CharField(required=False, allow_blank=True)
     scopes = serializers.ListField(child=serializers.CharField(), required=False)
     metadata = serializers.DictField(required=False)
+
+
+class MetaVideoUploadSerializer(serializers.ModelSerializer):
+    bytes_transferred = serializers.IntegerField(source="start_offset", read_only=True)
+
+    class Meta:
+        model = MetaVideoUpload
+        fields = [
+            "id",
+            "account",
+            "asset",
+            "variant_spec",
+            "status",
+            "file_size",
+            "bytes_transferred",
+            "video_id",
+            "creative_id",
+            "error_message",
+            "created_at",
+            "updated_at",
+            "completed_at",
+        ]
+        read_only_fields = fields
+
+
+class MetaAdCreativeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MetaAdCreative
+        fields = [
+            "id",
+            "account",
+            "asset",
+            "video_upload",
+            "kind",
+            "name",
+            "page_id",
+            "image_hash",
+            "creative_id",
+            "status",
+            "error_message",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class MetaPublishCreativeItemSerializer(serializers.Serializer):
+    asset_id = serializers.UUIDField()
+    message = serializers.CharField(required=False, allow_blank=True)
+    name = serializers.CharField(required=False, allow_blank=True, max_length=255)
+
+
+class MetaPublishCreativesSerializer(serializers.Serializer):
+    page_id = serializers.CharField()
+    ad_account_id = serializers.CharField(required=False, allow_blank=True)
+    link_url = serializers.URLField(required=False, allow_blank=True)
+    placement = serializers.ChoiceField(choices=[("feed", "Feed"), ("story", "Story")], default="feed")
+    items = MetaPublishCreativeItemSerializer(many=True, allow_empty=False)
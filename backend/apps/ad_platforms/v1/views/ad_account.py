@@ -4,18 +4,26 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from urllib.parse import urlencode
 from requests_oauthlib import OAuth1Session
-import requests
 import json
 import redis
 import json
 import redis
 from apps.workspaces.permissions.permission import WorkspacePermission
-from apps.ad_platforms.models import AdAccount
+from apps.ad_platforms.models import AdAccount, MetaVideoUpload
+from apps.ad_platforms.services.graph import GraphError
+from apps.ad_platforms.services.meta_pages import pages_are_stale, sync_pages
+from apps.ad_platforms.services.meta_publish import MetaPublisher
+from apps.ad_platforms.tasks import queue_pages_refresh
+from apps.content_creation.models import ContentAsset
 from apps.ad_platforms.v1.serializer.ad_account import (
     AdAccountSerializer,
     AdAccountConnectSerializer,
+    MetaVideoUploadSerializer,
+    MetaAdCreativeSerializer,
+    MetaPublishCreativesSerializer,
 )
 
 
@@ -199,101 +207,103 @@ class AdAccountViewSet(viewsets.ModelViewSet):
         if not page_id:
             return Response({"error": "missing_page_id"}, status=status.HTTP_400_BAD_REQUEST)
 
-        account = None
-        if ad_account_id:
-            account = AdAccount.objects.filter(workspace_id=workspace_id, provider="meta", external_account_id=ad_account_id).first()
-        else:
-            account = AdAccount.objects.filter(workspace_id=workspace_id, provider="meta").first()
+        account = self._meta_account(workspace_id, ad_account_id)
         if not account:
             return Response({"error": "no_meta_account"}, status=status.HTTP_400_BAD_REQUEST)
 
-        token = account.access_token
-        act_id = f"act_{account.external_account_id}"
-
+        asset = None
+        asset_id = request.data.get("asset_id")
+        if asset_id:
+            asset = self._workspace_asset(workspace_id, asset_id)
+            if not asset:
+                return Response({"error": "asset_not_found"}, status=status.HTTP_400_BAD_REQUEST)
+        elif not media:
+            return Response({"error": "missing_media"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Library assets are uploaded as a variant encoded to the placement's spec;
+        # videos are encoded and uploaded in chunks by a task on the publishing queue
         try:
-            if creative_type == "video":
-                files = {"source": media} if media else None
-                resp = requests.post(
-                    f"https://graph.facebook.com/v20.0/{act_id}/advideos",
-                    params={"access_token": token},
-                    files=files,
-                    timeout=30,
-                )
-                data = resp.json()
-                if resp.status_code != 200:
-                    return Response({"error": "video_upload_failed", "status": resp.status_code, "detail": data}, status=status.HTTP_502_BAD_GATEWAY)
-                video_id = data.get("id")
-                object_story_spec = {
-                    "page_id": page_id,
-                    "video_data": {
-                        "video_id": video_id,
-                        "message": message or "",
-                    },
-                }
-            else:
-                files = {"bytes": media} if media else None
-                resp = requests.post(
-                    f"https://graph.facebook.com/v20.0/{act_id}/adimages",
-                    params={"access_token": token},
-                    files=files,
-                    timeout=30,
-                )
-                data = resp.json()
-                if resp.status_code != 200:
-                    return Response({"error": "image_upload_failed", "status": resp.status_code, "detail": data}, status=status.HTTP_502_BAD_GATEWAY)
-                img = (data.get("images") or [{}])[0]
-                image_hash = img.get("hash")
-                object_story_spec = {
-                    "page_id": page_id,
-                    "link_data": {
-                        "image_hash": image_hash,
-                        "link": link_url or "",
-                        "message": message or "",
-                    },
-                }
-
-            resp = requests.post(
-                f"https://graph.facebook.com/v20.0/{act_id}/adcreatives",
-                data={
-                    "access_token": token,
-                    "object_story_spec": json.dumps(object_story_spec),
-                    "name": request.data.get("name") or "ADLY Creative",
-                },
-                timeout=30,
-            )
-            cr_json = resp.json()
-            if resp.status_code != 200:
-                return Response({"error": "creative_create_failed", "status": resp.status_code, "detail": cr_json}, status=status.HTTP_502_BAD_GATEWAY)
-            creative_id = cr_json.get("id")
-            return Response({"creative_id": creative_id, "status": "created", "detail": cr_json})
+            creative = MetaPublisher(account, user=request.user).publish(
+                page_id,
+                [{"asset": asset, "media": media, "creative_type": creative_type, "message": message, "name": request.data.get("name")}],
+                link_url=link_url,
+                placement=request.data.get("placement") or "feed",
+            )[0]
         except Exception as e:
-            return Response({"error": "meta_upload_error", "detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+            return Response({"error": "meta_upload_failed", "detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        if creative.status == "failed":
+            return Response({"error": "meta_upload_failed", "detail": creative.error_message}, status=status.HTTP_502_BAD_GATEWAY)
+        if creative.video_upload_id:
+            return Response(MetaVideoUploadSerializer(creative.video_upload).data, status=status.HTTP_202_ACCEPTED)
+        return Response({"creative_id": creative.creative_id, "status": "created"})
+
+    @action(detail=False, methods=["post"], url_path="meta/publish-creatives")
+    def meta_publish_creatives(self, request, workspace_id=None):
+        """Publish creatives for many library assets in a few Graph batch calls"""
+        serializer = MetaPublishCreativesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        account = self._meta_account(workspace_id, data.get("ad_account_id"))
+        if not account:
+            return Response({"error": "no_meta_account"}, status=status.HTTP_400_BAD_REQUEST)
+
+        assets = ContentAsset.objects.select_related("blob").in_bulk([item["asset_id"] for item in data["items"]])
+        items = []
+        for item in data["items"]:
+            asset = assets.get(item["asset_id"])
+            if asset is None or str(asset.workspace_id) != str(workspace_id):
+                return Response({"error": "asset_not_found", "asset_id": str(item["asset_id"])}, status=status.HTTP_400_BAD_REQUEST)
+            items.append({"asset": asset, "message": item.get("message"), "name": item.get("name")})
+
+        creatives = MetaPublisher(account, user=request.user).publish(
+            data["page_id"], items, link_url=data.get("link_url") or "", placement=data.get("placement") or "feed"
+        )
+        return Response({"creatives": MetaAdCreativeSerializer(creatives, many=True).data})
+
+    def _meta_account(self, workspace_id, ad_account_id=None):
+        accounts = AdAccount.objects.filter(workspace_id=workspace_id, provider="meta")
+        if ad_account_id:
+            accounts = accounts.filter(external_account_id=ad_account_id)
+        return accounts.first()
+
+    def _workspace_asset(self, workspace_id, asset_id):
+        try:
+            return ContentAsset.objects.select_related("blob").filter(pk=asset_id, workspace_id=workspace_id).first()
+        except (ValueError, ValidationError):
+            return None
+
+    @action(detail=False, methods=["get"], url_path=r"meta/uploads/(?P<upload_id>[0-9a-f-]{36})")
+    def meta_upload_status(self, request, workspace_id=None, upload_id=None):
+        upload = get_object_or_404(MetaVideoUpload, pk=upload_id, workspace_id=workspace_id)
+        return Response(MetaVideoUploadSerializer(upload).data)
 
     @action(detail=False, methods=["get"], url_path="meta/pages")
     def meta_list_pages(self, request, workspace_id=None):
-        ad_account_id = request.GET.get("ad_account_id")
-        account = None
-        if ad_account_id:
-            account = AdAccount.objects.filter(workspace_id=workspace_id, provider="meta", external_account_id=ad_account_id).first()
-        else:
-            account = AdAccount.objects.filter(workspace_id=workspace_id, provider="meta").first()
+        account = self._meta_account(workspace_id, request.GET.get("ad_account_id"))
         if not account:
             return Response({"error": "no_meta_account"}, status=status.HTTP_400_BAD_REQUEST)
 
-        token = account.access_token
-        try:
-            resp = requests.get(
-                "https://graph.facebook.com/v20.0/me/accounts",
-                params={"fields": "id,name", "limit": 200, "access_token": token},
-                timeout=15,
-            )
-            data = resp.json()
-            if resp.status_code != 200:
-                return Response({"error": "pages_fetch_failed", "status": resp.status_code, "detail": data}, status=status.HTTP_502_BAD_GATEWAY)
-            pages = data.get("data") or []
-            return Response({"pages": pages})
-        except Exception as e:
-            return Response({"error": "pages_fetch_error", "detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        # Served from the cached inventory; only the first listing (or an
+        # explicit refresh) waits on Meta, stale ones refresh in the background
+        refreshing = False
+        if account.pages_synced_at is None or request.GET.get("refresh") in ("1", "true"):
+            try:
+                sync_pages(account)
+            except GraphError as e:
+                return Response({"error": "pages_fetch_failed", "status": e.status, "detail": str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        elif pages_are_stale(account):
+            refreshing = queue_pages_refresh(account)
+
+        pages = account.meta_pages.all()
+        search = request.GET.get("search")
+        if search:
+            pages = pages.filter(name__icontains=search)
+        return Response({
+            "pages": [{"id": page_id, "name": name, "category": category} for page_id, name, category in pages.values_list("page_id", "name", "category")],
+            "synced_at": account.pages_synced_at,
+            "refreshing": refreshing,
+        })
 
     @action(detail=False, methods=["get"], url_path="linkedin/start")
     def linkedin_start(self, request, workspace_id=None):
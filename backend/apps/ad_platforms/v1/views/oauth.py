@@ -9,6 +9,8 @@ import logging
 from urllib.parse import urlencode
 
 from apps.ad_platforms.models import AdAccount
+from apps.ad_platforms.services.graph import GraphClient, GraphError, GraphRequest
+from apps.ad_platforms.services.token_refresh import schedule_token_refresh
 logger = logging.getLogger(__name__)
 
 
@@ -246,8 +248,9 @@ def snapchat_callback(request):
         existing.metadata = {"raw": data}
         existing.status = "connected"
         existing.save(update_fields=["access_token", "refresh_token", "scopes", "metadata", "status", "updated_at"])
+        account = existing
     else:
-        AdAccount.objects.create(
+        account = AdAccount.objects.create(
             workspace_id=workspace_id,
             provider="snapchat",
             access_token=access_token,
@@ -256,6 +259,7 @@ def snapchat_callback(request):
             metadata={"raw": data},
             status="connected",
         )
+    schedule_token_refresh(account, data.get("expires_in"))
 
     if info:
         try:
@@ -307,36 +311,29 @@ def meta_callback(request):
     except Exception:
         return JsonResponse({"error": "token_exchange_failed"}, status=502)
 
+    # The long-lived token exchange and the ad account lookup only need the
+    # short-lived token, so both go in one batch call
     access_token = token_json.get("access_token")
-    try:
-        long_resp = requests.get(
-            "https://graph.facebook.com/v20.0/oauth/access_token",
-            params={
-                "grant_type": "fb_exchange_token",
-                "client_id": app_id,
-                "client_secret": app_secret,
-                "fb_exchange_token": access_token,
-            },
-            timeout=15,
-        )
-        long_json = long_resp.json()
-        if long_resp.status_code == 200 and long_json.get("access_token"):
-            access_token = long_json.get("access_token")
-    except Exception:
-        pass
+    long_json, acc_json = GraphClient(access_token, timeout=15).batch([
+        GraphRequest("GET", "oauth/access_token", params={
+            "grant_type": "fb_exchange_token",
+            "client_id": app_id,
+            "client_secret": app_secret,
+            "fb_exchange_token": access_token,
+        }),
+        GraphRequest("GET", "me/adaccounts", params={"fields": "name,account_id,account_status"}),
+    ])
+    expires_in = token_json.get("expires_in")
+    if isinstance(long_json, dict) and long_json.get("access_token"):
+        access_token = long_json.get("access_token")
+        expires_in = long_json.get("expires_in")
+    if isinstance(acc_json, GraphError):
+        return JsonResponse({"error": "ads_api_error", "status": acc_json.status, "detail": str(acc_json)}, status=502)
 
     try:
-        acc_resp = requests.get(
-            "https://graph.facebook.com/v20.0/me/adaccounts",
-            params={"fields": "name,account_id,account_status", "access_token": access_token},
-            timeout=15,
-        )
-        acc_json = acc_resp.json()
-        if acc_resp.status_code != 200:
-            return JsonResponse({"error": "ads_api_error", "status": acc_resp.status_code, "detail": acc_json}, status=502)
         accounts = acc_json.get("data") or []
         if not accounts:
-            return JsonResponse({"error": "no_ads_account", "status": acc_resp.status_code, "detail": acc_json}, status=400)
+            return JsonResponse({"error": "no_ads_account", "detail": acc_json}, status=400)
         first = accounts[0]
         ext_id = first.get("account_id")
         existing = AdAccount.objects.filter(workspace_id=workspace_id, provider="meta", external_account_id=ext_id).first()
@@ -346,9 +343,12 @@ def meta_callback(request):
             existing.scopes = []
             existing.metadata = {"ads_accounts": accounts}
             existing.status = "connected"
-            existing.save(update_fields=["account_name", "access_token", "scopes", "metadata", "status", "updated_at"])
+            # A new token can see a different set of pages
+            existing.pages_synced_at = None
+            existing.save(update_fields=["account_name", "access_token", "scopes", "metadata", "status", "pages_synced_at", "updated_at"])
+            account = existing
         else:
-            AdAccount.objects.create(
+            account = AdAccount.objects.create(
                 workspace_id=workspace_id,
                 provider="meta",
                 account_name=first.get("name"),
@@ -358,6 +358,7 @@ def meta_callback(request):
                 metadata={"ads_accounts": accounts},
                 status="connected",
             )
+        schedule_token_refresh(account, expires_in)
     except Exception:
         return JsonResponse({"error": "ads_accounts_fetch_failed"}, status=502)
 
@@ -451,18 +452,22 @@ def linkedin_callback(request):
             existing.scopes = []
             existing.metadata = {"me": me_json}
             existing.status = "connected"
-            existing.save(update_fields=["account_name", "access_token", "scopes", "metadata", "status", "updated_at"])
+            existing.refresh_token = token_json.get("refresh_token") or existing.refresh_token
+            existing.save(update_fields=["account_name", "access_token", "refresh_token", "scopes", "metadata", "status", "updated_at"])
+            account = existing
         else:
-            AdAccount.objects.create(
+            account = AdAccount.objects.create(
                 workspace_id=workspace_id,
                 provider="linkedin",
                 account_name=account_name,
                 external_account_id=external_id,
                 access_token=access_token,
+                refresh_token=token_json.get("refresh_token"),
                 scopes=[],
                 metadata={"me": me_json},
                 status="connected",
             )
+        schedule_token_refresh(account, token_json.get("expires_in"))
     except Exception:
         return JsonResponse({"error": "linkedin_connect_failed"}, status=502)
 
@@ -542,13 +547,15 @@ def youtube_callback(request):
         if existing:
             existing.account_name = channel_title or channel_id
             existing.access_token = access_token
-            existing.refresh_token = refresh_token
+            # Google only returns a refresh token on first consent
+            existing.refresh_token = refresh_token or existing.refresh_token
             existing.scopes = scopes
             existing.metadata = {"channel": first, "raw": token_json}
             existing.status = "connected"
             existing.save(update_fields=["account_name", "access_token", "refresh_token", "scopes", "metadata", "status", "updated_at"])
+            account = existing
         else:
-            AdAccount.objects.create(
+            account = AdAccount.objects.create(
                 workspace_id=workspace_id,
                 provider="youtube",
                 account_name=channel_title or channel_id,
@@ -559,6 +566,7 @@ def youtube_callback(request):
                 metadata={"channel": first, "raw": token_json},
                 status="connected",
             )
+        schedule_token_refresh(account, token_json.get("expires_in"))
     except Exception:
         return JsonResponse({"error": "youtube_connect_failed"}, status=502)
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from apps.content_creation.models import (
     ContentAsset, ContentTemplate, GenerationJob, 
-    VideoProject, ProductAnalysis
+    VideoProject, ProductAnalysis, ProductCrawl, MediaBlob
 )
 
 
@@ -10,14 +10,14 @@ class ContentAssetAdmin(admin.ModelAdmin):
     list_display = ['name', 'type', 'workspace', 'language', 'generated_by', 'created_at']
     list_filter = ['type', 'language', 'generated_by', 'created_at']
     search_fields = ['name', 'generation_prompt']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'blob', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'type', 'workspace', 'language')
         }),
         ('File Details', {
-            'fields': ('file_url', 'file_size', 'mime_type', 'metadata')
+            'fields': ('file_url', 'file_size', 'mime_type', 'blob', 'metadata')
         }),
         ('Generation Details', {
             'fields': ('generated_by', 'generation_prompt')
@@ -119,10 +119,26 @@ class ProductAnalysisAdmin(admin.ModelAdmin):
             'fields': ('description', 'price', 'currency', 'images', 'features')
         }),
         ('Analysis Data', {
-            'fields': ('analysis_data',)
+            'fields': ('analysis_data', 'crawl')
         }),
         ('Timestamps', {
             'fields': ('created_at',),
             'classes': ('collapse',)
         })
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ProductCrawl)
+class ProductCrawlAdmin(admin.ModelAdmin):
+    list_display = ['id', 'workspace', 'store_url', 'status', 'total', 'succeeded', 'failed', 'skipped', 'created_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'started_at', 'completed_at']
+    exclude = ['urls']
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'storage_name', 'size', 'mime_type', 'ref_count', 'created_at']
+    list_filter = ['mime_type', 'created_at']
+    search_fields = ['sha256', 'storage_name', 'source_url']
+    readonly_fields = ['id', 'sha256', 'storage_name', 'size', 'mime_type', 'source_url', 'ref_count', 'created_at']
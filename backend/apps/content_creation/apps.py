@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class ContentCreationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.content_creation'
\ No newline at end of file
+    name = 'apps.content_creation'
+
+    def ready(self):
+        from apps.content_creation import signals  # noqa: F401
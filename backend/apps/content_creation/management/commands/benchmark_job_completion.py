@@ -0,0 +1,72 @@
+import time
+import uuid
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from apps.content_creation.models import GenerationJob, VideoProject
+from apps.content_creation.services.generation_service import GenerationService
+from apps.workspaces.models import Workspace
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure complete_generation_job cost as the number of in-flight video projects grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=[10, 100, 1000, 10000],
+            help='Numbers of in-flight (generating) projects to benchmark with'
+        )
+        parser.add_argument('--samples', type=int, default=20, help='Completions timed per size')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'in-flight':>10} {'avg ms':>10} {'queries':>8}")
+        for size in options['sizes']:
+            avg_ms, queries = self._run(size, options['samples'])
+            self.stdout.write(f"{size:>10} {avg_ms:>10.2f} {queries:>8}")
+
+    def _run(self, size, samples):
+        """Benchmark inside a transaction that is rolled back afterwards"""
+        result = {}
+        try:
+            with transaction.atomic():
+                result['value'] = self._measure(size, samples)
+                raise Rollback
+        except Rollback:
+            pass
+        return result['value']
+
+    def _measure(self, size, samples):
+        suffix = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(
+            username=f'bench-{suffix}', email=f'bench-{suffix}@example.com', password=None
+        )
+        workspace = Workspace.objects.create(name='Benchmark', slug=f'benchmark-{suffix}', owner=user)
+
+        projects = VideoProject.objects.bulk_create([
+            VideoProject(workspace=workspace, user=user, name=f'Project {i}', status='generating')
+            for i in range(size)
+        ])
+        # Complete jobs that belong to projects at the end of the table
+        jobs = GenerationJob.objects.bulk_create([
+            GenerationJob(
+                workspace=workspace, user=user, video_project=project,
+                type='video', provider='heygen', prompt='benchmark', status='processing'
+            )
+            for project in projects[-samples:]
+        ])
+
+        service = GenerationService()
+        result_data = {'file_url': 'https://example.com/video.mp4', 'mime_type': 'video/mp4'}
+        elapsed = 0.0
+        with CaptureQueriesContext(connection) as queries:
+            for job in jobs:
+                started = time.perf_counter()
+                service.complete_generation_job(job, result_data)
+                elapsed += time.perf_counter() - started
+
+        return elapsed * 1000 / len(jobs), len(queries.captured_queries) // len(jobs)
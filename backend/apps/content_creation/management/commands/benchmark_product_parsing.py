@@ -0,0 +1,86 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from apps.content_creation.services.product_analyzer import (
+    COMMON_SELECTORS, DEFAULT_PARSER, PLATFORM_SELECTORS, ProductAnalyzer, SoupBackend
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'fixtures', 'product_pages')
+
+# Saved page per platform, with a URL that routes it to that platform's selectors
+FIXTURE_URLS = {
+    'shopify': 'https://linen-co.myshopify.com/products/linen-summer-shirt',
+    'salla': 'https://oud-store.salla.sa/p/royal-oud',
+    'zid': 'https://dates.zid.sa/products/premium-dates-box',
+    'amazon': 'https://www.amazon.sa/dp/B0EXAMPLE',
+    'noon': 'https://www.noon.com/saudi-en/smart-watch-series-9/p/',
+    'generic': 'https://ceramics.example.com/item/handmade-mug',
+}
+
+BASELINE = 'baseline'
+
+
+class SelectorStringBackend(SoupBackend):
+    """The scraper before parser backends: html.parser, with selectors passed to soup.select as strings"""
+
+    def __init__(self):
+        super().__init__('html.parser')
+        self.name = BASELINE
+
+    def compile(self, selector: str):
+        return selector
+
+    def select(self, selector, document) -> list:
+        return document.select(selector)
+
+    def select_one(self, selector, document):
+        return document.select_one(selector)
+
+
+def baseline_analyzer() -> ProductAnalyzer:
+    analyzer = ProductAnalyzer(parser='html.parser')
+    analyzer.backend = SelectorStringBackend()
+    analyzer.selectors, analyzer.common_selectors = PLATFORM_SELECTORS, COMMON_SELECTORS
+    return analyzer
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure selector-scraper parse + extract time per saved product page, '
+        'against the baseline scraper (html.parser with string selectors) and each given parser backend'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--parsers', nargs='+', default=[DEFAULT_PARSER],
+            help="Parser backends to time against the baseline ('lxml' or a BeautifulSoup tree builder)"
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Runs timed per page and parser')
+
+    def handle(self, *args, **options):
+        parsers = [BASELINE] + [name for name in dict.fromkeys(options['parsers']) if name != BASELINE]
+        header = f"{'page':<10} {'KB':>6}" + ''.join(f" {name + ' ms':>16}" for name in parsers)
+        self.stdout.write(f"{header} {'speedup':>8} {'same result':>12}")
+
+        for platform, url in FIXTURE_URLS.items():
+            with open(os.path.join(FIXTURES_DIR, f'{platform}.html'), 'rb') as f:
+                page = f.read()
+
+            timings, results = [], []
+            for name in parsers:
+                analyzer = baseline_analyzer() if name == BASELINE else ProductAnalyzer(parser=name)
+                elapsed, result = self._measure(analyzer, page, url, options['iterations'])
+                timings.append(elapsed)
+                results.append(result)
+
+            row = f"{platform:<10} {len(page) / 1024:>6.0f}" + ''.join(f" {ms:>16.2f}" for ms in timings)
+            same = all(result == results[0] for result in results)
+            self.stdout.write(f"{row} {timings[0] / timings[-1]:>7.1f}x {'yes' if same else 'NO':>12}")
+
+    def _measure(self, analyzer, page, url, iterations):
+        # Selector path only: these pages carry no structured data on purpose
+        result = analyzer._scrape_with_selectors(page, url)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            analyzer._scrape_with_selectors(page, url)
+        return (time.perf_counter() - started) * 1000 / iterations, result
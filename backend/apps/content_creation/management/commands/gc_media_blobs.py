@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+from apps.content_creation.services.blob_store import collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = 'Delete stored media blobs no longer referenced by any content asset'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-seconds', type=int, default=3600,
+            help='Keep unreferenced blobs younger than this (ingestions may still attach them)'
+        )
+        parser.add_argument('--recount', action='store_true', help='Rebuild reference counts from assets first')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            fixed = recount_references()
+            self.stdout.write(f"Corrected reference counts on {fixed} blobs")
+
+        storage = storages[settings.CONTENT_GENERATION.get('MEDIA_INGEST', {}).get('STORAGE', 'generated_media')]
+        removed = collect_garbage(storage, options['grace_seconds'], options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} unreferenced blobs"))
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="video_project",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="generation_jobs",
+                to="content_creation.videoproject",
+            ),
+        ),
+    ]
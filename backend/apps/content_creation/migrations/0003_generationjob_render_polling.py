@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0002_generationjob_video_project"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="external_id",
+            field=models.CharField(
+                blank=True, db_index=True, default="", max_length=255
+            ),
+        ),
+        migrations.AddField(
+            model_name="generationjob",
+            name="next_poll_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="generationjob",
+            name="poll_attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="generationjob",
+            index=models.Index(
+                fields=["status", "next_poll_at"], name="generation_job_poll_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0003_generationjob_render_polling"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("storage_name", models.CharField(max_length=1024)),
+                ("size", models.BigIntegerField()),
+                ("mime_type", models.CharField(blank=True, max_length=100, null=True)),
+                (
+                    "source_url",
+                    models.CharField(
+                        blank=True, db_index=True, default="", max_length=2048
+                    ),
+                ),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "media_blobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="contentasset",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="assets",
+                to="content_creation.mediablob",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0004_mediablob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentasset",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
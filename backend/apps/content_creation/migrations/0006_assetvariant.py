@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0005_contentasset_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssetVariant",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("spec", models.CharField(max_length=50)),
+                ("spec_hash", models.CharField(max_length=16)),
+                ("storage_name", models.CharField(max_length=1024)),
+                ("size", models.BigIntegerField()),
+                ("mime_type", models.CharField(max_length=100)),
+                ("width", models.IntegerField()),
+                ("height", models.IntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "blob",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="variants",
+                        to="content_creation.mediablob",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "asset_variants",
+                "ordering": ["-created_at"],
+                "unique_together": {("blob", "spec")},
+            },
+        ),
+    ]
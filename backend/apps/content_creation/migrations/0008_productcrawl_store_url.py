@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0007_productcrawl"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productcrawl",
+            name="store_url",
+            field=models.URLField(blank=True, max_length=500, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0008_productcrawl_store_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productanalysis",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="productanalysis",
+            name="etag",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="productanalysis",
+            name="fetched_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="productanalysis",
+            name="fetched_url",
+            field=models.URLField(blank=True, max_length=1000, null=True),
+        ),
+        migrations.AddField(
+            model_name="productanalysis",
+            name="last_modified",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="productcrawl",
+            name="unchanged",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0009_productanalysis_fetch_validators"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mediablob",
+            name="variant_errors",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="mediablob",
+            name="variants_encoding_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0010_mediablob_variant_encoding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="mediablob",
+            name="source_etag",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
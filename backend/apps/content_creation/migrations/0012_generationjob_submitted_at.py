@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content_creation", "0011_mediablob_source_etag"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generationjob",
+            name="submitted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -4,6 +4,55 @@ from django.conf import settings
 from apps.workspaces.models import Workspace
 
 
+class MediaBlob(models.Model):
+    """Stored media file shared by every asset with the same bytes"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sha256 = models.CharField(max_length=64, unique=True)
+    storage_name = models.CharField(max_length=1024)
+    size = models.BigIntegerField()
+    mime_type = models.CharField(max_length=100, blank=True, null=True)
+    # Provider URL first copied from and the ETag it had; the same URL and ETag reuse the blob without downloading
+    source_url = models.CharField(max_length=2048, blank=True, default='', db_index=True)
+    source_etag = models.CharField(max_length=255, blank=True, default='')
+    ref_count = models.PositiveIntegerField(default=0)
+    # Lease held by the worker encoding missing variants, and the last encode error per spec
+    variants_encoding_until = models.DateTimeField(blank=True, null=True)
+    variant_errors = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_blobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class AssetVariant(models.Model):
+    """Platform-spec encoding of a blob (e.g. 9:16 H.264 for TikTok), reused across publishes"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name='variants')
+    spec = models.CharField(max_length=50)
+    # Fingerprint of the spec parameters; a changed spec is transcoded again
+    spec_hash = models.CharField(max_length=16)
+    storage_name = models.CharField(max_length=1024)
+    size = models.BigIntegerField()
+    mime_type = models.CharField(max_length=100)
+    width = models.IntegerField()
+    height = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'asset_variants'
+        ordering = ['-created_at']
+        unique_together = ['blob', 'spec']
+
+    def __str__(self):
+        return f"{self.spec} of {self.blob_id}"
+
+
 class ContentAsset(models.Model):
     ASSET_TYPES = [
         ('image', 'Image'),
@@ -25,6 +74,9 @@ class ContentAsset(models.Model):
     file_size = models.IntegerField(blank=True, null=True)
     mime_type = models.CharField(max_length=100, blank=True, null=True)
     metadata = models.JSONField(default=dict, blank=True)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='assets')
+    # Library previews (WebP thumbnails, video poster and preview clip) built from the stored file
+    renditions = models.JSONField(default=dict, blank=True)
     generated_by = models.CharField(max_length=100, blank=True, null=True)
     generation_prompt = models.TextField(blank=True, null=True)
     language = models.CharField(max_length=10, choices=LANGUAGES, default='ar')
@@ -124,13 +176,22 @@ class GenerationJob(models.Model):
     parameters = models.JSONField(default=dict, blank=True)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
     result_asset = models.ForeignKey(ContentAsset, on_delete=models.SET_NULL, null=True, blank=True)
+    video_project = models.ForeignKey('VideoProject', on_delete=models.SET_NULL, null=True, blank=True, related_name='generation_jobs')
     error_message = models.TextField(blank=True, null=True)
+    # Provider-side render tracking for asynchronous (video) jobs
+    external_id = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    next_poll_at = models.DateTimeField(null=True, blank=True)
+    poll_attempts = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'generation_jobs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_poll_at'], name='generation_job_poll_idx'),
+        ]
 
     def __str__(self):
         return f"{self.type} job - {self.status}"
@@ -168,6 +229,47 @@ class VideoProject(models.Model):
         return f"{self.name} - {self.status}"
 
 
+class ProductCrawl(models.Model):
+    """Bulk product analysis run over many URLs"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='product_crawls')
+    urls = models.JSONField(default=list)
+    # Sync a whole store's catalog instead of a URL list; urls is filled from its sitemap if needed
+    store_url = models.URLField(max_length=500, blank=True, null=True)
+    # Re-analyze URLs that already have an analysis instead of skipping them
+    refresh = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    # Refreshed URLs that had not changed (304 or same content); also counted in succeeded
+    unchanged = models.PositiveIntegerField(default=0)
+    # Last error per failed URL, capped so huge catalogs don't bloat the row
+    errors = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'product_crawls'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Crawl {self.id} ({self.status}, {self.succeeded + self.failed}/{self.total})"
+
+
 class ProductAnalysis(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='product_analyses')
@@ -181,6 +283,13 @@ class ProductAnalysis(models.Model):
     category = models.CharField(max_length=255, blank=True, null=True)
     brand = models.CharField(max_length=255, blank=True, null=True)
     analysis_data = models.JSONField(default=dict, blank=True)
+    crawl = models.ForeignKey(ProductCrawl, on_delete=models.SET_NULL, null=True, blank=True, related_name='analyses')
+    # Validators of the last fetch (of the page or its product JSON) for conditional refreshes
+    fetched_url = models.URLField(max_length=1000, blank=True, null=True)
+    etag = models.CharField(max_length=255, blank=True, null=True)
+    last_modified = models.CharField(max_length=64, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    fetched_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
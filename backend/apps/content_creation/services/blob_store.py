@@ -0,0 +1,105 @@
+import logging
+from datetime import timedelta
+from typing import Callable, Optional, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from apps.content_creation.models import ContentAsset, MediaBlob
+from apps.content_creation.services.renditions import delete_renditions
+from apps.content_creation.services.transcoding import delete_variants
+
+logger = logging.getLogger(__name__)
+
+
+def find_blob_for_url(source_url: str, head: Callable[[str], Tuple[str, Optional[int]]]) -> Optional[MediaBlob]:
+    """Blob already copied from this provider URL, if the provider still serves the same file there.
+
+    Cached generations repeat URLs, but a provider may also put new bytes
+    behind an old URL, so the URL is only a hint: `head` returns the URL's
+    current (ETag, Content-Length), and both must match the stored blob.
+    Nothing is requested for a URL never copied before.
+    """
+    candidates = MediaBlob.objects.filter(source_url=source_url).exclude(source_etag='')
+    if not candidates.exists():
+        return None
+    etag, size = head(source_url)
+    if not etag or size is None:
+        return None
+    return candidates.filter(source_etag=etag[:255], size=size).first()
+
+
+def register_blob(
+    sha256: str, storage_name: str, size: int, mime_type: Optional[str], source_url: str = '', source_etag: str = ''
+) -> Tuple[MediaBlob, bool]:
+    """Get the blob for these bytes, creating it from the stored file if new.
+
+    Returns (blob, created). When created is False the caller's freshly stored
+    file is a duplicate and should be deleted.
+    """
+    defaults = {
+        'storage_name': storage_name, 'size': size, 'mime_type': mime_type,
+        'source_url': source_url, 'source_etag': source_etag[:255],
+    }
+    try:
+        with transaction.atomic():
+            return MediaBlob.objects.get_or_create(sha256=sha256, defaults=defaults)
+    except IntegrityError:
+        # Another worker registered the same bytes concurrently
+        return MediaBlob.objects.get(sha256=sha256), False
+
+
+def attach_blob(asset: ContentAsset, blob: MediaBlob, storage) -> bool:
+    """Point the asset at a blob and take a reference; False if the blob was collected meanwhile"""
+    with transaction.atomic():
+        if not MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1):
+            return False
+        if asset.blob_id:
+            release_blob(asset.blob_id)
+
+        asset.blob = blob
+        asset.file_url = storage.url(blob.storage_name)
+        asset.file_size = blob.size
+        asset.mime_type = blob.mime_type or asset.mime_type
+        asset.save(update_fields=['blob', 'file_url', 'file_size', 'mime_type', 'metadata', 'updated_at'])
+    return True
+
+
+def release_blob(blob_id):
+    """Drop one reference; blobs at zero are removed by collect_garbage"""
+    MediaBlob.objects.filter(pk=blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+
+def recount_references() -> int:
+    """Reset ref_count from the assets actually pointing at each blob; returns rows fixed"""
+    fixed = 0
+    for blob in MediaBlob.objects.annotate(actual=Count('assets')).exclude(ref_count=F('actual')):
+        fixed += MediaBlob.objects.filter(pk=blob.pk).update(ref_count=blob.actual)
+    return fixed
+
+
+def collect_garbage(storage, grace_seconds: int = 3600, dry_run: bool = False) -> int:
+    """Delete unreferenced blobs and their files; returns how many were removed.
+
+    Blobs younger than the grace period are kept so an ingestion that has just
+    registered a blob can still attach it.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    candidates = MediaBlob.objects.filter(ref_count=0, created_at__lt=cutoff, assets__isnull=True)
+
+    removed = 0
+    for blob in candidates.iterator():
+        if dry_run:
+            removed += 1
+            continue
+        # Re-check in the delete itself so a reference taken meanwhile wins
+        deleted, _ = MediaBlob.objects.filter(pk=blob.pk, ref_count=0, assets__isnull=True).delete()
+        if not deleted:
+            continue
+        try:
+            storage.delete(blob.storage_name)
+            delete_renditions(storage, blob.sha256)
+            delete_variants(storage, blob.sha256)
+        except Exception as e:
+            logger.warning("Could not delete blob file %s: %s", blob.storage_name, e)
+        removed += 1
+    return removed
@@ -0,0 +1,29 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List
+from django.conf import settings
+
+
+def provider_concurrency(provider_name: str) -> int:
+    """Maximum number of in-flight calls allowed to a provider within one fan-out"""
+    limits = settings.CONTENT_GENERATION.get('PROVIDER_CONCURRENCY', {})
+    return max(1, limits.get(provider_name, limits.get('default', 4)))
+
+
+async def gather_limited(provider_name: str, calls: Iterable[Callable[[], Awaitable[Any]]]) -> List[Any]:
+    """Run all calls concurrently, capped at the provider's concurrency limit.
+
+    Results keep the order of `calls`; a failing call yields its exception
+    instead of cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(provider_concurrency(provider_name))
+
+    async def _run(call):
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*(_run(call) for call in calls), return_exceptions=True)
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Run a coroutine to completion from synchronous code (workers, commands)"""
+    return asyncio.run(coro)
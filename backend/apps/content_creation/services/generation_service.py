@@ -1,11 +1,57 @@
-import uuid
-from typing import List, Dict, Any
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from apps.content_creation.models import GenerationJob, ContentAsset, VideoProject
 from apps.content_creation.services.providers.openai_provider import OpenAIProvider
 from apps.content_creation.services.providers.heygen_provider import HeyGenProvider
 from apps.content_creation.services.providers.stability_provider import StabilityProvider
-from apps.content_creation.services.providers.huggingface_provider import HuggingFaceProvider
+from apps.content_creation.services.providers.huggingface_provider import (
+    HuggingFaceProvider, is_variation_line, parse_variations
+)
+from apps.content_creation.services.result_cache import generation_cache
+from apps.content_creation.services.concurrency import gather_limited, run_async
+from apps.content_creation.services.provider_router import ProviderRouter
+from apps.content_creation.services.rate_limiter import RateLimitExceeded, rate_limiter
+from apps.content_creation.services.job_events import publish_job_event
+from apps.content_creation.services.video_poller import first_poll_delay
+from apps.content_creation.services.media_ingest import should_ingest
+
+logger = logging.getLogger(__name__)
+
+
+class JobEventStream:
+    """Events of a job generated while they are consumed.
+    
+    Closing the stream before the job finished (the client went away, even
+    before the first event) fails the job, so it never stays `processing`.
+    """
+    
+    def __init__(self, job: GenerationJob, events: Iterator[Dict[str, Any]], fail: Callable[[GenerationJob, str], None]):
+        self.job = job
+        self._events = events
+        self._fail = fail
+        self._render = None
+    
+    def map(self, function: Callable[[Dict[str, Any]], Any]) -> 'JobEventStream':
+        """Yield `function(event)` instead of each event; returns the same (closable) stream"""
+        self._render = function
+        return self
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        event = next(self._events)
+        return self._render(event) if self._render else event
+    
+    def close(self):
+        self._events.close()
+        if self.job.status not in ('completed', 'failed'):
+            self._fail(self.job, 'Stream closed before completion')
 
 
 class GenerationService:
@@ -16,6 +62,10 @@ class GenerationService:
         self.video_provider = HeyGenProvider()
         self.image_provider = StabilityProvider()
         self.huggingface_provider = HuggingFaceProvider()
+        self.text_router = ProviderRouter(
+            providers={'openai': self.text_provider, 'huggingface': self.huggingface_provider},
+            order=settings.CONTENT_GENERATION.get('PROVIDER_ROUTING', {}).get('TEXT_PROVIDERS', [])
+        )
     
     def generate_video_from_project(self, project: VideoProject) -> GenerationJob:
         """Generate video from a video project"""
@@ -24,6 +74,7 @@ class GenerationService:
         job = GenerationJob.objects.create(
             workspace=project.workspace,
             user=project.user,
+            video_project=project,
             type='video',
             provider='heygen',
             prompt=self._build_video_prompt(project),
@@ -40,23 +91,22 @@ class GenerationService:
         project.status = 'generating'
         project.save()
         
-        # Queue the generation task (would be handled by Celery in production)
+        # Queue the generation task on the video worker queue
         self._queue_video_generation(job)
         
         return job
     
     def generate_video_variations(self, project: VideoProject, count: int = 1) -> List[GenerationJob]:
         """Generate multiple video variations"""
-        jobs = []
-        
-        for i in range(count):
-            job = GenerationJob.objects.create(
-                workspace=project.workspace,
-                user=project.user,
-                type='video',
-                provider='heygen',
-                prompt=self._build_video_prompt(project, variation=i+1),
-                parameters={
+        return self.create_jobs_bulk([
+            {
+                'workspace_id': project.workspace_id,
+                'user': project.user,
+                'video_project': project,
+                'type': 'video',
+                'provider': 'heygen',
+                'prompt': self._build_video_prompt(project, variation=i + 1),
+                'parameters': {
                     'product_url': project.product_url,
                     'script': project.script,
                     'avatar_settings': project.avatar_settings,
@@ -64,34 +114,128 @@ class GenerationService:
                     'language': project.language,
                     'variation': i + 1
                 }
+            }
+            for i in range(count)
+        ])
+    
+    def generate_videos_bulk(self, workspace_id: str, user, items: List[Dict[str, Any]]):
+        """Create a video project and generation job per item (catalog-wide campaigns).
+        
+        Projects and jobs are written with two bulk inserts in one transaction and
+        all jobs are queued with a single broker message.
+        """
+        projects = [
+            VideoProject(
+                workspace_id=workspace_id,
+                user=user,
+                name=f"Video - {item.get('product_url') or 'Custom Script'}",
+                product_url=item.get('product_url'),
+                script=item.get('script'),
+                avatar_settings=item.get('avatar_settings') or {},
+                brand_settings=item.get('brand_settings') or {},
+                language=item.get('language', 'ar'),
+                status='generating'
             )
-            jobs.append(job)
-            self._queue_video_generation(job)
+            for item in items
+        ]
+        
+        with transaction.atomic():
+            VideoProject.objects.bulk_create(projects)
+            jobs = self.create_jobs_bulk([
+                {
+                    'workspace_id': workspace_id,
+                    'user': user,
+                    'video_project': project,
+                    'type': 'video',
+                    'provider': 'heygen',
+                    'prompt': self._build_video_prompt(project),
+                    'parameters': {
+                        'product_url': project.product_url,
+                        'script': project.script,
+                        'avatar_settings': project.avatar_settings,
+                        'brand_settings': project.brand_settings,
+                        'language': project.language
+                    }
+                }
+                for project in projects
+            ])
+        
+        return projects, jobs
+    
+    def create_jobs_bulk(self, job_specs: List[Dict[str, Any]]) -> List[GenerationJob]:
+        """Insert many generation jobs at once and queue them together.
+        
+        Each spec holds GenerationJob field values. Jobs are inserted with one
+        bulk_create inside a transaction and dispatched after commit with one
+        broker message per worker queue.
+        """
+        jobs = [GenerationJob(**spec) for spec in job_specs]
+        if not jobs:
+            return jobs
+        
+        with transaction.atomic():
+            GenerationJob.objects.bulk_create(jobs)
+            self._queue_batch(jobs)
         
         return jobs
     
     def generate_text(self, workspace_id: str, user, type: str, **kwargs) -> GenerationJob:
         """Generate text content"""
         
+        job = self._create_text_job(workspace_id, user, type, **kwargs)
+        self._queue_text_generation(job)
+        return job
+    
+    def stream_text(self, workspace_id: str, user, type: str, **kwargs) -> JobEventStream:
+        """Generate text in the request, yielding output as the provider streams it.
+        
+        Events: `delta` (raw tokens), `variation` (each finished list item) and a
+        final `completed` with the persisted asset, or `failed`.
+        """
+        job = self._create_text_job(workspace_id, user, type, provider='huggingface', **kwargs)
+        return self.run_streaming_text_generation(job)
+    
+    def generate_text_batch(self, workspace_id: str, user, type: str, product_contexts: List[str], **kwargs) -> List[GenerationJob]:
+        """Generate text for many products (catalog-scale copy).
+        
+        One job is created per product context so each result gets its own
+        asset, but workers pack the jobs into a few structured provider requests.
+        """
+        return self.create_jobs_bulk([
+            {
+                'workspace_id': workspace_id,
+                'user': user,
+                'type': 'text',
+                'provider': kwargs.get('provider', 'openai'),
+                'prompt': self._build_text_prompt(type, product_context=product_context, **kwargs),
+                'parameters': {
+                    **self._text_job_parameters(type, product_context=product_context, **kwargs),
+                    'packed': True
+                }
+            }
+            for product_context in product_contexts
+        ])
+    
+    def _create_text_job(self, workspace_id: str, user, type: str, **kwargs) -> GenerationJob:
         prompt = self._build_text_prompt(type, **kwargs)
         
-        job = GenerationJob.objects.create(
+        return GenerationJob.objects.create(
             workspace_id=workspace_id,
             user=user,
             type='text',
             provider=kwargs.get('provider', 'openai'),
             prompt=prompt,
-            parameters={
-                'text_type': type,
-                'tone': kwargs.get('tone', 'professional'),
-                'language': kwargs.get('language', 'ar'),
-                'variations_count': kwargs.get('variations_count', 3),
-                'product_context': kwargs.get('product_context', '')
-            }
+            parameters=self._text_job_parameters(type, **kwargs)
         )
-        
-        self._queue_text_generation(job)
-        return job
+    
+    def _text_job_parameters(self, type: str, **kwargs) -> Dict[str, Any]:
+        return {
+            'text_type': type,
+            'tone': kwargs.get('tone', 'professional'),
+            'language': kwargs.get('language', 'ar'),
+            'variations_count': kwargs.get('variations_count', 3),
+            'product_context': kwargs.get('product_context', '')
+        }
     
     def generate_image(self, workspace_id: str, user, **kwargs) -> GenerationJob:
         """Generate image content"""
@@ -149,119 +293,472 @@ class GenerationService:
         return prompts.get(text_type, f"Generate {text_type} content in {language_name}")
     
     def _queue_video_generation(self, job: GenerationJob):
-        """Queue video generation task (placeholder for Celery task)"""
-        # In production, this would dispatch to Celery
-        # For now, we'll mark it as processing
-        job.status = 'processing'
-        job.save()
-        
-        # Simulate async processing
-        print(f"Queued video generation job: {job.id}")
+        """Queue video generation task on the generation.video worker queue"""
+        self._enqueue(job)
     
     def _queue_text_generation(self, job: GenerationJob):
-        """Queue text generation task (placeholder for Celery task)"""
-        job.status = 'processing'
-        job.save()
-        print(f"Queued text generation job: {job.id}")
+        """Queue text generation task on the generation.text worker queue"""
+        self._enqueue(job)
+    
+    def _queue_image_generation(self, job: GenerationJob):
+        """Queue image generation task on the generation.image worker queue"""
+        self._enqueue(job)
+    
+    def _queue_batch(self, jobs: List[GenerationJob]):
+        """Queue many jobs with one task per worker queue once the transaction commits"""
+        from apps.content_creation.tasks import enqueue_generation_batch
+        transaction.on_commit(lambda: enqueue_generation_batch(jobs))
+    
+    def _queue_media_ingest(self, asset: ContentAsset):
+        """Copy the provider's file into our storage once the asset is committed"""
+        from apps.content_creation.tasks import ingest_asset_media, _send
+        transaction.on_commit(lambda: _send(ingest_asset_media, [str(asset.id)]))
+    
+    def _enqueue(self, job: GenerationJob):
+        """Dispatch the job to Celery once the surrounding transaction commits"""
+        from apps.content_creation.tasks import enqueue_generation_job
+        transaction.on_commit(lambda: enqueue_generation_job(job))
+    
+    def fan_out(self, provider_name: str, calls: List[Callable[[], Awaitable[Any]]]) -> List[Any]:
+        """Issue async provider calls concurrently with the provider's concurrency cap.
+        
+        Blocks until every call finishes; failed calls return their exception.
+        """
+        return run_async(gather_limited(provider_name, calls))
+    
+    def run_text_generation(self, job: GenerationJob):
+        """Execute a queued text generation job (runs inside a worker)"""
+        self._mark_processing(job)
+        
+        if job.provider not in self.text_router.providers:
+            self._fail_job(job, f"Unsupported text provider: {job.provider}")
+            return
         
-        # Synchronous execution for R&D
         try:
-            result = None
-            if job.provider == 'huggingface':
-                result = self.huggingface_provider.generate_text(
-                    job.prompt,
-                    **job.parameters
-                )
-            elif job.provider == 'openai':
-                result = self.text_provider.generate_text(
-                    job.prompt,
-                    **job.parameters
-                )
+            routing = {}
             
-            if result:
-                if result.get('success'):
-                    # Save results as a text file asset (simulated)
-                    import json
-                    
-                    # Convert content list to a single string for storage
-                    content_text = "\n\n".join(result.get('content', []))
-                    
-                    # Store as metadata in the asset
-                    asset_data = {
-                        'file_url': '',  # No actual file upload in thi synch mode
-                        'file_size': len(content_text),
-                        'mime_type': 'text/plain',
-                        'metadata': {
-                            'content': result.get('content'),
-                            'provider_metadata': result.get('metadata')
-                        }
+            def call_provider(name, provider):
+                rate_limiter.acquire(name, job.workspace_id)
+                return provider.generate_text(job.prompt, **job.parameters)
+            
+            def routed_call():
+                result, decision = self.text_router.call(job.provider, call_provider)
+                routing.update(decision)
+                return result
+            
+            # A backup provider's output must not be served later as the requested one's
+            result, cache_hit = self._cached_provider_call(
+                self.text_router.providers[job.provider], job, routed_call,
+                cacheable=lambda: routing.get('provider') == job.provider
+            )
+            if routing:
+                job.parameters = {**job.parameters, 'routing': routing}
+                job.save(update_fields=['parameters'])
+            
+            if result.get('success'):
+                # Convert content list to a single string for storage
+                content_text = "\n\n".join(result.get('content', []))
+                
+                # Store as metadata in the asset
+                asset_data = {
+                    'file_url': '',
+                    'file_size': len(content_text),
+                    'mime_type': 'text/plain',
+                    'generated_by': routing.get('provider') or job.provider,
+                    'metadata': {
+                        'content': result.get('content'),
+                        'provider_metadata': result.get('metadata'),
+                        'cache_hit': cache_hit,
+                        'routing': routing or None
                     }
+                }
+                
+                self.complete_generation_job(job, asset_data)
+            else:
+                self._fail_job(job, result.get('error', 'Unknown provider error'))
+                
+        except RateLimitExceeded:
+            self._mark_pending(job)
+            raise
+        except Exception as e:
+            logger.exception("Text generation job %s failed", job.id)
+            self._fail_job(job, str(e))
+    
+    def run_packed_text_generations(self, jobs: List[GenerationJob]):
+        """Run packed text jobs with a few structured requests (runs inside a worker).
+        
+        Jobs sharing provider and generation settings are packed ITEMS_PER_REQUEST
+        at a time. Items the provider returned unusable output for are retried
+        in a smaller request; everything else completes from the first one.
+        """
+        config = settings.CONTENT_GENERATION.get('TEXT_BATCH', {})
+        items_per_request = config.get('ITEMS_PER_REQUEST', 25)
+        max_attempts = config.get('MAX_ATTEMPTS', 3)
+        
+        groups = {}
+        for job in jobs:
+            if job.provider not in self.text_router.providers:
+                self._fail_job(job, f"Unsupported text provider: {job.provider}")
+                continue
+            settings_key = tuple(
+                job.parameters.get(name) for name in ('text_type', 'tone', 'language', 'variations_count')
+            )
+            groups.setdefault((job.provider, settings_key), []).append(job)
+        
+        for group in groups.values():
+            pending = self._complete_cached_text_jobs(group)
+            for start in range(0, len(pending), items_per_request):
+                self._run_text_pack(pending[start:start + items_per_request], max_attempts)
+    
+    def _complete_cached_text_jobs(self, jobs: List[GenerationJob]) -> List[GenerationJob]:
+        """Complete jobs whose result is cached; return the ones still to generate"""
+        if not settings.CONTENT_GENERATION.get('RESULT_CACHE_ENABLED', True):
+            return jobs
+        
+        pending = []
+        for job in jobs:
+            provider = self.text_router.providers[job.provider]
+            cached = generation_cache.get(
+                generation_cache.make_key(job.provider, getattr(provider, 'model', ''), job.prompt, job.parameters)
+            )
+            if cached is None:
+                pending.append(job)
+            else:
+                self._complete_text_job(job, cached, cache_hit=True)
+        return pending
+    
+    def _run_text_pack(self, jobs: List[GenerationJob], max_attempts: int):
+        GenerationJob.objects.filter(pk__in=[job.id for job in jobs]).update(status='processing')
+        for job in jobs:
+            job.status = 'processing'
+            publish_job_event(job)
+        
+        requested, parameters = jobs[0].provider, jobs[0].parameters
+        remaining = {str(job.id): job for job in jobs}
+        error = 'Provider returned no usable output for this item'
+        
+        for attempt in range(max_attempts):
+            items = [{'id': job_id, 'prompt': job.prompt} for job_id, job in remaining.items()]
+            
+            def call_provider(name, provider):
+                rate_limiter.acquire(name, jobs[0].workspace_id)
+                return provider.generate_text_batch(items, **parameters)
+            
+            try:
+                result, routing = self.text_router.call(requested, call_provider)
+            except RateLimitExceeded:
+                # Items already generated stay completed; the rest go back to the queue
+                GenerationJob.objects.filter(pk__in=list(remaining)).update(status='pending')
+                for job in remaining.values():
+                    job.status = 'pending'
+                    publish_job_event(job)
+                raise
+            
+            if not result.get('success'):
+                error = result.get('error', 'Unknown provider error')
+                continue
+            
+            for job_id, variations in result['items'].items():
+                job = remaining.pop(job_id)
+                job_result = {'success': True, 'content': variations, 'metadata': result.get('metadata')}
+                self._complete_text_job(job, job_result, routing=routing, attempts=attempt + 1)
+            if not remaining:
+                return
+            logger.info("Retrying %s of %s packed text items", len(remaining), len(jobs))
+        
+        for job in remaining.values():
+            self._fail_job(job, error)
+    
+    def _complete_text_job(self, job: GenerationJob, result: Dict[str, Any], cache_hit: bool = False, routing=None, attempts=None):
+        served_by = (routing or {}).get('provider') or job.provider
+        if not cache_hit and served_by == job.provider and settings.CONTENT_GENERATION.get('RESULT_CACHE_ENABLED', True):
+            provider = self.text_router.providers[job.provider]
+            generation_cache.set(
+                generation_cache.make_key(job.provider, getattr(provider, 'model', ''), job.prompt, job.parameters),
+                result
+            )
+        
+        content_text = "\n\n".join(result.get('content', []))
+        try:
+            self.complete_generation_job(job, {
+                'file_url': '',
+                'file_size': len(content_text),
+                'mime_type': 'text/plain',
+                'generated_by': served_by,
+                'metadata': {
+                    'content': result.get('content'),
+                    'provider_metadata': result.get('metadata'),
+                    'cache_hit': cache_hit,
+                    'routing': routing,
+                    'packed_attempts': attempts
+                }
+            })
+        except Exception:
+            # complete_generation_job already marked the job failed; keep the pack going
+            logger.exception("Packed text job %s failed to complete", job.id)
+    
+    def run_streaming_text_generation(self, job: GenerationJob) -> JobEventStream:
+        """Run a text job against the streaming provider as its events are consumed.
+        
+        The job is marked processing right away; close the returned stream when
+        done with it so an abandoned job is failed.
+        """
+        self._mark_processing(job)
+        return JobEventStream(job, self._stream_text_events(job), self._fail_job)
+    
+    def _stream_text_events(self, job: GenerationJob) -> Iterator[Dict[str, Any]]:
+        provider = self.huggingface_provider
+        variations_count = job.parameters.get('variations_count', 3)
+        
+        cache_key = generation_cache.make_key(job.provider, provider.model, job.prompt, job.parameters)
+        cached = generation_cache.get(cache_key) if settings.CONTENT_GENERATION.get('RESULT_CACHE_ENABLED', True) else None
+        
+        try:
+            if cached is not None:
+                result, cache_hit = cached, True
+                for index, text in enumerate(result['content']):
+                    yield {'event': 'variation', 'index': index, 'text': text}
+            else:
+                rate_limiter.acquire('huggingface', job.workspace_id)
+                
+                generated_text, pending_line, emitted = '', '', 0
+                for token in provider.stream_text(job.prompt, **job.parameters):
+                    generated_text += token
+                    yield {'event': 'delta', 'text': token}
                     
-                    self.complete_generation_job(job, asset_data)
-                else:
-                    job.status = 'failed'
-                    job.error_message = result.get('error', 'Unknown provider error')
-                    job.save()
-                    
+                    # Emit each list item as soon as its line is finished
+                    *finished_lines, pending_line = (pending_line + token).split('\n')
+                    for line in finished_lines:
+                        if is_variation_line(line) and emitted < variations_count:
+                            yield {'event': 'variation', 'index': emitted, 'text': line.strip()}
+                            emitted += 1
+                
+                content = parse_variations(generated_text, variations_count)
+                for index in range(emitted, len(content)):
+                    yield {'event': 'variation', 'index': index, 'text': content[index]}
+                
+                result = {'success': True, 'content': content, 'metadata': provider.text_metadata(**job.parameters)}
+                cache_hit = False
+                if settings.CONTENT_GENERATION.get('RESULT_CACHE_ENABLED', True):
+                    generation_cache.set(cache_key, result)
+            
+            asset = self.complete_generation_job(job, {
+                'file_url': '',
+                'file_size': len("\n\n".join(result['content'])),
+                'mime_type': 'text/plain',
+                'metadata': {
+                    'content': result['content'],
+                    'provider_metadata': result.get('metadata'),
+                    'cache_hit': cache_hit,
+                    'streamed': True
+                }
+            })
+            yield {'event': 'completed', 'job_id': str(job.id), 'asset_id': str(asset.id), 'content': result['content']}
+            
         except Exception as e:
-            print(f"Sync generation failed: {e}")
-            job.status = 'failed'
-            job.error_message = str(e)
-            job.save()
+            logger.exception("Streaming text generation job %s failed", job.id)
+            self._fail_job(job, str(e))
+            yield {'event': 'failed', 'job_id': str(job.id), 'error': str(e)}
     
-    def _queue_image_generation(self, job: GenerationJob):
-        """Queue image generation task (placeholder for Celery task)"""
+    def run_image_generation(self, job: GenerationJob):
+        """Execute a queued image generation job (runs inside a worker)"""
+        self._mark_processing(job)
+        
+        try:
+            def call_provider():
+                # One token per variation; variations are requested concurrently
+                rate_limiter.acquire('stability', job.workspace_id, tokens=job.parameters.get('variations_count', 1))
+                return run_async(self.image_provider.agenerate_image(job.prompt, **job.parameters))
+            
+            result, cache_hit = self._cached_provider_call(self.image_provider, job, call_provider)
+            images = result.get('images') or []
+            if not result.get('success') or not images:
+                self._fail_job(job, result.get('error', 'Image provider returned no images'))
+                return
+            
+            primary = images[0]
+            asset_data = {
+                'file_url': primary.get('url'),
+                'file_size': primary.get('file_size'),
+                'mime_type': f"image/{primary.get('format', 'jpeg')}",
+                'metadata': {
+                    'images': images,
+                    'provider_metadata': result.get('metadata'),
+                    'cache_hit': cache_hit
+                }
+            }
+            self.complete_generation_job(job, asset_data)
+            
+        except RateLimitExceeded:
+            self._mark_pending(job)
+            raise
+        except Exception as e:
+            logger.exception("Image generation job %s failed", job.id)
+            self._fail_job(job, str(e))
+    
+    def run_video_generation(self, job: GenerationJob):
+        """Submit a queued video job to the video provider (runs inside a worker)"""
+        self.run_video_generations([job])
+    
+    def run_video_generations(self, jobs: List[GenerationJob]):
+        """Submit video jobs to the video provider concurrently (runs inside a worker).
+        
+        Rendering happens on the provider side, so each job stays in `processing`
+        with the provider's video id recorded until the render completes.
+        """
+        # Only submit jobs that got a provider token; the rest stay pending and
+        # RateLimitExceeded is raised once the admitted ones are submitted
+        admitted, rate_limited = [], None
+        for job in jobs:
+            try:
+                rate_limiter.acquire('heygen', job.workspace_id)
+            except RateLimitExceeded as e:
+                rate_limited = e
+                break
+            admitted.append(job)
+        
+        if admitted:
+            self._submit_videos(admitted)
+        if rate_limited:
+            raise rate_limited
+    
+    def _submit_videos(self, jobs: List[GenerationJob]):
+        GenerationJob.objects.filter(pk__in=[job.id for job in jobs]).update(status='processing')
+        for job in jobs:
+            job.status = 'processing'
+            publish_job_event(job)
+        
+        results = self.fan_out('heygen', [
+            lambda job=job: self.video_provider.agenerate_video(
+                job.parameters.get('script') or job.prompt,
+                job.parameters.get('avatar_settings') or {},
+                language=job.parameters.get('language', 'ar'),
+                brand_settings=job.parameters.get('brand_settings') or {}
+            )
+            for job in jobs
+        ])
+        
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                logger.error("Video generation job %s failed: %s", job.id, result)
+                self._fail_job(job, str(result))
+            elif not result.get('success'):
+                self._fail_job(job, result.get('error', 'Video provider rejected the request'))
+            else:
+                job.parameters = {
+                    **job.parameters,
+                    'external_video_id': result.get('video_id'),
+                    'estimated_duration': (result.get('metadata') or {}).get('duration'),
+                }
+                # The render poller picks the job up once it is expected to be done
+                job.external_id = result.get('video_id') or ''
+                job.submitted_at = timezone.now()
+                job.next_poll_at = job.submitted_at + timedelta(
+                    seconds=first_poll_delay(job.parameters['estimated_duration'])
+                )
+                job.save(update_fields=['parameters', 'external_id', 'submitted_at', 'next_poll_at'])
+                publish_job_event(
+                    job, stage='rendering', estimated_duration=job.parameters['estimated_duration']
+                )
+    
+    def _cached_provider_call(
+        self, provider, job: GenerationJob, call: Callable[[], Dict[str, Any]],
+        cacheable: Optional[Callable[[], bool]] = None
+    ):
+        """Run a provider call through the result cache.
+        
+        Returns (result, cache_hit). Only successful results are cached, and
+        only when `cacheable` (checked after the call) allows it.
+        """
+        if not settings.CONTENT_GENERATION.get('RESULT_CACHE_ENABLED', True):
+            return call(), False
+        
+        cache_key = generation_cache.make_key(
+            job.provider, getattr(provider, 'model', ''), job.prompt, job.parameters
+        )
+        cached = generation_cache.get(cache_key)
+        if cached is not None:
+            return cached, True
+        
+        result = call()
+        if result.get('success') and (cacheable is None or cacheable()):
+            generation_cache.set(cache_key, result)
+        return result, False
+    
+    def _mark_processing(self, job: GenerationJob):
         job.status = 'processing'
-        job.save()
-        print(f"Queued image generation job: {job.id}")
+        job.save(update_fields=['status'])
+        publish_job_event(job)
+    
+    def _mark_pending(self, job: GenerationJob):
+        job.status = 'pending'
+        job.save(update_fields=['status'])
+        publish_job_event(job)
+    
+    def _fail_job(self, job: GenerationJob, error_message: str):
+        job.status = 'failed'
+        job.error_message = error_message
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'completed_at'])
+        publish_job_event(job)
     
     def complete_generation_job(self, job: GenerationJob, result_data: Dict[str, Any]):
         """Complete a generation job with results"""
         try:
-            # Create content asset
-            asset = ContentAsset.objects.create(
-                workspace=job.workspace,
-                type=self._get_asset_type_from_job(job.type),
-                name=f"Generated {job.type} - {timezone.now().strftime('%Y%m%d_%H%M%S')}",
-                file_url=result_data.get('file_url'),
-                file_size=result_data.get('file_size'),
-                mime_type=result_data.get('mime_type'),
-                metadata=result_data.get('metadata', {}),
-                generated_by=job.provider,
-                generation_prompt=job.prompt,
-                language=job.parameters.get('language', 'ar')
-            )
-            
-            # Update job
-            job.result_asset = asset
-            job.status = 'completed'
-            job.completed_at = timezone.now()
-            job.save()
-            
-            # Update related video project if applicable
-            if job.type == 'video':
-                video_projects = VideoProject.objects.filter(
+            with transaction.atomic():
+                # Create content asset
+                asset = ContentAsset.objects.create(
                     workspace=job.workspace,
-                    status='generating'
+                    type=self._get_asset_type_from_job(job.type),
+                    name=f"Generated {job.type} - {timezone.now().strftime('%Y%m%d_%H%M%S')}",
+                    file_url=result_data.get('file_url'),
+                    file_size=result_data.get('file_size'),
+                    mime_type=result_data.get('mime_type'),
+                    metadata=result_data.get('metadata', {}),
+                    generated_by=result_data.get('generated_by') or job.provider,
+                    generation_prompt=job.prompt,
+                    language=job.parameters.get('language', 'ar')
                 )
-                for project in video_projects:
-                    if not project.generated_video:
-                        project.generated_video = asset
-                        project.status = 'completed'
-                        project.save()
-                        break
-                    else:
-                        project.variations.add(asset)
+                
+                # Update job
+                job.result_asset = asset
+                job.status = 'completed'
+                job.completed_at = timezone.now()
+                job.save()
+                
+                # Update the owning video project if applicable
+                if job.type == 'video' and job.video_project_id:
+                    self._attach_video_to_project(job.video_project_id, asset)
+                
+                if should_ingest(asset):
+                    self._queue_media_ingest(asset)
             
+            publish_job_event(job)
             return asset
             
         except Exception as e:
-            job.status = 'failed'
-            job.error_message = str(e)
-            job.completed_at = timezone.now()
-            job.save()
+            # The asset was rolled back with the transaction; don't point the job at it
+            job.result_asset = None
+            self._fail_job(job, str(e))
             raise
     
+    def _attach_video_to_project(self, project_id, asset: ContentAsset):
+        """Attach a finished video to its project.
+        
+        The first video to finish becomes the project's video and completes it;
+        later ones are variations. The row lock serialises variations of the
+        same project finishing at the same time.
+        """
+        project = VideoProject.objects.select_for_update().only('id', 'generated_video').get(pk=project_id)
+        if project.generated_video_id is None:
+            VideoProject.objects.filter(pk=project_id).update(
+                generated_video=asset,
+                status='completed',
+                updated_at=timezone.now()
+            )
+        else:
+            project.variations.add(asset)
+    
     def _get_asset_type_from_job(self, job_type: str) -> str:
         """Map job type to asset type"""
         mapping = {
@@ -271,4 +768,17 @@ class GenerationService:
             'voice': 'audio',
             'script': 'text'
         }
-        return mapping.get(job_type, 'text')
\ No newline at end of file
+        return mapping.get(job_type, 'text')
+
+_generation_service = None
+_generation_service_lock = threading.Lock()
+
+
+def get_generation_service() -> GenerationService:
+    """Process-wide GenerationService so providers are constructed once per process"""
+    global _generation_service
+    if _generation_service is None:
+        with _generation_service_lock:
+            if _generation_service is None:
+                _generation_service = GenerationService()
+    return _generation_service
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.content_creation.models import GenerationJob
+from apps.content_creation.services.redis_client import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'jobevents:'
+
+# Events buffered per subscriber before new ones are dropped (slow client)
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def workspace_channel(workspace_id) -> str:
+    return f"{CHANNEL_PREFIX}{workspace_id}"
+
+
+def job_event_payload(job: GenerationJob, **details) -> Dict[str, Any]:
+    payload = {
+        'job_id': str(job.id),
+        'type': job.type,
+        'status': job.status,
+        'video_project_id': str(job.video_project_id) if job.video_project_id else None,
+        'result_asset_id': str(job.result_asset_id) if job.result_asset_id else None,
+        'error_message': job.error_message,
+        'at': timezone.now().isoformat(),
+    }
+    payload.update(details)
+    return payload
+
+
+class LocalJobEventBroker:
+    """In-process fan-out used when Redis is unreachable.
+
+    Subscribers are asyncio queues owned by their event loop; publishers may run
+    on any thread, so events are handed over with call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[channel].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers[channel] = {s for s in self._subscribers[channel] if s[1] is not queue}
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def publish(self, channel: str, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, message)
+            except RuntimeError:
+                # Loop already closed; the subscriber is going away
+                pass
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, message: str):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Dropping job event for slow subscriber")
+
+
+local_broker = LocalJobEventBroker()
+
+
+def publish(workspace_id, payload: Dict[str, Any]):
+    """Fan a job event out to every subscriber of the workspace"""
+    channel = workspace_channel(workspace_id)
+    message = json.dumps(payload)
+    client = get_redis()
+    if client is not None:
+        try:
+            client.publish(channel, message)
+            return
+        except redis.RedisError as e:
+            logger.warning("Job event publish failed, delivering in-process only: %s", e)
+            mark_redis_unavailable()
+    local_broker.publish(channel, message)
+
+
+def publish_job_event(job: GenerationJob, **details):
+    """Publish a job's current state once the surrounding transaction commits"""
+    payload = job_event_payload(job, **details)
+    workspace_id = job.workspace_id
+    transaction.on_commit(lambda: publish(workspace_id, payload))
+
+
+class JobEventSubscription:
+    """Async subscription to one workspace's job events.
+
+    Usage:
+        async with JobEventSubscription(workspace_id) as subscription:
+            event = await subscription.get(timeout=15)  # None on timeout
+    """
+
+    def __init__(self, workspace_id):
+        self.channel = workspace_channel(workspace_id)
+        self._client = None
+        self._pubsub = None
+        self._queue = None
+
+    async def __aenter__(self):
+        # get_redis() pings on first use, keep that off the event loop
+        if await asyncio.to_thread(get_redis) is not None:
+            try:
+                self._client = aioredis.from_url(getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0'))
+                self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(self.channel)
+                return self
+            except redis.RedisError as e:
+                logger.warning("Job event subscription failed, listening in-process only: %s", e)
+                await self._close_redis()
+        self._queue = local_broker.subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._queue is not None:
+            local_broker.unsubscribe(self.channel, self._queue)
+        await self._close_redis()
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        if self._queue is not None:
+            try:
+                message = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            return json.loads(message)
+
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def _close_redis(self):
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,188 @@
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from apps.content_creation.services.blob_store import attach_blob, find_blob_for_url, register_blob
+from apps.content_creation.services.providers.http_client import get_provider_session
+
+logger = logging.getLogger(__name__)
+
+
+def _ingest_settings() -> Dict[str, Any]:
+    return settings.CONTENT_GENERATION.get('MEDIA_INGEST', {})
+
+
+class MediaTooLarge(Exception):
+    """The remote file exceeded MEDIA_INGEST['MAX_BYTES']"""
+
+
+class HashingReader(io.RawIOBase):
+    """Non-seekable file object over a chunk iterator.
+
+    Size and SHA-256 are computed as the storage backend reads, so a download
+    is never held in memory beyond the chunk currently being copied. A failed
+    download or an oversized file ends the stream early and is kept in
+    `error`, so the storage backend finishes the save and reports the name it
+    used, and the caller can delete exactly that file.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], max_bytes: Optional[int] = None):
+        self._chunks = chunks
+        self._pending = b''
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.error: Optional[Exception] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.error is not None:
+            return 0
+        while not self._pending:
+            try:
+                chunk = next(self._chunks, None)
+            except Exception as e:
+                self.error = e
+                return 0
+            if chunk is None:
+                return 0
+            self._pending = chunk
+
+        count = min(len(buffer), len(self._pending))
+        data, self._pending = self._pending[:count], self._pending[count:]
+        buffer[:count] = data
+
+        if self.max_bytes and self.size + count > self.max_bytes:
+            self.error = MediaTooLarge(f"Remote file is larger than {self.max_bytes} bytes")
+            return 0
+        self.size += count
+        self.hasher.update(data)
+        return count
+
+    @property
+    def sha256(self) -> str:
+        return self.hasher.hexdigest()
+
+
+class MediaIngestor:
+    """Copies provider-hosted media into our own storage.
+
+    The download is streamed straight into the storage backend configured by
+    MEDIA_INGEST['STORAGE'] (an alias in settings.STORAGES: local filesystem,
+    or S3/MinIO through django-storages).
+    """
+
+    def __init__(self, storage=None, session=None):
+        config = _ingest_settings()
+        self.storage = storage or storages[config.get('STORAGE', 'generated_media')]
+        self.session = session or get_provider_session()
+        self.chunk_size = config.get('CHUNK_SIZE', 1024 * 1024)
+        self.max_bytes = config.get('MAX_BYTES')
+
+    def ingest(self, source_url: str, name: str, mime_type: Optional[str] = None) -> Dict[str, Any]:
+        """Stream `source_url` to storage under `name` (extension added if missing)"""
+        with self.session.get(source_url, stream=True) as response:
+            response.raise_for_status()
+
+            mime_type = mime_type or response.headers.get('Content-Type', '').split(';')[0] or None
+            if not os.path.splitext(name)[1]:
+                name += self._extension(source_url, mime_type)
+
+            name = self.storage.get_available_name(name)
+            reader = HashingReader(response.iter_content(chunk_size=self.chunk_size), self.max_bytes)
+            stored_name = self.storage.save(name, File(reader, name=os.path.basename(name)))
+            if reader.error is not None:
+                # Do not leave a truncated copy behind; the storage may have renamed it on collision
+                self.storage.delete(stored_name)
+                raise reader.error
+
+        return {
+            'name': stored_name,
+            'url': self.storage.url(stored_name),
+            'size': reader.size,
+            'sha256': reader.sha256,
+            'mime_type': mime_type,
+            'etag': response.headers.get('ETag', ''),
+        }
+
+    def head(self, source_url: str) -> Tuple[str, Optional[int]]:
+        """The (ETag, Content-Length) the provider reports for `source_url` now"""
+        response = self.session.head(source_url, allow_redirects=True)
+        response.raise_for_status()
+        try:
+            size = int(response.headers['Content-Length'])
+        except (KeyError, ValueError):
+            size = None
+        return response.headers.get('ETag', ''), size
+
+    def _extension(self, source_url: str, mime_type: Optional[str]) -> str:
+        extension = os.path.splitext(urlparse(source_url).path)[1]
+        if not extension and mime_type:
+            extension = mimetypes.guess_extension(mime_type) or ''
+        return extension
+
+
+def should_ingest(asset) -> bool:
+    """Media assets still pointing at a provider URL"""
+    if not _ingest_settings().get('ENABLED', True):
+        return False
+    return asset.type in ('image', 'video', 'audio') and (asset.file_url or '').startswith(('http://', 'https://'))
+
+
+def ingest_asset(asset, ingestor: Optional[MediaIngestor] = None) -> bool:
+    """Replace the asset's provider URL with our stored copy; returns True on success.
+
+    On failure the provider URL is kept and the error recorded, so the asset
+    stays usable and can be re-ingested later.
+    """
+    if not should_ingest(asset):
+        return False
+
+    source_url = asset.file_url
+    ingestor = ingestor or MediaIngestor()
+
+    # Cached generations hand out the same provider URL again: reuse its blob if the file is unchanged
+    try:
+        blob = find_blob_for_url(source_url, ingestor.head)
+    except requests.RequestException as e:
+        logger.info("Could not revalidate %s, downloading it: %s", source_url, e)
+        blob = None
+    if blob is not None and _attach(asset, blob, ingestor.storage, source_url):
+        return True
+
+    name = f"{_ingest_settings().get('PREFIX', 'generated')}/{asset.workspace_id}/{asset.id}"
+    try:
+        stored = ingestor.ingest(source_url, name, asset.mime_type)
+        blob, created = register_blob(
+            stored['sha256'], stored['name'], stored['size'], stored['mime_type'] or asset.mime_type,
+            source_url, stored['etag']
+        )
+        if not created:
+            # Same bytes are already stored under another name
+            ingestor.storage.delete(stored['name'])
+        if not _attach(asset, blob, ingestor.storage, source_url):
+            raise RuntimeError(f"Blob {blob.sha256} was collected before it could be attached")
+    except Exception as e:
+        logger.warning("Could not ingest media for asset %s from %s: %s", asset.id, source_url, e)
+        asset.metadata = {**asset.metadata, 'ingest_error': str(e)}
+        asset.save(update_fields=['metadata', 'updated_at'])
+        return False
+    return True
+
+
+def _attach(asset, blob, storage, source_url: str) -> bool:
+    metadata = {key: value for key, value in asset.metadata.items() if key != 'ingest_error'}
+    asset.metadata = {
+        **metadata,
+        'storage': {'name': blob.storage_name, 'sha256': blob.sha256, 'source_url': source_url},
+    }
+    return attach_blob(asset, blob, storage)
@@ -0,0 +1,68 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+from django.utils import timezone
+
+# ProductAnalysis fields describing the fetch its data came from
+CACHE_FIELDS = ['fetched_url', 'etag', 'last_modified', 'content_hash', 'fetched_at']
+
+
+@dataclass
+class Validators:
+    """What a product's last fetch returned, used to revalidate it instead of re-downloading.
+
+    `url` is the URL actually fetched (the page or its product JSON); the
+    validators are only sent back to that same URL.
+    """
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    @classmethod
+    def of(cls, analysis) -> Optional['Validators']:
+        if analysis is None or not analysis.fetched_url:
+            return None
+        return cls(analysis.fetched_url, analysis.etag, analysis.last_modified, analysis.content_hash)
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def conditional_headers(cached: Optional[Validators], url: str) -> Dict[str, str]:
+    if cached is None or cached.url != url:
+        return {}
+    headers = {}
+    if cached.etag:
+        headers['If-None-Match'] = cached.etag
+    if cached.last_modified:
+        headers['If-Modified-Since'] = cached.last_modified
+    return headers
+
+
+def is_unchanged(cached: Optional[Validators], url: str, status_code: int, body_hash: Optional[str]) -> bool:
+    """A 304, or a full response whose body hashes the same as last time"""
+    if cached is None or cached.url != url:
+        return False
+    return status_code == 304 or (body_hash is not None and body_hash == cached.content_hash)
+
+
+def fetch_fields(url: str, headers: Mapping[str, str], body_hash: Optional[str], cached: Optional[Validators]) -> Dict[str, Any]:
+    """Cache field values after fetching `url`; a 304 may omit validators, so the cached ones carry over"""
+    previous = cached if cached is not None and cached.url == url else Validators(url)
+    return {
+        'fetched_url': url,
+        'etag': (headers.get('ETag') or previous.etag or '')[:255] or None,
+        'last_modified': (headers.get('Last-Modified') or previous.last_modified or '')[:64] or None,
+        'content_hash': body_hash or previous.content_hash,
+        'fetched_at': timezone.now(),
+    }
+
+
+def revalidate(
+    url: str, status_code: int, headers: Mapping[str, str], body: bytes, cached: Optional[Validators]
+) -> Tuple[Dict[str, Any], bool]:
+    """Cache field values for a response from `url`, and whether its content is unchanged"""
+    body_hash = None if status_code == 304 else content_hash(body)
+    return fetch_fields(url, headers, body_hash, cached), is_unchanged(cached, url, status_code, body_hash)
@@ -1,21 +1,201 @@
+import re
 import requests
+import soupsieve as sv
 from bs4 import BeautifulSoup
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse
 from typing import Dict, List, Any, Optional
+from django.conf import settings
+from django.utils import timezone
 from apps.content_creation.models import ProductAnalysis
+from apps.content_creation.services.page_cache import Validators, conditional_headers, revalidate
+from apps.content_creation.services.store_catalog import parse_product_api, product_api_url
+from apps.content_creation.services.structured_data import decode_page, extract_structured_product, is_complete
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+except ImportError:  # pragma: no cover - lxml and cssselect are in requirements
+    CSSSelector = None
+
+PRICE_RE = re.compile(r'[\d,]+\.?\d*')
+
+# Selector tables per platform, tried in order; compiled once per parser backend
+PLATFORM_SELECTORS = {
+    'shopify': {
+        'title': ['h1.product-title', 'h1[data-testid="product-title"]', '.product__title h1', 'h1.h2'],
+        'description': ['.product-description', '.product__description', '[data-testid="product-description"]', '.rte'],
+        'price': ['.price', '.product-price', '[data-testid="price"]', '.money'],
+    },
+    'salla': {
+        'title': ['h1.product-title', '.product-name h1', 'h1'],
+        'description': ['.product-description', '.description', '.product-details'],
+        'price': ['.price', '.product-price', '.price-current'],
+        'currency': 'SAR',
+    },
+    'zid': {
+        'title': ['h1.product-title', '.product-name', 'h1'],
+        'description': ['.product-description', '.description'],
+        'price': ['.price', '.product-price'],
+        'currency': 'SAR',
+    },
+    'amazon': {
+        'title': ['#productTitle', 'h1.a-size-large'],
+        'description': ['#feature-bullets ul', '#productDescription'],
+        'price': ['.a-price-whole', '#price_inside_buybox'],
+        'features': ['#feature-bullets li span.a-list-item'],
+    },
+    'noon': {
+        'title': ['h1[data-qa="product-name"]', 'h1'],
+        'description': ['[data-qa="product-description"]', '.description'],
+        'price': ['[data-qa="product-price"]', '.price'],
+        'currency': 'AED',
+    },
+    'generic': {
+        'title': ['h1', '.product-title', '.title', '[data-testid="product-title"]'],
+        'description': ['.description', '.product-description', '.content', 'p'],
+        'price': ['.price', '.cost', '.amount', '[data-testid="price"]'],
+    },
+}
+
+COMMON_SELECTORS = {
+    'images': [
+        '.product-image img',
+        '.product-gallery img',
+        '[data-testid="product-image"] img',
+        '.main-image img',
+        'img[alt*="product"]'
+    ],
+    'features': [
+        '.features li',
+        '.specifications li',
+        '.product-features li',
+        '.bullets li'
+    ],
+    'shopify': ['script[src*="shopify"], meta[name="shopify-checkout-api-token"], link[href*="shopify"]'],
+}
+
+
+class SoupBackend:
+    """BeautifulSoup tree with soupsieve selectors; pure Python, the fallback"""
+    
+    def __init__(self, builder: str = 'html.parser'):
+        self.name = builder
+        self.builder = builder
+    
+    def compile(self, selector: str):
+        return sv.compile(selector)
+    
+    def parse(self, html: bytes):
+        return BeautifulSoup(html, self.builder)
+    
+    def select(self, selector, document) -> list:
+        return selector.select(document)
+    
+    def select_one(self, selector, document):
+        return selector.select_one(document)
+    
+    def text(self, element) -> str:
+        return element.get_text(strip=True)
+    
+    def attr(self, element, name: str) -> Optional[str]:
+        return element.get(name)
+
+
+class LxmlBackend:
+    """libxml2 tree with CSS selectors compiled to XPath once, both evaluated in C"""
+    
+    name = 'lxml'
+    
+    def __init__(self):
+        # Same text as BeautifulSoup's get_text: no comments, scripts or styles
+        self._text = etree.XPath('descendant-or-self::text()[not(parent::script or parent::style)]')
+    
+    def compile(self, selector: str):
+        return CSSSelector(selector)
+    
+    def parse(self, html: bytes):
+        # Decode like BeautifulSoup does (declared charset, then sniffing) so
+        # pages without a charset are not read as Latin-1
+        try:
+            return lxml.html.document_fromstring(decode_page(html))
+        except (etree.ParserError, ValueError):
+            return lxml.html.document_fromstring('<html></html>')
+    
+    def select(self, selector, document) -> list:
+        return selector(document)
+    
+    def select_one(self, selector, document):
+        matches = selector(document)
+        return matches[0] if matches else None
+    
+    def text(self, element) -> str:
+        return ''.join(part.strip() for part in self._text(element))
+    
+    def attr(self, element, name: str) -> Optional[str]:
+        return element.get(name)
+
+
+def _make_backend(name: str):
+    if name == 'lxml':
+        return LxmlBackend()
+    return SoupBackend(name)
+
+
+DEFAULT_PARSER = 'lxml' if CSSSelector is not None else 'html.parser'
+
+
+@lru_cache(maxsize=None)
+def get_parser(name: str = DEFAULT_PARSER):
+    """A parser backend with every selector table compiled for it, built once per process"""
+    backend = _make_backend(name)
+    platforms = {
+        platform: {
+            field: [backend.compile(selector) for selector in value] if isinstance(value, list) else value
+            for field, value in table.items()
+        }
+        for platform, table in PLATFORM_SELECTORS.items()
+    }
+    common = {key: [backend.compile(selector) for selector in selectors] for key, selectors in COMMON_SELECTORS.items()}
+    return backend, platforms, common
+
+
+# Compile the default tables at import rather than on the first request
+get_parser()
+
+
+@dataclass
+class PageFetch:
+    # None when the page is unchanged since the cached fetch
+    data: Optional[Dict[str, Any]]
+    # Cache field values (see page_cache.CACHE_FIELDS); empty when the fetch failed
+    cache: Dict[str, Any] = field(default_factory=dict)
 
 
 class ProductAnalyzer:
     """Service for analyzing products from URLs"""
     
-    def __init__(self):
+    def __init__(self, parser: str = DEFAULT_PARSER):
+        # HTML parser backend: 'lxml', or a BeautifulSoup tree builder such as 'html.parser'
+        self.backend, self.selectors, self.common_selectors = get_parser(parser)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
     
-    def analyze_product(self, workspace_id: str, product_url: str) -> ProductAnalysis:
-        """Analyze product from URL and return analysis"""
+    def analyze_product(
+        self, workspace_id: str, product_url: str, refresh: bool = False, max_age: Optional[int] = None
+    ) -> ProductAnalysis:
+        """Analyze product from URL and return analysis.
+        
+        An existing analysis is returned as is unless `refresh` is set and it
+        was fetched more than `max_age` seconds ago (PRODUCT_REFRESH_MAX_AGE_SECONDS
+        by default). It is then revalidated with a conditional GET and only
+        re-parsed when the page changed.
+        """
         
         # Check if analysis already exists
         existing_analysis = ProductAnalysis.objects.filter(
@@ -23,261 +203,171 @@ class ProductAnalyzer:
             product_url=product_url
         ).first()
         
-        if existing_analysis:
+        if existing_analysis and not (refresh and self._is_stale(existing_analysis, max_age)):
             return existing_analysis
         
         # Scrape product data
-        product_data = self._scrape_product_data(product_url)
-        
-        # Create analysis
-        analysis = ProductAnalysis.objects.create(
-            workspace_id=workspace_id,
-            product_url=product_url,
-            title=product_data.get('title'),
-            description=product_data.get('description'),
-            price=product_data.get('price'),
-            currency=product_data.get('currency', 'SAR'),
-            images=product_data.get('images', []),
-            features=product_data.get('features', []),
-            category=product_data.get('category'),
-            brand=product_data.get('brand'),
-            analysis_data=product_data
-        )
-        
-        return analysis
+        fetch = self.fetch_product(product_url, Validators.of(existing_analysis))
+        
+        if existing_analysis is None:
+            return ProductAnalysis.objects.create(
+                workspace_id=workspace_id,
+                product_url=product_url,
+                **self.analysis_fields(fetch.data),
+                **fetch.cache
+            )
+        
+        if fetch.data is None:
+            fields = fetch.cache
+        elif 'error' in fetch.data and 'error' not in (existing_analysis.analysis_data or {}):
+            # A failed refresh keeps the last good analysis
+            return existing_analysis
+        else:
+            fields = {**self.analysis_fields(fetch.data), **fetch.cache}
+        for name, value in fields.items():
+            setattr(existing_analysis, name, value)
+        existing_analysis.save(update_fields=list(fields))
+        return existing_analysis
+    
+    @staticmethod
+    def _is_stale(analysis: ProductAnalysis, max_age: Optional[int]) -> bool:
+        if max_age is None:
+            max_age = settings.CONTENT_GENERATION.get('PRODUCT_REFRESH_MAX_AGE_SECONDS', 3600)
+        return analysis.fetched_at is None or timezone.now() - analysis.fetched_at >= timedelta(seconds=max_age)
+    
+    @staticmethod
+    def analysis_fields(product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """ProductAnalysis field values for scraped product data"""
+        return {
+            'title': (product_data.get('title') or '')[:500] or None,
+            'description': product_data.get('description'),
+            'price': product_data.get('price'),
+            'currency': product_data.get('currency') or 'SAR',
+            'images': product_data.get('images', []),
+            'features': product_data.get('features', []),
+            'category': product_data.get('category'),
+            'brand': product_data.get('brand'),
+            'analysis_data': product_data,
+        }
+    
+    @staticmethod
+    def failure_data(error: Exception) -> Dict[str, Any]:
+        return {
+            'title': 'Failed to analyze product',
+            'description': f'Error: {str(error)}',
+            'error': str(error)
+        }
     
     def _scrape_product_data(self, url: str) -> Dict[str, Any]:
         """Scrape product data from URL"""
+        return self.fetch_product(url).data
+    
+    def fetch_product(self, url: str, cached: Optional[Validators] = None) -> PageFetch:
+        """Fetch and parse a product, from the store's product JSON when it has one.
+        
+        With `cached` validators the request is conditional; a 304, or a body
+        hashing the same as before, comes back as PageFetch(data=None) unparsed.
+        """
+        api_url = product_api_url(url)
+        if api_url:
+            fetch = self._fetch_product_api(api_url, url, cached)
+            if fetch is not None:
+                return fetch
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Detect platform and use appropriate scraper
-            domain = urlparse(url).netloc.lower()
-            
-            if 'shopify' in domain or self._is_shopify_store(soup):
-                return self._scrape_shopify_product(soup, url)
-            elif 'salla.sa' in domain:
-                return self._scrape_salla_product(soup, url)
-            elif 'zid.sa' in domain:
-                return self._scrape_zid_product(soup, url)
-            elif 'amazon' in domain:
-                return self._scrape_amazon_product(soup, url)
-            elif 'noon.com' in domain:
-                return self._scrape_noon_product(soup, url)
-            else:
-                return self._scrape_generic_product(soup, url)
-                
+            response = self.session.get(url, timeout=10, headers=conditional_headers(cached, url))
+            if response.status_code != 304:
+                response.raise_for_status()
+            cache, unchanged = revalidate(url, response.status_code, response.headers, response.content, cached)
+            return PageFetch(None if unchanged else self.parse_product(response.content, url), cache)
         except Exception as e:
-            return {
-                'title': 'Failed to analyze product',
-                'description': f'Error: {str(e)}',
-                'error': str(e)
-            }
+            return PageFetch(self.failure_data(e))
     
-    def _is_shopify_store(self, soup: BeautifulSoup) -> bool:
-        """Check if the page is a Shopify store"""
-        shopify_indicators = [
-            soup.find('script', {'src': lambda x: x and 'shopify' in x}),
-            soup.find('meta', {'name': 'shopify-checkout-api-token'}),
-            soup.find('link', {'href': lambda x: x and 'shopify' in x})
-        ]
-        return any(shopify_indicators)
-    
-    def _scrape_shopify_product(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Scrape Shopify product data"""
-        data = {}
-        
-        # Title
-        title_selectors = [
-            'h1.product-title',
-            'h1[data-testid="product-title"]',
-            '.product__title h1',
-            'h1.h2'
-        ]
-        data['title'] = self._extract_text_by_selectors(soup, title_selectors)
-        
-        # Description
-        desc_selectors = [
-            '.product-description',
-            '.product__description',
-            '[data-testid="product-description"]',
-            '.rte'
-        ]
-        data['description'] = self._extract_text_by_selectors(soup, desc_selectors)
-        
-        # Price
-        price_selectors = [
-            '.price',
-            '.product-price',
-            '[data-testid="price"]',
-            '.money'
-        ]
-        data['price'] = self._extract_price(soup, price_selectors)
-        
-        # Images
-        data['images'] = self._extract_product_images(soup, url)
-        
-        # Features
-        data['features'] = self._extract_product_features(soup)
-        
-        return data
-    
-    def _scrape_salla_product(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Scrape Salla product data"""
-        data = {}
-        
-        # Salla-specific selectors
-        data['title'] = self._extract_text_by_selectors(soup, [
-            'h1.product-title',
-            '.product-name h1',
-            'h1'
-        ])
-        
-        data['description'] = self._extract_text_by_selectors(soup, [
-            '.product-description',
-            '.description',
-            '.product-details'
-        ])
-        
-        data['price'] = self._extract_price(soup, [
-            '.price',
-            '.product-price',
-            '.price-current'
-        ])
-        
-        data['images'] = self._extract_product_images(soup, url)
-        data['features'] = self._extract_product_features(soup)
-        data['currency'] = 'SAR'
-        
-        return data
+    def _fetch_product_api(self, api_url: str, url: str, cached: Optional[Validators]) -> Optional[PageFetch]:
+        try:
+            response = self.session.get(api_url, timeout=10, headers=conditional_headers(cached, api_url))
+        except requests.RequestException:
+            return None
+        if response.status_code not in (200, 304):
+            return None
+        cache, unchanged = revalidate(api_url, response.status_code, response.headers, response.content, cached)
+        if unchanged:
+            return PageFetch(None, cache)
+        data = parse_product_api(response.content, url)
+        return PageFetch(data, cache) if data is not None else None
     
-    def _scrape_zid_product(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Scrape Zid product data"""
-        data = {}
-        
-        # Zid-specific selectors
-        data['title'] = self._extract_text_by_selectors(soup, [
-            'h1.product-title',
-            '.product-name',
-            'h1'
-        ])
-        
-        data['description'] = self._extract_text_by_selectors(soup, [
-            '.product-description',
-            '.description'
-        ])
-        
-        data['price'] = self._extract_price(soup, [
-            '.price',
-            '.product-price'
-        ])
-        
-        data['images'] = self._extract_product_images(soup, url)
-        data['features'] = self._extract_product_features(soup)
-        data['currency'] = 'SAR'
-        
-        return data
+    def parse_product(self, html: bytes, url: str) -> Dict[str, Any]:
+        """Extract product data from a fetched page.
+        
+        Structured data (JSON-LD, microdata, OpenGraph) is read first with a
+        regex scan; the DOM is only built for the selector scrapers when it
+        lacks a title, price or images, and structured values win over scraped ones.
+        """
+        structured = extract_structured_product(html, url)
+        if is_complete(structured):
+            return {**structured, 'source': 'structured_data'}
+        
+        scraped = self._scrape_with_selectors(html, url)
+        if not structured:
+            return {**scraped, 'source': 'selectors'}
+        return {**scraped, **structured, 'source': 'structured_data+selectors'}
     
-    def _scrape_amazon_product(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Scrape Amazon product data"""
-        data = {}
-        
-        data['title'] = self._extract_text_by_selectors(soup, [
-            '#productTitle',
-            'h1.a-size-large'
-        ])
-        
-        data['description'] = self._extract_text_by_selectors(soup, [
-            '#feature-bullets ul',
-            '#productDescription'
-        ])
-        
-        data['price'] = self._extract_price(soup, [
-            '.a-price-whole',
-            '#price_inside_buybox'
-        ])
-        
-        data['images'] = self._extract_product_images(soup, url)
-        data['features'] = self._extract_amazon_features(soup)
-        
-        return data
+    def _scrape_with_selectors(self, html: bytes, url: str) -> Dict[str, Any]:
+        document = self.backend.parse(html)
+        
+        # Detect platform and use appropriate selector table
+        domain = urlparse(url).netloc.lower()
+        
+        if 'shopify' in domain or self._is_shopify_store(document):
+            platform = 'shopify'
+        elif 'salla.sa' in domain:
+            platform = 'salla'
+        elif 'zid.sa' in domain:
+            platform = 'zid'
+        elif 'amazon' in domain:
+            platform = 'amazon'
+        elif 'noon.com' in domain:
+            platform = 'noon'
+        else:
+            platform = 'generic'
+        return self._scrape_platform(document, url, platform)
     
-    def _scrape_noon_product(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Scrape Noon product data"""
-        data = {}
-        
-        data['title'] = self._extract_text_by_selectors(soup, [
-            'h1[data-qa="product-name"]',
-            'h1'
-        ])
-        
-        data['description'] = self._extract_text_by_selectors(soup, [
-            '[data-qa="product-description"]',
-            '.description'
-        ])
-        
-        data['price'] = self._extract_price(soup, [
-            '[data-qa="product-price"]',
-            '.price'
-        ])
-        
-        data['images'] = self._extract_product_images(soup, url)
-        data['features'] = self._extract_product_features(soup)
-        data['currency'] = 'AED'
-        
-        return data
+    def _is_shopify_store(self, document) -> bool:
+        """Check if the page is a Shopify store"""
+        return self.backend.select_one(self.common_selectors['shopify'][0], document) is not None
     
-    def _scrape_generic_product(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Generic product scraper for unknown platforms"""
-        data = {}
-        
-        # Generic selectors
-        data['title'] = self._extract_text_by_selectors(soup, [
-            'h1',
-            '.product-title',
-            '.title',
-            '[data-testid="product-title"]'
-        ])
-        
-        data['description'] = self._extract_text_by_selectors(soup, [
-            '.description',
-            '.product-description',
-            '.content',
-            'p'
-        ])
-        
-        data['price'] = self._extract_price(soup, [
-            '.price',
-            '.cost',
-            '.amount',
-            '[data-testid="price"]'
-        ])
-        
-        data['images'] = self._extract_product_images(soup, url)
-        data['features'] = self._extract_product_features(soup)
-        
+    def _scrape_platform(self, document, url: str, platform: str) -> Dict[str, Any]:
+        """Scrape product data with a platform's compiled selector table"""
+        table = self.selectors[platform]
+        data = {
+            'title': self._extract_text_by_selectors(document, table['title']),
+            'description': self._extract_text_by_selectors(document, table['description']),
+            'price': self._extract_price(document, table['price']),
+            'images': self._extract_product_images(document, url),
+        }
+        if platform == 'amazon':
+            data['features'] = self._extract_amazon_features(document, table['features'])
+        else:
+            data['features'] = self._extract_product_features(document)
+        if table.get('currency'):
+            data['currency'] = table['currency']
         return data
     
-    def _extract_text_by_selectors(self, soup: BeautifulSoup, selectors: List[str]) -> Optional[str]:
+    def _extract_text_by_selectors(self, document, selectors: list) -> Optional[str]:
         """Extract text using multiple selectors"""
         for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
+            element = self.backend.select_one(selector, document)
+            if element is not None:
+                return self.backend.text(element)
         return None
     
-    def _extract_price(self, soup: BeautifulSoup, selectors: List[str]) -> Optional[float]:
+    def _extract_price(self, document, selectors: list) -> Optional[float]:
         """Extract price from multiple selectors"""
         for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                price_text = element.get_text(strip=True)
+            element = self.backend.select_one(selector, document)
+            if element is not None:
+                price_text = self.backend.text(element)
                 # Extract numeric value
-                import re
-                price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
+                price_match = PRICE_RE.search(price_text.replace(',', ''))
                 if price_match:
                     try:
                         return float(price_match.group())
@@ -285,23 +375,13 @@ class ProductAnalyzer:
                         continue
         return None
     
-    def _extract_product_images(self, soup: BeautifulSoup, base_url: str) -> List[str]:
+    def _extract_product_images(self, document, base_url: str) -> List[str]:
         """Extract product images"""
         images = []
         
-        # Common image selectors
-        img_selectors = [
-            '.product-image img',
-            '.product-gallery img',
-            '[data-testid="product-image"] img',
-            '.main-image img',
-            'img[alt*="product"]'
-        ]
-        
-        for selector in img_selectors:
-            img_elements = soup.select(selector)
-            for img in img_elements:
-                src = img.get('src') or img.get('data-src')
+        for selector in self.common_selectors['images']:
+            for img in self.backend.select(selector, document):
+                src = self.backend.attr(img, 'src') or self.backend.attr(img, 'data-src')
                 if src:
                     full_url = urljoin(base_url, src)
                     if full_url not in images:
@@ -309,36 +389,27 @@ class ProductAnalyzer:
         
         return images[:5]  # Limit to 5 images
     
-    def _extract_product_features(self, soup: BeautifulSoup) -> List[str]:
+    def _extract_product_features(self, document) -> List[str]:
         """Extract product features"""
         features = []
         
-        # Look for feature lists
-        feature_selectors = [
-            '.features li',
-            '.specifications li',
-            '.product-features li',
-            '.bullets li'
-        ]
-        
-        for selector in feature_selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                feature = element.get_text(strip=True)
+        for selector in self.common_selectors['features']:
+            for element in self.backend.select(selector, document):
+                feature = self.backend.text(element)
                 if feature and len(feature) > 5:  # Filter out empty or very short features
                     features.append(feature)
         
         return features[:10]  # Limit to 10 features
     
-    def _extract_amazon_features(self, soup: BeautifulSoup) -> List[str]:
+    def _extract_amazon_features(self, document, selectors: list) -> List[str]:
         """Extract Amazon-specific features"""
         features = []
         
         # Amazon feature bullets
-        feature_bullets = soup.select('#feature-bullets li span.a-list-item')
-        for bullet in feature_bullets:
-            feature = bullet.get_text(strip=True)
-            if feature and not feature.startswith('Make sure'):
-                features.append(feature)
+        for selector in selectors:
+            for bullet in self.backend.select(selector, document):
+                feature = self.backend.text(bullet)
+                if feature and not feature.startswith('Make sure'):
+                    features.append(feature)
         
-        return features
\ No newline at end of file
+        return features
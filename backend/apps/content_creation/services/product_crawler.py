@@ -0,0 +1,379 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.content_creation.models import ProductAnalysis, ProductCrawl
+from apps.content_creation.services.page_cache import CACHE_FIELDS, Validators, conditional_headers, revalidate
+from apps.content_creation.services.product_analyzer import ProductAnalyzer
+from apps.content_creation.services.store_catalog import (
+    CatalogUnavailable, StoreCatalog, parse_product_api, product_api_url, store_root
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Failed URLs kept on the crawl with their error
+MAX_RECORDED_ERRORS = 200
+
+ANALYSIS_UPDATE_FIELDS = [
+    'title', 'description', 'price', 'currency', 'images', 'features',
+    'category', 'brand', 'analysis_data', 'crawl', *CACHE_FIELDS,
+]
+
+
+def crawl_settings() -> Dict[str, Any]:
+    return settings.CONTENT_GENERATION.get('PRODUCT_CRAWL', {})
+
+
+def _is_json(response: httpx.Response) -> bool:
+    return 'json' in response.headers.get('Content-Type', '').lower()
+
+
+@dataclass
+class CrawlResult:
+    url: str
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    # Cache field values of the fetch; with unchanged set, only these are written
+    cache: Dict[str, Any] = field(default_factory=dict)
+    unchanged: bool = False
+
+
+class CrawlEngine:
+    """Fetches and parses many URLs concurrently on one asyncio event loop.
+
+    A request needs a slot of its domain (PER_DOMAIN_CONCURRENCY) and then a
+    global slot (GLOBAL_CONCURRENCY), so a busy domain never holds global slots
+    while it waits. Requests to one domain are spaced by DOMAIN_DELAY_SECONDS.
+    Timeouts, connection errors, 429 and 5xx are retried with backoff.
+
+    Product pages with a JSON twin (Shopify's /products/<handle>.json) are read
+    from it; the first product of a domain probes the endpoint and, if the
+    store clearly has none (an HTML answer, or no /products.json), the rest of
+    that domain goes straight to HTML. A missing product or a server error only
+    sends that product to HTML.
+
+    URLs with cached validators are fetched conditionally; a 304 or an
+    identical body is reported as unchanged without being parsed.
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[bytes, str], Dict[str, Any]],
+        parse_api: Callable[[bytes, str], Optional[Dict[str, Any]]] = parse_product_api,
+    ):
+        self.config = crawl_settings()
+        self.parse = parse
+        self.parse_api = parse_api
+        self.max_attempts = self.config.get('MAX_ATTEMPTS', 3)
+        self.backoff = self.config.get('RETRY_BACKOFF_SECONDS', 1)
+        self.delay = self.config.get('DOMAIN_DELAY_SECONDS', 0.25)
+
+    async def crawl(
+        self, urls: Iterable[str], emit: Callable[[CrawlResult], None], cached: Optional[Dict[str, Validators]] = None
+    ):
+        self._cached = cached or {}
+        concurrency = self.config.get('GLOBAL_CONCURRENCY', 32)
+        self._global = asyncio.Semaphore(concurrency)
+        self._domains: Dict[str, asyncio.Semaphore] = {}
+        self._next_request: Dict[str, float] = {}
+        self._api_support: Dict[str, bool] = {}
+        self._api_probes: Dict[str, asyncio.Lock] = {}
+
+        async with httpx.AsyncClient(
+            timeout=self.config.get('TIMEOUT_SECONDS', 15),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            headers={'User-Agent': self.config.get('USER_AGENT', 'Mozilla/5.0')},
+            follow_redirects=True,
+        ) as client:
+
+            async def _run(url):
+                emit(await self.analyze(client, url))
+
+            await asyncio.gather(*(_run(url) for url in urls))
+
+    async def analyze(self, client: httpx.AsyncClient, url: str) -> CrawlResult:
+        cached = self._cached.get(url)
+        api_url = product_api_url(url)
+        if api_url:
+            result = await self._from_api(client, url, api_url, cached)
+            if result is not None:
+                return result
+        try:
+            response, cache, unchanged = await self._revalidate(client, url, cached)
+            if unchanged:
+                return CrawlResult(url, cache=cache, unchanged=True)
+            # Parsing is CPU work; keep it off the loop so other fetches progress
+            data = await asyncio.to_thread(self.parse, response.content, str(response.url))
+        except Exception as e:
+            return CrawlResult(url, error=str(e) or e.__class__.__name__)
+        return CrawlResult(url, data=data, cache=cache)
+
+    async def _from_api(
+        self, client: httpx.AsyncClient, url: str, api_url: str, cached: Optional[Validators]
+    ) -> Optional[CrawlResult]:
+        domain = urlsplit(url).netloc.lower()
+        if domain not in self._api_support:
+            async with self._api_probes.setdefault(domain, asyncio.Lock()):
+                if domain not in self._api_support:
+                    result, supported = await self._fetch_api(client, url, api_url, cached)
+                    # An inconclusive probe (a 5xx, a timeout) leaves the next product to probe again
+                    if supported is not None:
+                        self._api_support[domain] = supported
+                    return result
+        if not self._api_support[domain]:
+            return None
+        result, _ = await self._fetch_api(client, url, api_url, cached)
+        return result
+
+    async def _fetch_api(
+        self, client: httpx.AsyncClient, url: str, api_url: str, cached: Optional[Validators]
+    ) -> Tuple[Optional[CrawlResult], Optional[bool]]:
+        """The product's JSON result, and whether the store serves product JSON (None if unclear)"""
+        try:
+            response, cache, unchanged = await self._revalidate(client, api_url, cached)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                # Only this product may be missing; the catalog endpoint says whether the store has JSON
+                return None, await self._has_catalog_api(client, api_url)
+            return None, None
+        except httpx.HTTPError:
+            return None, None
+        if unchanged:
+            return CrawlResult(url, cache=cache, unchanged=True), True
+        if not _is_json(response):
+            return None, False
+        data = self.parse_api(response.content, url)
+        return (CrawlResult(url, data=data, cache=cache), True) if data is not None else (None, False)
+
+    async def _has_catalog_api(self, client: httpx.AsyncClient, url: str) -> Optional[bool]:
+        try:
+            response = await self._fetch(client, f"{store_root(url)}/products.json?limit=1")
+        except httpx.HTTPStatusError as e:
+            return False if e.response.status_code == 404 else None
+        except httpx.HTTPError:
+            return None
+        return _is_json(response)
+
+    async def _revalidate(
+        self, client: httpx.AsyncClient, url: str, cached: Optional[Validators]
+    ) -> Tuple[httpx.Response, Dict[str, Any], bool]:
+        response = await self._fetch(client, url, conditional_headers(cached, url))
+        cache, unchanged = revalidate(url, response.status_code, response.headers, response.content, cached)
+        return response, cache, unchanged
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        domain = urlsplit(url).netloc.lower()
+        domain_slots = self._domains.setdefault(domain, asyncio.Semaphore(self.config.get('PER_DOMAIN_CONCURRENCY', 4)))
+        async with domain_slots:
+            for attempt in range(self.max_attempts):
+                await self._wait_turn(domain)
+                retry_after = None
+                try:
+                    async with self._global:
+                        response = await client.get(url, headers=headers)
+                except httpx.TransportError as e:
+                    error: Exception = e
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        if response.status_code != 304:
+                            response.raise_for_status()
+                        return response
+                    error = httpx.HTTPStatusError(f"{response.status_code} from {url}", request=response.request, response=response)
+                    retry_after = response.headers.get('Retry-After')
+                if attempt + 1 < self.max_attempts:
+                    await asyncio.sleep(self._retry_delay(attempt, retry_after))
+            raise error
+
+    async def _wait_turn(self, domain: str):
+        now = time.monotonic()
+        start = max(now, self._next_request.get(domain, now))
+        self._next_request[domain] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        delay = self.backoff * 2 ** attempt
+        try:
+            return min(60, max(delay, float(retry_after)))
+        except (TypeError, ValueError):
+            return delay
+
+
+class ProductCrawler:
+    """Runs a ProductCrawl: URLs are crawled concurrently and analyses upserted in batches.
+
+    The event loop runs on its own thread and hands results back through a
+    queue; all database writes happen on the calling thread. A crawl with a
+    store_url syncs the whole catalog instead, from products.json when the
+    store has it and otherwise by crawling the product pages in its sitemap.
+    """
+
+    def __init__(self, crawl: ProductCrawl, analyzer: Optional[ProductAnalyzer] = None):
+        self.crawl = crawl
+        self.config = crawl_settings()
+        self.analyzer = analyzer or ProductAnalyzer()
+        # Existing analyses of a refresh crawl, by URL: primary key and fetch validators
+        self._cached: Dict[str, Tuple[Any, Validators]] = {}
+
+    def run(self):
+        crawl = self.crawl
+        crawl.status = 'running'
+        crawl.started_at = timezone.now()
+        crawl.succeeded = crawl.failed = crawl.unchanged = 0
+        crawl.errors = {}
+        crawl.save(update_fields=['status', 'started_at', 'succeeded', 'failed', 'unchanged', 'errors', 'updated_at'])
+
+        try:
+            if crawl.store_url:
+                self._sync_store()
+            else:
+                self._crawl_urls()
+        except Exception as e:
+            logger.exception("product crawl %s failed", crawl.id)
+            ProductCrawl.objects.filter(pk=crawl.pk).update(
+                status='failed', error_message=str(e), completed_at=timezone.now(), updated_at=timezone.now()
+            )
+            raise
+
+        ProductCrawl.objects.filter(pk=crawl.pk).update(status='completed', completed_at=timezone.now(), updated_at=timezone.now())
+        crawl.refresh_from_db()
+
+    def _crawl_urls(self):
+        crawl = self.crawl
+        urls = self._pending_urls()
+        crawl.total = len(crawl.urls)
+        crawl.skipped = crawl.total - len(urls)
+        ProductCrawl.objects.filter(pk=crawl.pk).update(total=crawl.total, skipped=crawl.skipped)
+        if crawl.refresh:
+            self._cached = self._cached_validators(urls)
+
+        batch: List[CrawlResult] = []
+        for result in self._results(urls):
+            batch.append(result)
+            if len(batch) >= self.config.get('BATCH_SIZE', 100):
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _sync_store(self):
+        crawl = self.crawl
+        crawl.total = crawl.skipped = 0
+        ProductCrawl.objects.filter(pk=crawl.pk).update(total=0, skipped=0)
+
+        catalog = StoreCatalog(self.config)
+        try:
+            for page in catalog.product_pages(crawl.store_url):
+                crawl.total += len(page)
+                ProductCrawl.objects.filter(pk=crawl.pk).update(total=crawl.total)
+                fetched = {'fetched_at': timezone.now()}
+                self._write([CrawlResult(url, data=data, cache=fetched) for url, data in page])
+            return
+        except CatalogUnavailable as e:
+            logger.info("product crawl %s: %s; crawling the sitemap's product pages", crawl.id, e)
+            crawl.urls = catalog.sitemap_product_urls(crawl.store_url)
+        finally:
+            catalog.close()
+
+        ProductCrawl.objects.filter(pk=crawl.pk).update(urls=crawl.urls)
+        self._crawl_urls()
+
+    def _pending_urls(self) -> List[str]:
+        urls = list(dict.fromkeys(self.crawl.urls))
+        if self.crawl.refresh:
+            return urls
+        analyzed = set()
+        for start in range(0, len(urls), 1000):
+            analyzed.update(
+                ProductAnalysis.objects.filter(workspace_id=self.crawl.workspace_id, product_url__in=urls[start:start + 1000])
+                .exclude(analysis_data__has_key='error')
+                .values_list('product_url', flat=True)
+            )
+        return [url for url in urls if url not in analyzed]
+
+    def _cached_validators(self, urls: List[str]) -> Dict[str, Tuple[Any, Validators]]:
+        cached = {}
+        for start in range(0, len(urls), 1000):
+            for analysis in (
+                ProductAnalysis.objects.filter(workspace_id=self.crawl.workspace_id, product_url__in=urls[start:start + 1000])
+                .exclude(fetched_url=None)
+                .only('id', 'product_url', 'fetched_url', 'etag', 'last_modified', 'content_hash')
+            ):
+                cached[analysis.product_url] = (analysis.pk, Validators.of(analysis))
+        return cached
+
+    def _results(self, urls: List[str]) -> Iterator[CrawlResult]:
+        results: queue.Queue = queue.Queue()
+        done = object()
+        failure: List[BaseException] = []
+
+        def _loop():
+            try:
+                validators = {url: entry[1] for url, entry in self._cached.items()}
+                asyncio.run(CrawlEngine(self.analyzer.parse_product).crawl(urls, results.put, validators))
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                results.put(done)
+
+        thread = threading.Thread(target=_loop, name=f"product-crawl-{self.crawl.id}", daemon=True)
+        thread.start()
+        while True:
+            result = results.get()
+            if result is done:
+                break
+            yield result
+        thread.join()
+        if failure:
+            raise failure[0]
+
+    def _write(self, batch: List[CrawlResult]):
+        analyses = [
+            ProductAnalysis(
+                workspace_id=self.crawl.workspace_id,
+                product_url=result.url,
+                crawl=self.crawl,
+                **ProductAnalyzer.analysis_fields(result.data),
+                **result.cache,
+            )
+            for result in batch if result.data is not None
+        ]
+        # Unchanged pages only move their validators and fetch time forward
+        unchanged = [
+            ProductAnalysis(pk=self._cached[result.url][0], crawl=self.crawl, **result.cache)
+            for result in batch if result.unchanged and result.url in self._cached
+        ]
+        failed = {result.url: result.error for result in batch if result.error is not None}
+        errors = dict(self.crawl.errors)
+        for url, error in failed.items():
+            if len(errors) >= MAX_RECORDED_ERRORS:
+                break
+            errors[url] = error
+        self.crawl.errors = errors
+
+        with transaction.atomic():
+            ProductAnalysis.objects.bulk_create(
+                analyses,
+                update_conflicts=True,
+                unique_fields=['workspace', 'product_url'],
+                update_fields=ANALYSIS_UPDATE_FIELDS,
+            )
+            ProductAnalysis.objects.bulk_update(unchanged, ['crawl', *CACHE_FIELDS])
+            ProductCrawl.objects.filter(pk=self.crawl.pk).update(
+                succeeded=F('succeeded') + len(analyses) + len(unchanged),
+                unchanged=F('unchanged') + len(unchanged),
+                failed=F('failed') + len(failed),
+                errors=errors,
+                updated_at=timezone.now(),
+            )
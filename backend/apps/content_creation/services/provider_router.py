@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import redis
+from django.conf import settings
+from apps.content_creation.services.rate_limiter import RateLimitExceeded
+from apps.content_creation.services.redis_client import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+
+def _routing_settings() -> Dict[str, Any]:
+    return settings.CONTENT_GENERATION.get('PROVIDER_ROUTING', {})
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker state per provider.
+
+    State lives in Redis so every worker sees the same picture; when Redis is
+    unreachable each process falls back to its own in-memory window.
+    """
+
+    KEY_PREFIX = 'provrouter:'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(deque)
+        self._open_until = {}
+
+    def record(self, provider: str, latency_ms: float, success: bool):
+        config = _routing_settings()
+        window = config.get('WINDOW', 50)
+        sample = f"{int(latency_ms)}:{1 if success else 0}"
+
+        samples = self._push_shared(provider, sample, window)
+        if samples is None:
+            samples = self._push_local(provider, sample, window)
+
+        if not success:
+            outcomes = [s.endswith(':0') for s in samples]
+            error_rate = sum(outcomes) / len(outcomes)
+            if len(outcomes) >= config.get('MIN_SAMPLES', 5) and error_rate >= config.get('ERROR_RATE_THRESHOLD', 0.5):
+                self._open_circuit(provider, config.get('OPEN_SECONDS', 60))
+
+    def is_open(self, provider: str) -> bool:
+        client = get_redis()
+        if client is not None:
+            try:
+                return bool(client.exists(f"{self.KEY_PREFIX}{provider}:open"))
+            except redis.RedisError as e:
+                logger.warning("Provider health read failed: %s", e)
+                mark_redis_unavailable()
+        with self._lock:
+            return self._open_until.get(provider, 0) > time.monotonic()
+
+    def stats(self, provider: str) -> Dict[str, Any]:
+        samples = self._read_shared(provider)
+        if samples is None:
+            with self._lock:
+                samples = list(self._samples[provider])
+
+        latencies = [float(s.split(':')[0]) for s in samples]
+        failures = sum(1 for s in samples if s.endswith(':0'))
+        return {
+            'samples': len(samples),
+            'p50_ms': _percentile(latencies, 50),
+            'p95_ms': _percentile(latencies, 95),
+            'error_rate': failures / len(samples) if samples else 0.0,
+            'circuit_open': self.is_open(provider),
+        }
+
+    def reset_local(self):
+        with self._lock:
+            self._samples.clear()
+            self._open_until.clear()
+
+    def _push_shared(self, provider: str, sample: str, window: int) -> Optional[List[str]]:
+        client = get_redis()
+        if client is None:
+            return None
+        key = f"{self.KEY_PREFIX}{provider}:samples"
+        try:
+            pipe = client.pipeline()
+            pipe.lpush(key, sample)
+            pipe.ltrim(key, 0, window - 1)
+            pipe.lrange(key, 0, window - 1)
+            return [s.decode() for s in pipe.execute()[-1]]
+        except redis.RedisError as e:
+            logger.warning("Provider health write failed: %s", e)
+            mark_redis_unavailable()
+            return None
+
+    def _read_shared(self, provider: str) -> Optional[List[str]]:
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            return [s.decode() for s in client.lrange(f"{self.KEY_PREFIX}{provider}:samples", 0, -1)]
+        except redis.RedisError as e:
+            logger.warning("Provider health read failed: %s", e)
+            mark_redis_unavailable()
+            return None
+
+    def _push_local(self, provider: str, sample: str, window: int) -> List[str]:
+        with self._lock:
+            samples = self._samples[provider]
+            samples.appendleft(sample)
+            while len(samples) > window:
+                samples.pop()
+            return list(samples)
+
+    def _open_circuit(self, provider: str, seconds: int):
+        logger.warning("Opening circuit for provider %s for %ss", provider, seconds)
+        client = get_redis()
+        if client is not None:
+            try:
+                client.set(f"{self.KEY_PREFIX}{provider}:open", 1, ex=seconds)
+                return
+            except redis.RedisError as e:
+                logger.warning("Provider health write failed: %s", e)
+                mark_redis_unavailable()
+        with self._lock:
+            self._open_until[provider] = time.monotonic() + seconds
+
+
+provider_health = ProviderHealth()
+
+
+class ProviderRouter:
+    """Routes a call across interchangeable providers.
+
+    Providers with an open circuit are skipped, a requested provider whose p95
+    is over the latency budget is tried after faster healthy ones, and a
+    failing provider fails over to the next candidate.
+    """
+
+    def __init__(self, providers: Dict[str, Any], order: List[str], health: ProviderHealth = provider_health):
+        self.providers = providers
+        self.order = order
+        self.health = health
+
+    def candidates(self, requested: str) -> Tuple[List[str], List[Dict[str, str]]]:
+        """Ordered providers to try plus the ones skipped and why"""
+        names = [requested] + [name for name in self.order if name != requested and name in self.providers]
+        skipped = []
+
+        healthy = []
+        for name in names:
+            if self.health.is_open(name):
+                skipped.append({'provider': name, 'reason': 'circuit_open'})
+            else:
+                healthy.append(name)
+        if not healthy:
+            # Every circuit is open: still try the requested provider
+            return [requested], skipped
+
+        budget = _routing_settings().get('LATENCY_BUDGET_MS')
+        if budget and healthy[0] == requested and len(healthy) > 1:
+            p95 = self.health.stats(requested)['p95_ms']
+            if p95 is not None and p95 > budget:
+                healthy = healthy[1:] + [requested]
+                skipped.append({'provider': requested, 'reason': 'over_latency_budget'})
+
+        return healthy, skipped
+
+    def call(self, requested: str, invoke: Callable[[str, Any], Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Invoke providers in routing order until one succeeds.
+
+        `invoke` receives the provider name and instance and returns its result
+        dict. Returns (result, decision); the decision describes every attempt.
+        RateLimitExceeded propagates so the job waits instead of failing over.
+        """
+        names, skipped = self.candidates(requested)
+        decision = {'requested': requested, 'provider': None, 'attempts': [], 'skipped': skipped}
+        result = {'success': False, 'error': f"No available provider for '{requested}'"}
+
+        for name in names:
+            started = time.monotonic()
+            try:
+                result = invoke(name, self.providers[name])
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            latency_ms = (time.monotonic() - started) * 1000
+            ok = bool(result.get('success'))
+            self.health.record(name, latency_ms, ok)
+
+            attempt = {'provider': name, 'success': ok, 'latency_ms': round(latency_ms, 1)}
+            if not ok:
+                attempt['error'] = result.get('error')
+            decision['attempts'].append(attempt)
+
+            if ok:
+                decision['provider'] = name
+                break
+
+        return result, decision
@@ -1,6 +1,9 @@
+import asyncio
 import os
 from typing import Dict, List, Any
 from decouple import config
+from apps.content_creation.services.concurrency import gather_limited
+from apps.content_creation.services.providers.http_client import get_provider_session
 
 
 class HeyGenProvider:
@@ -10,6 +13,10 @@ class HeyGenProvider:
         self.api_key = config('HEYGEN_API_KEY', default='')
         self.base_url = 'https://api.heygen.com/v1'
     
+    @property
+    def session(self):
+        return get_provider_session()
+    
     def generate_video(self, script: str, avatar_settings: Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """Generate video with AI avatar"""
         
@@ -37,6 +44,10 @@ class HeyGenProvider:
         
         return video_data
     
+    async def agenerate_video(self, script: str, avatar_settings: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Async variant of generate_video"""
+        return await asyncio.to_thread(self.generate_video, script, avatar_settings, **kwargs)
+    
     def get_available_avatars(self, language: str = 'ar') -> List[Dict[str, Any]]:
         """Get available avatars for the specified language"""
         
@@ -197,6 +208,21 @@ class HeyGenProvider:
             'created_at': '2024-01-15T10:30:00Z'
         }
     
+    async def acheck_video_status(self, video_id: str) -> Dict[str, Any]:
+        """Async variant of check_video_status"""
+        return await asyncio.to_thread(self.check_video_status, video_id)
+    
+    async def acheck_video_statuses(self, video_ids: List[str]) -> Dict[str, Any]:
+        """Check many renders at once, keyed by video id.
+        
+        HeyGen has no bulk status endpoint, so ids are checked concurrently
+        under the provider's concurrency cap; a failed check maps to its exception.
+        """
+        results = await gather_limited('heygen', [
+            lambda video_id=video_id: self.acheck_video_status(video_id) for video_id in video_ids
+        ])
+        return dict(zip(video_ids, results))
+    
     def _estimate_duration(self, script: str) -> int:
         """Estimate video duration based on script length"""
         # Rough estimation: 150 words per minute for Arabic, 180 for English
@@ -0,0 +1,68 @@
+import os
+import threading
+from typing import Optional
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ProviderSession(requests.Session):
+    """requests.Session that always applies a (connect, read) timeout"""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+_lock = threading.Lock()
+_session: Optional[ProviderSession] = None
+_session_pid: Optional[int] = None
+
+
+def _build_session() -> ProviderSession:
+    http_settings = getattr(settings, 'PROVIDER_HTTP', {})
+    session = ProviderSession(timeout=(
+        http_settings.get('CONNECT_TIMEOUT', 5),
+        http_settings.get('READ_TIMEOUT', 60),
+    ))
+
+    # Only idempotent requests are retried; provider POSTs are never replayed
+    retry = Retry(
+        total=http_settings.get('MAX_RETRIES', 2),
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_settings.get('POOL_CONNECTIONS', 10),
+        pool_maxsize=http_settings.get('POOL_MAXSIZE', 32),
+        max_retries=retry,
+        pool_block=True,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_provider_session() -> ProviderSession:
+    """Return the process-wide pooled session shared by all content providers.
+
+    Keep-alive connections are reused across provider calls. The session is
+    rebuilt after a fork so prefork workers never share sockets with the parent.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _lock:
+        if _session is None or _session_pid != pid:
+            _session = _build_session()
+            _session_pid = pid
+        return _session
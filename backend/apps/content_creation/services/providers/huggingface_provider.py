@@ -1,6 +1,50 @@
-import requests
-from typing import Dict, List, Any
+import asyncio
+import json
+import logging
+from typing import Dict, Iterator, List, Any
 from decouple import config
+from apps.content_creation.services.providers.http_client import get_provider_session
+
+logger = logging.getLogger(__name__)
+
+
+# Structured output for packed requests: variations per task id
+TEXT_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "variations": {"type": "array", "items": {"type": "string"}}
+                },
+                "required": ["id", "variations"]
+            }
+        }
+    },
+    "required": ["items"]
+}
+
+# Completion budget per requested variation in a packed request
+TOKENS_PER_VARIATION = 64
+MAX_BATCH_TOKENS = 8192
+
+
+def is_variation_line(line: str) -> bool:
+    """Numbered or bulleted list item in a generated completion"""
+    line = line.strip()
+    return bool(line) and (line[0].isdigit() or line.startswith('-'))
+
+
+def parse_variations(generated_text: str, variations_count: int) -> List[str]:
+    """Split a completion into its list items, or keep it whole if it has none"""
+    variations = [line.strip() for line in generated_text.split('\n') if is_variation_line(line)]
+    if not variations:
+        variations = [generated_text]
+    return variations[:variations_count]
+
 
 class HuggingFaceProvider:
     """Hugging Face provider for text generation (OpenAI Compatible)"""
@@ -10,23 +54,27 @@ class HuggingFaceProvider:
         self.api_url = "https://router.huggingface.co/v1/chat/completions"
         self.model = "HuggingFaceH4/zephyr-7b-beta"
     
-    def generate_text(self, prompt: str, **kwargs) -> Dict[str, Any]:
-        """Generate text content using Hugging Face Chat API"""
-        
-        language = kwargs.get('language', 'ar')
-        tone = kwargs.get('tone', 'professional')
-        variations_count = kwargs.get('variations_count', 3)
-        
-        headers = {
+    @property
+    def session(self):
+        """Looked up per request: get_provider_session() rebuilds the pool after a fork"""
+        return get_provider_session()
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+    
+    def _build_payload(self, prompt: str, stream: bool, **kwargs) -> Dict[str, Any]:
+        language = kwargs.get('language', 'ar')
+        tone = kwargs.get('tone', 'professional')
+        variations_count = kwargs.get('variations_count', 3)
         
         # Construct chat messages
         system_prompt = f"You are a professional marketing copywriter. Tone: {tone}. Language: {language}."
         user_prompt = f"{prompt}\nPlease generate {variations_count} distinct variations. Return them as a numbered list."
         
-        payload = {
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -34,11 +82,24 @@ class HuggingFaceProvider:
             ],
             "max_tokens": 512,
             "temperature": 0.7,
-            "stream": False
+            "stream": stream
+        }
+    
+    def text_metadata(self, **kwargs) -> Dict[str, Any]:
+        return {
+            'language': kwargs.get('language', 'ar'),
+            'tone': kwargs.get('tone', 'professional'),
+            'provider': 'huggingface',
+            'model': self.model
         }
+    
+    def generate_text(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate text content using Hugging Face Chat API"""
+        
+        payload = self._build_payload(prompt, stream=False, **kwargs)
         
         try:
-            response = requests.post(self.api_url, headers=headers, json=payload)
+            response = self.session.post(self.api_url, headers=self._headers(), json=payload)
             response.raise_for_status()
             
             result = response.json()
@@ -46,23 +107,10 @@ class HuggingFaceProvider:
             # OpenAI compatible response structure
             generated_text = result['choices'][0]['message']['content']
             
-            # Split by newlines and look for numbered items
-            lines = generated_text.split('\n')
-            variations = [line.strip() for line in lines if line.strip() and (line[0].isdigit() or line.startswith('-'))]
-            
-            # Fallback if parsing fails
-            if not variations:
-                variations = [generated_text]
-                
             return {
                 'success': True,
-                'content': variations[:variations_count],
-                'metadata': {
-                    'language': language,
-                    'tone': tone,
-                    'provider': 'huggingface',
-                    'model': self.model
-                }
+                'content': parse_variations(generated_text, kwargs.get('variations_count', 3)),
+                'metadata': self.text_metadata(**kwargs)
             }
             
         except Exception as e:
@@ -70,9 +118,103 @@ class HuggingFaceProvider:
             if hasattr(e, 'response') and e.response is not None:
                 error_details += f" | Response: {e.response.text}"
             
-            print(f"Hugging Face API Error: {error_details}")
+            logger.warning("Hugging Face API error: %s", error_details)
             return {
                 'success': False,
                 'error': error_details,
                 'content': []
-            } 
+            }
+    
+    def stream_text(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield completion tokens as the chat-completions stream produces them.
+        
+        Raises on HTTP errors; the caller owns failure handling.
+        """
+        payload = self._build_payload(prompt, stream=True, **kwargs)
+        
+        with self.session.post(self.api_url, headers=self._headers(), json=payload, stream=True) as response:
+            response.raise_for_status()
+            
+            # Server-sent events: `data: {chunk}` lines, terminated by `data: [DONE]`.
+            # Decode whole lines so multi-byte (Arabic) characters are never split.
+            for raw_line in response.iter_lines():
+                line = raw_line.decode('utf-8')
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    break
+                
+                choices = json.loads(data).get('choices') or [{}]
+                token = (choices[0].get('delta') or {}).get('content')
+                if token:
+                    yield token
+    
+    def generate_text_batch(self, items: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+        """Generate variations for many prompts in one structured chat request.
+        
+        `items` are {'id', 'prompt'} dicts. Returns 'items' mapping each id that
+        came back well-formed to its variations; ids missing from the response
+        or with unusable output are left out so the caller can retry them.
+        """
+        language = kwargs.get('language', 'ar')
+        tone = kwargs.get('tone', 'professional')
+        variations_count = kwargs.get('variations_count', 3)
+        
+        system_prompt = f"You are a professional marketing copywriter. Tone: {tone}. Language: {language}."
+        user_prompt = (
+            f"Complete every task below. For each task return {variations_count} distinct variations "
+            "and echo the task id unchanged.\nTasks:\n"
+            + json.dumps(items, ensure_ascii=False)
+        )
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_tokens": min(MAX_BATCH_TOKENS, 128 + TOKENS_PER_VARIATION * variations_count * len(items)),
+            "temperature": 0.7,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "text_batch", "schema": TEXT_BATCH_SCHEMA}
+            },
+            "stream": False
+        }
+        
+        try:
+            response = self.session.post(self.api_url, headers=self._headers(), json=payload)
+            response.raise_for_status()
+            
+            generated_text = response.json()['choices'][0]['message']['content']
+            entries = json.loads(generated_text).get('items', [])
+        except Exception as e:
+            error_details = str(e)
+            if hasattr(e, 'response') and e.response is not None:
+                error_details += f" | Response: {e.response.text}"
+            
+            logger.warning("Hugging Face API error: %s", error_details)
+            return {
+                'success': False,
+                'error': error_details,
+                'items': {}
+            }
+        
+        requested_ids = {item['id'] for item in items}
+        parsed = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict) or entry.get('id') not in requested_ids:
+                continue
+            variations = [v.strip() for v in entry.get('variations') or [] if isinstance(v, str) and v.strip()]
+            if variations:
+                parsed[entry['id']] = variations[:variations_count]
+        
+        return {
+            'success': True,
+            'items': parsed,
+            'metadata': self.text_metadata(**kwargs)
+        }
+    
+    async def agenerate_text(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of generate_text; the HTTP call runs on a worker thread"""
+        return await asyncio.to_thread(self.generate_text, prompt, **kwargs)
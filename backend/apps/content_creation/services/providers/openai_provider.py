@@ -1,6 +1,8 @@
+import asyncio
 import os
 from typing import Dict, List, Any
 from decouple import config
+from apps.content_creation.services.providers.http_client import get_provider_session
 
 
 class OpenAIProvider:
@@ -9,6 +11,11 @@ class OpenAIProvider:
     def __init__(self):
         self.api_key = config('OPENAI_API_KEY', default='')
         self.base_url = 'https://api.openai.com/v1'
+        self.model = 'gpt-4'
+    
+    @property
+    def session(self):
+        return get_provider_session()
     
     def generate_text(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate text content using OpenAI"""
@@ -79,10 +86,25 @@ class OpenAIProvider:
                 'language': language,
                 'tone': tone,
                 'provider': 'openai',
-                'model': 'gpt-4'
+                'model': self.model
             }
         }
     
+    def generate_text_batch(self, items: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+        """Generate variations for many prompts in one request"""
+        
+        # Placeholder implementation, mirrors generate_text per item
+        results = {item['id']: self.generate_text(item['prompt'], **kwargs) for item in items}
+        return {
+            'success': True,
+            'items': {item_id: result['content'] for item_id, result in results.items()},
+            'metadata': next(iter(results.values()))['metadata'] if results else {}
+        }
+    
+    async def agenerate_text(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of generate_text"""
+        return await asyncio.to_thread(self.generate_text, prompt, **kwargs)
+    
     def generate_script(self, product_context: str, language: str = 'ar', **kwargs) -> Dict[str, Any]:
         """Generate video script for product"""
         
@@ -130,6 +152,10 @@ class OpenAIProvider:
             }
         }
     
+    async def agenerate_script(self, product_context: str, language: str = 'ar', **kwargs) -> Dict[str, Any]:
+        """Async variant of generate_script"""
+        return await asyncio.to_thread(self.generate_script, product_context, language, **kwargs)
+    
     def analyze_product_for_script(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze product data to generate script suggestions"""
         
@@ -1,6 +1,9 @@
+import asyncio
 import os
 from typing import Dict, List, Any
 from decouple import config
+from apps.content_creation.services.concurrency import gather_limited
+from apps.content_creation.services.providers.http_client import get_provider_session
 
 
 class StabilityProvider:
@@ -9,6 +12,11 @@ class StabilityProvider:
     def __init__(self):
         self.api_key = config('STABILITY_API_KEY', default='')
         self.base_url = 'https://api.stability.ai/v1'
+        self.model = 'stable-diffusion-xl'
+    
+    @property
+    def session(self):
+        return get_provider_session()
     
     def generate_image(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate image using Stability AI"""
@@ -17,34 +25,66 @@ class StabilityProvider:
         dimensions = kwargs.get('dimensions', '1024x1024')
         variations_count = kwargs.get('variations_count', 1)
         
-        # Mock image generation response
-        # In production, this would make actual API calls to Stability AI
+        width, height = (int(v) for v in dimensions.split('x'))
+        images = [
+            self._generate_single_image(prompt, i, style, width, height)
+            for i in range(variations_count)
+        ]
         
-        images = []
-        for i in range(variations_count):
-            image_data = {
-                'id': f'stability_img_{hash(prompt)}_{i}',
-                'url': f'https://example.com/generated_image_{i}.jpg',
-                'width': int(dimensions.split('x')[0]),
-                'height': int(dimensions.split('x')[1]),
-                'format': 'jpeg',
-                'file_size': 2048000,  # 2MB
-                'seed': 12345 + i
+        return {
+            'success': True,
+            'images': images,
+            'metadata': {
+                'prompt': prompt,
+                'style': style,
+                'dimensions': dimensions,
+                'provider': 'stability',
+                'model': self.model
             }
-            images.append(image_data)
+        }
+    
+    async def agenerate_image(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Generate all variations concurrently, capped by the provider concurrency limit"""
+        style = kwargs.get('style', 'realistic')
+        dimensions = kwargs.get('dimensions', '1024x1024')
+        variations_count = kwargs.get('variations_count', 1)
+        width, height = (int(v) for v in dimensions.split('x'))
+        
+        results = await gather_limited('stability', [
+            lambda i=i: asyncio.to_thread(self._generate_single_image, prompt, i, style, width, height)
+            for i in range(variations_count)
+        ])
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            return {'success': False, 'error': str(errors[0]), 'images': []}
         
         return {
             'success': True,
-            'images': images,
+            'images': results,
             'metadata': {
                 'prompt': prompt,
                 'style': style,
                 'dimensions': dimensions,
                 'provider': 'stability',
-                'model': 'stable-diffusion-xl'
+                'model': self.model
             }
         }
     
+    def _generate_single_image(self, prompt: str, index: int, style: str, width: int, height: int) -> Dict[str, Any]:
+        """Generate one image variation"""
+        
+        # Mock image generation response
+        # In production, this would make actual API calls to Stability AI
+        return {
+            'id': f'stability_img_{hash(prompt)}_{index}',
+            'url': f'https://example.com/generated_image_{index}.jpg',
+            'width': width,
+            'height': height,
+            'format': 'jpeg',
+            'file_size': 2048000,  # 2MB
+            'seed': 12345 + index
+        }
+    
     def get_available_styles(self) -> List[Dict[str, Any]]:
         """Get available image styles"""
         
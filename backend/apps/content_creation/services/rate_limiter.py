@@ -0,0 +1,154 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import redis
+from django.conf import settings
+from apps.content_creation.services.redis_client import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """No token became available within the allowed wait"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"Rate limit for provider '{provider}' exceeded, retry after {retry_after:.1f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+# Checks every bucket and only takes tokens when all of them can pay, so a
+# workspace's share is never consumed by a request the global bucket rejects.
+# ARGV: requested, then (rate per second, capacity) per key. Returns wait in ms.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local requested = tonumber(ARGV[1])
+local wait = 0
+local levels = {}
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+    levels[i] = tokens
+    if tokens < requested then
+        wait = math.max(wait, math.ceil((requested - tokens) * 1000 / rate))
+    end
+end
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[i * 2])
+    local capacity = tonumber(ARGV[i * 2 + 1])
+    local tokens = levels[i]
+    if wait == 0 then
+        tokens = tokens - requested
+    end
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil(capacity * 1000 / rate) + 1000)
+end
+return wait
+"""
+
+
+class TokenBucketLimiter:
+    """Token buckets per provider (global) and per (provider, workspace).
+
+    Each workspace may only use WORKSPACE_SHARE of a provider's rate, so one
+    tenant's burst cannot starve the others. Buckets live in Redis so limits
+    hold across all workers; without Redis each process enforces them locally.
+    """
+
+    KEY_PREFIX = 'ratelimit:'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}
+        self._script = None
+
+    def acquire(self, provider: str, workspace_id=None, tokens: int = 1, max_wait: Optional[float] = None):
+        """Block until tokens are available; raise RateLimitExceeded after max_wait seconds"""
+        buckets = self._buckets(provider, workspace_id)
+        if not buckets:
+            return
+
+        config = self._settings()
+        if max_wait is None:
+            max_wait = config.get('MAX_WAIT_SECONDS', 30)
+        tokens = min(tokens, min(capacity for _, _, capacity in buckets))
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            wait = self._try_acquire(buckets, tokens)
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimitExceeded(provider, wait)
+            time.sleep(wait)
+
+    def reset_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _settings(self) -> Dict:
+        return settings.CONTENT_GENERATION.get('RATE_LIMITS', {})
+
+    def _buckets(self, provider: str, workspace_id) -> List[Tuple[str, float, float]]:
+        """(key, rate per second, capacity) for every bucket the call must pay"""
+        config = self._settings()
+        limit = config.get('PROVIDERS', {}).get(provider)
+        if not limit:
+            return []
+
+        rate, burst = limit['rate'], limit.get('burst', limit['rate'])
+        buckets = [(f"{self.KEY_PREFIX}{provider}", rate, burst)]
+        share = config.get('WORKSPACE_SHARE')
+        if workspace_id and share:
+            buckets.append((
+                f"{self.KEY_PREFIX}{provider}:ws:{workspace_id}",
+                rate * share,
+                max(1, burst * share),
+            ))
+        return buckets
+
+    def _try_acquire(self, buckets, tokens: int) -> float:
+        """Take tokens from every bucket, or return seconds to wait"""
+        client = get_redis()
+        if client is not None:
+            try:
+                if self._script is None:
+                    self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+                args = [tokens]
+                for _, rate, capacity in buckets:
+                    args.extend([rate, capacity])
+                wait_ms = self._script(keys=[key for key, _, _ in buckets], args=args)
+                return int(wait_ms) / 1000
+            except redis.RedisError as e:
+                logger.warning("Rate limiter unavailable in Redis, limiting per process: %s", e)
+                mark_redis_unavailable()
+                self._script = None
+
+        return self._try_acquire_local(buckets, tokens)
+
+    def _try_acquire_local(self, buckets, tokens: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, rate, capacity in buckets:
+                level, ts = self._local.get(key, (capacity, now))
+                level = min(capacity, level + (now - ts) * rate)
+                levels.append(level)
+                if level < tokens:
+                    wait = max(wait, math.ceil((tokens - level) * 1000 / rate) / 1000)
+
+            for (key, _, _), level in zip(buckets, levels):
+                self._local[key] = (level - tokens if wait == 0 else level, now)
+            return wait
+
+
+rate_limiter = TokenBucketLimiter()
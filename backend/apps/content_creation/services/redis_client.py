@@ -0,0 +1,55 @@
+import logging
+import threading
+import time
+from typing import Optional
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# How long to wait before trying Redis again after it was found unreachable
+RETRY_INTERVAL_SECONDS = 30
+
+_lock = threading.Lock()
+_client: Optional[redis.Redis] = None
+_unavailable_until = 0.0
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Return the process-wide Redis client, or None while Redis is unreachable.
+
+    Callers keep an in-process fallback so a missing Redis degrades shared state
+    to per-process state instead of failing requests.
+    """
+    global _client, _unavailable_until
+
+    if _client is not None:
+        return _client
+    if time.monotonic() < _unavailable_until:
+        return None
+
+    with _lock:
+        if _client is not None:
+            return _client
+        try:
+            client = redis.from_url(
+                getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0'),
+                socket_connect_timeout=0.5,
+                socket_timeout=1,
+                health_check_interval=30,
+            )
+            client.ping()
+        except redis.RedisError as e:
+            logger.warning("Redis unavailable, using in-process state: %s", e)
+            _unavailable_until = time.monotonic() + RETRY_INTERVAL_SECONDS
+            return None
+        _client = client
+        return _client
+
+
+def mark_redis_unavailable():
+    """Drop the cached client after a command failure so the next call re-checks"""
+    global _client, _unavailable_until
+    with _lock:
+        _client = None
+        _unavailable_until = time.monotonic() + RETRY_INTERVAL_SECONDS
@@ -0,0 +1,180 @@
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'renditions'
+
+
+def _rendition_settings() -> Dict[str, Any]:
+    return settings.CONTENT_GENERATION.get('RENDITIONS', {})
+
+
+def rendition_prefix(sha256: str) -> str:
+    """Renditions are keyed by content hash, so deduplicated assets share them"""
+    return f"{RENDITIONS_DIR}/{sha256}"
+
+
+def should_render(asset) -> bool:
+    """Image and video assets whose file is in our storage"""
+    if not _rendition_settings().get('ENABLED', True):
+        return False
+    return asset.type in ('image', 'video') and asset.blob_id is not None
+
+
+class RenditionError(Exception):
+    """ffmpeg is missing or could not process the file"""
+
+
+class RenditionGenerator:
+    """Builds the small files the asset library shows instead of the original.
+
+    Images get WebP thumbnails at THUMBNAIL_WIDTHS; videos get a poster frame
+    (as WebP thumbnails) and a short low-bitrate MP4 preview through ffmpeg.
+    Files that already exist under the blob's prefix are reused, so retries
+    and assets sharing a blob do no work twice.
+    """
+
+    def __init__(self, storage=None):
+        self.config = _rendition_settings()
+        storage_alias = settings.CONTENT_GENERATION.get('MEDIA_INGEST', {}).get('STORAGE', 'generated_media')
+        self.storage = storage or storages[storage_alias]
+        self.widths = sorted(self.config.get('THUMBNAIL_WIDTHS', [256, 640]))
+        self.quality = self.config.get('WEBP_QUALITY', 80)
+
+    def render(self, asset) -> Dict[str, Any]:
+        blob = asset.blob
+        prefix = rendition_prefix(blob.sha256)
+        if asset.type == 'image':
+            return {'thumbnails': self._thumbnails(lambda: self.storage.open(blob.storage_name, 'rb'), f"{prefix}/image")}
+
+        # Videos: ffmpeg reads local files directly and remote storage over HTTP
+        with tempfile.TemporaryDirectory() as workdir:
+            def extract_poster():
+                poster_path = os.path.join(workdir, 'poster.png')
+                self._ffmpeg([
+                    '-ss', str(self.config.get('POSTER_OFFSET_SECONDS', 1)), '-i', self._input(blob.storage_name),
+                    '-frames:v', '1', poster_path
+                ])
+                return open(poster_path, 'rb')
+
+            thumbnails = self._thumbnails(extract_poster, f"{prefix}/poster")
+            return {'thumbnails': thumbnails, 'poster': thumbnails[-1], 'preview': self._preview(blob, prefix, workdir)}
+
+    def _thumbnails(self, open_source: Callable, prefix: str) -> List[Dict[str, Any]]:
+        """WebP thumbnails at each configured width; the source is only read if one is missing"""
+        thumbnails = []
+        image = None
+        for width in self.widths:
+            name = f"{prefix}_w{width}.webp"
+            if self.storage.exists(name):
+                thumbnails.append(self._describe(name, width))
+                continue
+            if image is None:
+                with open_source() as source:
+                    image = self._open(source)
+            thumbnail = self._resize(image, width)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, 'WEBP', quality=self.quality, method=4)
+            self.storage.save(name, ContentFile(buffer.getvalue()))
+            thumbnails.append(self._describe(name, thumbnail.width, thumbnail.height, buffer.tell()))
+        return thumbnails
+
+    def _open(self, source) -> Image.Image:
+        image = Image.open(source)
+        # JPEG decoders can downscale while decoding: skip the full-size decode
+        largest = self.widths[-1]
+        image.draft('RGB', (largest, largest * image.height // max(image.width, 1)))
+        image = ImageOps.exif_transpose(image)
+        return image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    def _resize(self, image: Image.Image, width: int) -> Image.Image:
+        if image.width <= width:
+            return image
+        height = max(1, round(image.height * width / image.width))
+        return image.resize((width, height), Image.Resampling.LANCZOS)
+
+    def _preview(self, blob, prefix: str, workdir: str) -> Dict[str, Any]:
+        name = f"{prefix}/preview.mp4"
+        width = self.config.get('PREVIEW_WIDTH', 480)
+        if self.storage.exists(name):
+            return self._describe(name, width)
+
+        preview_path = os.path.join(workdir, 'preview.mp4')
+        self._ffmpeg([
+            '-i', self._input(blob.storage_name),
+            '-t', str(self.config.get('PREVIEW_SECONDS', 6)),
+            '-vf', f"scale='min({width},iw)':-2",
+            '-c:v', 'libx264', '-preset', 'veryfast', '-b:v', self.config.get('PREVIEW_BITRATE', '400k'),
+            '-an', '-movflags', '+faststart', preview_path
+        ])
+        with open(preview_path, 'rb') as preview:
+            self.storage.save(name, File(preview, name='preview.mp4'))
+        return self._describe(name, width, size=os.path.getsize(preview_path))
+
+    def _input(self, name: str) -> str:
+        try:
+            return self.storage.path(name)
+        except NotImplementedError:
+            return self.storage.url(name)
+
+    def _ffmpeg(self, arguments: List[str]):
+        binary = shutil.which(self.config.get('FFMPEG_BINARY', 'ffmpeg'))
+        if binary is None:
+            raise RenditionError("ffmpeg is not installed")
+        result = subprocess.run(
+            [binary, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', *arguments],
+            capture_output=True, timeout=self.config.get('FFMPEG_TIMEOUT_SECONDS', 120)
+        )
+        if result.returncode != 0:
+            raise RenditionError(result.stderr.decode('utf-8', 'replace').strip() or 'ffmpeg failed')
+
+    def _describe(self, name: str, width: int, height: Optional[int] = None, size: Optional[int] = None) -> Dict[str, Any]:
+        rendition = {'name': name, 'url': self.storage.url(name), 'width': width}
+        if height is not None:
+            rendition['height'] = height
+        if size is not None:
+            rendition['size'] = size
+        return rendition
+
+
+def render_asset(asset, generator: Optional[RenditionGenerator] = None) -> bool:
+    """Build and record the asset's renditions; returns True on success.
+
+    Failures are recorded on the asset and leave it usable at its original URL.
+    """
+    if not should_render(asset):
+        return False
+
+    try:
+        renditions = (generator or RenditionGenerator()).render(asset)
+    except Exception as e:
+        logger.warning("Could not build renditions for asset %s: %s", asset.id, e)
+        asset.renditions = {'error': str(e)}
+        asset.save(update_fields=['renditions', 'updated_at'])
+        return False
+
+    asset.renditions = renditions
+    asset.save(update_fields=['renditions', 'updated_at'])
+    return True
+
+
+def delete_renditions(storage, sha256: str):
+    """Remove every rendition built for a blob"""
+    prefix = rendition_prefix(sha256)
+    try:
+        _, files = storage.listdir(prefix)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        storage.delete(f"{prefix}/{name}")
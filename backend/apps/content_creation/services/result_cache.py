@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import redis
+from django.conf import settings
+from apps.content_creation.services.redis_client import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationResultCache:
+    """Two-tier cache for provider results keyed on (provider, model, prompt, parameters).
+
+    The local tier is a per-process LRU bounded by entry count; the shared tier is
+    Redis with a TTL (eviction beyond that follows the server's maxmemory policy).
+    Both hold the serialized JSON, so every hit is a fresh copy callers may mutate.
+    """
+
+    KEY_PREFIX = 'gencache:'
+
+    def __init__(self, ttl: int = 86400, local_max_entries: int = 1024, max_entry_bytes: int = 256 * 1024):
+        self.ttl = ttl
+        self.local_max_entries = local_max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, parameters: Dict[str, Any]) -> str:
+        """Canonical content hash of a provider request"""
+        canonical = json.dumps(
+            {'provider': provider, 'model': model, 'prompt': prompt, 'parameters': parameters},
+            sort_keys=True,
+            separators=(',', ':'),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self._get_local(key)
+        if payload is not None:
+            return json.loads(payload)
+
+        client = get_redis()
+        if client is None:
+            return None
+        try:
+            raw = client.get(self.KEY_PREFIX + key)
+        except redis.RedisError as e:
+            logger.warning("Result cache read failed: %s", e)
+            mark_redis_unavailable()
+            return None
+        if raw is None:
+            return None
+
+        payload = raw.decode('utf-8') if isinstance(raw, bytes) else raw
+        self._set_local(key, payload)
+        return json.loads(payload)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        if len(payload.encode('utf-8')) > self.max_entry_bytes:
+            return
+
+        self._set_local(key, payload)
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            client.setex(self.KEY_PREFIX + key, self.ttl, payload)
+        except redis.RedisError as e:
+            logger.warning("Result cache write failed: %s", e)
+            mark_redis_unavailable()
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return payload
+
+    def _set_local(self, key: str, payload: str):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, payload)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+
+_generation_settings = getattr(settings, 'CONTENT_GENERATION', {})
+
+generation_cache = GenerationResultCache(
+    ttl=_generation_settings.get('RESULT_CACHE_TTL', 86400),
+    local_max_entries=_generation_settings.get('RESULT_CACHE_LOCAL_MAX_ENTRIES', 1024),
+    max_entry_bytes=_generation_settings.get('RESULT_CACHE_MAX_ENTRY_BYTES', 256 * 1024),
+)
@@ -0,0 +1,180 @@
+import html
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+import httpx
+from lxml import etree
+
+# /products/<handle>, optionally under a collection or locale prefix
+PRODUCT_PATH_RE = re.compile(r'/products/([^/?#]+?)(?:\.json|\.js)?/?$')
+# Product pages in sitemaps that do not split products into their own file
+SITEMAP_PRODUCT_RE = re.compile(r'/products?/[^/]+|/p\d+/?$', re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]+>')
+
+# Hosted platforms whose /products/ paths are not Shopify and have no public catalog API
+NON_SHOPIFY_HOSTS = ('salla.sa', 'zid.sa', 'zid.store', 'amazon.', 'noon.com')
+
+MAX_IMAGES = 5
+MAX_SITEMAPS = 50
+
+
+class CatalogUnavailable(Exception):
+    """The store exposes no public product JSON; fall back to its HTML pages"""
+
+
+def _has_public_api(host: str) -> bool:
+    return not any(marker in host for marker in NON_SHOPIFY_HOSTS)
+
+
+def store_root(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def product_api_url(url: str) -> Optional[str]:
+    """The Shopify /products/<handle>.json URL for a product page, or None"""
+    parts = urlsplit(url)
+    match = PRODUCT_PATH_RE.search(parts.path)
+    if not match or not _has_public_api(parts.netloc.lower()):
+        return None
+    return f"{store_root(url)}/products/{match.group(1)}.json"
+
+
+def parse_product_api(body: bytes, url: str) -> Optional[Dict[str, Any]]:
+    """Product data from a /products/<handle>.json response, or None if it isn't one"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    product = data.get('product') if isinstance(data, dict) else None
+    if not isinstance(product, dict) or not product.get('title'):
+        return None
+    return product_from_shopify(product, url)
+
+
+def product_from_shopify(product: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+    """Analyzer fields for a Shopify product object, as served by products.json and <handle>.json"""
+    variants = [variant for variant in product.get('variants') or [] if isinstance(variant, dict)]
+    prices = []
+    for variant in variants:
+        try:
+            prices.append(float(variant.get('price')))
+        except (TypeError, ValueError):
+            continue
+
+    images = []
+    for image in product.get('images') or []:
+        src = image.get('src') if isinstance(image, dict) else image
+        if isinstance(src, str) and src:
+            images.append(urljoin(base_url, src))
+
+    # products.json sends tags as a list, <handle>.json as a comma-separated string
+    tags = product.get('tags') or []
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+
+    data = {
+        'title': product.get('title'),
+        'description': ' '.join(html.unescape(TAG_RE.sub(' ', product.get('body_html') or '')).split()) or None,
+        'price': min(prices) if prices else None,
+        'images': list(dict.fromkeys(images))[:MAX_IMAGES],
+        'features': [],
+        'brand': product.get('vendor') or None,
+        'category': product.get('product_type') or None,
+        'tags': tags,
+        'sku': next((variant['sku'] for variant in variants if variant.get('sku')), None),
+        'external_id': product.get('id'),
+        'source': 'shopify_api',
+    }
+    # Only products.json reports stock per variant
+    if any('available' in variant for variant in variants):
+        data['availability'] = 'instock' if any(variant.get('available') for variant in variants) else 'outofstock'
+    return data
+
+
+class StoreCatalog:
+    """Lists a whole store's products with as few requests as the platform allows.
+
+    Shopify serves its catalog from /products.json, up to PAGE_SIZE products a
+    request. Salla and Zid have no public catalog endpoint, so for them (and
+    any store without products.json) the product URLs come from the sitemap
+    and the pages are crawled as HTML.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.page_size = config.get('CATALOG_PAGE_SIZE', 250)
+        self.max_urls = config.get('MAX_URLS', 10000)
+        self.client = httpx.Client(
+            timeout=config.get('TIMEOUT_SECONDS', 15),
+            headers={'User-Agent': config.get('USER_AGENT', 'Mozilla/5.0')},
+            follow_redirects=True,
+        )
+
+    def close(self):
+        self.client.close()
+
+    def product_pages(self, store_url: str) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+        """(product URL, data) pairs one products.json page at a time.
+
+        Raises CatalogUnavailable before yielding anything if the store has no
+        products.json.
+        """
+        root = store_root(store_url)
+        if not _has_public_api(urlsplit(root).netloc.lower()):
+            raise CatalogUnavailable(f"{root} has no public catalog API")
+
+        page, seen = 1, 0
+        while seen < self.max_urls:
+            try:
+                response = self.client.get(f"{root}/products.json", params={'limit': self.page_size, 'page': page})
+                response.raise_for_status()
+                products = response.json().get('products')
+            except (httpx.HTTPStatusError, ValueError, AttributeError) as e:
+                if page == 1:
+                    raise CatalogUnavailable(f"{root} has no products.json: {e}")
+                raise
+            if not isinstance(products, list):
+                if page == 1:
+                    raise CatalogUnavailable(f"{root}/products.json did not list products")
+                break
+
+            items = [
+                (f"{root}/products/{product['handle']}", product_from_shopify(product, root))
+                for product in products if isinstance(product, dict) and product.get('handle')
+            ][:self.max_urls - seen]
+            if items:
+                yield items
+            seen += len(items)
+            if len(products) < self.page_size:
+                break
+            page += 1
+
+    def sitemap_product_urls(self, store_url: str) -> List[str]:
+        """Product page URLs from the store's sitemap, following a sitemap index one level"""
+        root = store_root(store_url)
+        kind, locations = self._sitemap(f"{root}/sitemap.xml")
+        if kind != 'sitemapindex':
+            return [url for url in locations if SITEMAP_PRODUCT_RE.search(urlsplit(url).path)][:self.max_urls]
+
+        # Platforms split products into their own sitemaps; read only those when present
+        product_maps = [location for location in locations if 'product' in location.lower()]
+        urls: List[str] = []
+        for location in (product_maps or locations)[:MAX_SITEMAPS]:
+            _, children = self._sitemap(location)
+            if not product_maps:
+                children = [url for url in children if SITEMAP_PRODUCT_RE.search(urlsplit(url).path)]
+            urls.extend(children)
+            if len(urls) >= self.max_urls:
+                break
+        return list(dict.fromkeys(urls))[:self.max_urls]
+
+    def _sitemap(self, url: str) -> Tuple[str, List[str]]:
+        response = self.client.get(url)
+        response.raise_for_status()
+        parser = etree.XMLParser(resolve_entities=False, no_network=True, recover=True)
+        root = etree.fromstring(response.content, parser)
+        if root is None:
+            return 'urlset', []
+        kind = etree.QName(root).localname
+        return kind, [loc.text.strip() for loc in root.iter('{*}loc') if loc.text and loc.text.strip()]
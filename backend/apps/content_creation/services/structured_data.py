@@ -0,0 +1,236 @@
+import html
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+from bs4 import UnicodeDammit
+
+# Regex scans over the raw page: no DOM is built, so a page with complete
+# structured data is analyzed without parsing the HTML at all.
+JSON_LD_RE = re.compile(
+    r'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+META_TAG_RE = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+ITEMPROP_TAG_RE = re.compile(
+    r'(<(\w+)\s[^>]*\bitemprop\s*=\s*["\']([\w\s]+)["\'][^>]*>)([^<]*)',
+    re.IGNORECASE,
+)
+MICRODATA_PRODUCT_RE = re.compile(r'itemtype\s*=\s*["\']https?://schema\.org/Product["\']', re.IGNORECASE)
+ATTRIBUTE_RE = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Fields that let the analyzer skip the selector scrapers
+REQUIRED_FIELDS = ('title', 'price', 'images')
+
+MAX_IMAGES = 5
+
+
+def decode_page(page: bytes) -> str:
+    """Page text in its declared charset, else a sniffed one, as BeautifulSoup decodes it"""
+    return UnicodeDammit(page, is_html=True).unicode_markup or ''
+
+
+def extract_structured_product(page: bytes, url: str) -> Dict[str, Any]:
+    """Product fields from JSON-LD, microdata and OpenGraph, in that order of precedence.
+
+    Only fields actually found are returned, plus `structured_sources` naming
+    the formats that contributed.
+    """
+    text = decode_page(page) if isinstance(page, bytes) else page
+    product: Dict[str, Any] = {}
+    sources: List[str] = []
+    for name, extract in (('json-ld', _from_json_ld), ('microdata', _from_microdata), ('opengraph', _from_opengraph)):
+        found = {key: value for key, value in extract(text).items() if value not in (None, '', [])}
+        if found:
+            sources.append(name)
+        for key, value in found.items():
+            product.setdefault(key, value)
+
+    if product.get('images'):
+        product['images'] = list(dict.fromkeys(urljoin(url, image) for image in product['images']))[:MAX_IMAGES]
+    if sources:
+        product['structured_sources'] = sources
+    return product
+
+
+def is_complete(product: Dict[str, Any]) -> bool:
+    return all(product.get(field) for field in REQUIRED_FIELDS)
+
+
+def _from_json_ld(text: str) -> Dict[str, Any]:
+    for block in JSON_LD_RE.findall(text):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        for node in _nodes(data):
+            types = node.get('@type')
+            types = types if isinstance(types, list) else [types]
+            if 'Product' in types or 'ProductGroup' in types:
+                return _product_from_node(node)
+    return {}
+
+
+def _nodes(data: Any) -> Iterator[Dict[str, Any]]:
+    """Every object in a JSON-LD document, including @graph members"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        for key in ('@graph', 'mainEntity', 'itemListElement'):
+            if key in data:
+                yield from _nodes(data[key])
+
+
+def _product_from_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    offers = node.get('offers') or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if not isinstance(offers, dict):
+        offers = {}
+    # Variant groups carry their offers on the variants
+    if not offers and isinstance(node.get('hasVariant'), list) and node['hasVariant']:
+        variant_offers = node['hasVariant'][0].get('offers') if isinstance(node['hasVariant'][0], dict) else None
+        offers = variant_offers[0] if isinstance(variant_offers, list) and variant_offers else variant_offers or {}
+    price_spec = offers.get('priceSpecification')
+    if isinstance(price_spec, list):
+        price_spec = price_spec[0] if price_spec else None
+
+    brand = node.get('brand')
+    if isinstance(brand, list):
+        brand = brand[0] if brand else None
+    if isinstance(brand, dict):
+        brand = brand.get('name')
+
+    category = node.get('category')
+    if isinstance(category, dict):
+        category = category.get('name')
+
+    return {
+        'title': _text(node.get('name')),
+        'description': _text(node.get('description')),
+        'price': _price(
+            offers.get('price') or offers.get('lowPrice')
+            or (price_spec.get('price') if isinstance(price_spec, dict) else None)
+        ),
+        'currency': _currency(
+            offers.get('priceCurrency')
+            or (price_spec.get('priceCurrency') if isinstance(price_spec, dict) else None)
+        ),
+        'images': _images(node.get('image')),
+        'brand': _text(brand),
+        'category': _text(category),
+        'availability': _availability(offers.get('availability')),
+        'sku': _text(node.get('sku')),
+    }
+
+
+def _from_microdata(text: str) -> Dict[str, Any]:
+    if not MICRODATA_PRODUCT_RE.search(text):
+        return {}
+    props: Dict[str, List[str]] = {}
+    for tag, name, names, inner in ITEMPROP_TAG_RE.findall(text):
+        attributes = _attributes(tag)
+        name = name.lower()
+        if 'content' in attributes:
+            value = attributes['content']
+        elif name in ('link', 'a') and 'href' in attributes:
+            value = attributes['href']
+        elif name == 'img':
+            value = attributes.get('src') or attributes.get('data-src') or ''
+        else:
+            value = inner
+        for prop in names.split():
+            props.setdefault(prop, []).append(value)
+
+    def first(key):
+        # Nested items (brand, offers) reuse "name"; the product's own comes first
+        values = [value for value in props.get(key, []) if value.strip()]
+        return values[0] if values else None
+
+    return {
+        'title': _text(first('name')),
+        'description': _text(first('description')),
+        'price': _price(first('price') or first('lowPrice')),
+        'currency': _currency(first('priceCurrency')),
+        'images': _images(props.get('image')),
+        'sku': _text(first('sku')),
+        'availability': _availability(first('availability')),
+    }
+
+
+def _from_opengraph(text: str) -> Dict[str, Any]:
+    meta: Dict[str, List[str]] = {}
+    for tag in META_TAG_RE.findall(text):
+        attributes = _attributes(tag)
+        key = (attributes.get('property') or attributes.get('name') or '').lower()
+        if key and 'content' in attributes:
+            meta.setdefault(key, []).append(attributes['content'])
+
+    def first(*keys):
+        for key in keys:
+            if meta.get(key):
+                return meta[key][0]
+        return None
+
+    return {
+        'title': _text(first('og:title', 'twitter:title')),
+        'description': _text(first('og:description', 'description', 'twitter:description')),
+        'price': _price(first('product:price:amount', 'og:price:amount', 'product:sale_price:amount')),
+        'currency': _currency(first('product:price:currency', 'og:price:currency')),
+        'images': meta.get('og:image') or meta.get('og:image:url') or meta.get('og:image:secure_url') or [],
+        'brand': _text(first('product:brand', 'og:brand')),
+        'availability': _availability(first('product:availability', 'og:availability')),
+    }
+
+
+def _attributes(tag: str) -> Dict[str, str]:
+    return {name.lower(): html.unescape(double or single) for name, double, single in ATTRIBUTE_RE.findall(tag)}
+
+
+def _text(value: Any) -> Optional[str]:
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if value is None or isinstance(value, (dict, bool)):
+        return None
+    value = ' '.join(html.unescape(str(value)).split())
+    return value or None
+
+
+def _price(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = PRICE_RE.search(value.replace(',', ''))
+    return float(match.group()) if match else None
+
+
+def _currency(value: Any) -> Optional[str]:
+    value = _text(value)
+    if value and len(value) == 3 and value.isalpha():
+        return value.upper()
+    return None
+
+
+def _availability(value: Any) -> Optional[str]:
+    value = _text(value)
+    if not value:
+        return None
+    # schema.org URLs ("https://schema.org/InStock") or bare values ("instock", "in stock")
+    return value.rstrip('/').rsplit('/', 1)[-1].replace(' ', '').lower()
+
+
+def _images(value: Any) -> List[str]:
+    if not value:
+        return []
+    values = value if isinstance(value, list) else [value]
+    images = []
+    for item in values:
+        if isinstance(item, dict):
+            item = item.get('url') or item.get('contentUrl')
+        if isinstance(item, str) and item.strip():
+            images.append(item.strip())
+    return images
@@ -0,0 +1,101 @@
+"""Transcoding functions run in the transcoder's process pool.
+
+Kept free of Django imports so spawned pool processes start quickly and
+never touch the database.
+"""
+import json
+import os
+import subprocess
+from typing import Any, Dict, List, Optional
+from PIL import Image, ImageOps
+
+MIN_JPEG_QUALITY = 40
+MIN_VIDEO_KBPS = 150
+
+
+class TranscodeError(Exception):
+    """The source could not be encoded to the requested spec"""
+
+
+def transcode_image(source_path: str, output_path: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Crop (or pad) to the spec's frame and encode JPEG, lowering quality until it fits max_bytes"""
+    size = (spec['width'], spec['height'])
+    with Image.open(source_path) as image:
+        image.draft('RGB', size)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    if spec.get('fit', 'crop') == 'pad':
+        image = ImageOps.pad(image, size, Image.Resampling.LANCZOS, color=spec.get('background', '#000000'))
+    else:
+        image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+    max_bytes = spec.get('max_bytes')
+    quality = spec.get('quality', 90)
+    while True:
+        image.save(output_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        output_size = os.path.getsize(output_path)
+        if not max_bytes or output_size <= max_bytes or quality <= MIN_JPEG_QUALITY:
+            break
+        quality -= 10
+
+    if max_bytes and output_size > max_bytes:
+        raise TranscodeError(f"Image is still {output_size} bytes at quality {quality} (limit {max_bytes})")
+    return {'size': output_size, 'width': size[0], 'height': size[1], 'mime_type': 'image/jpeg'}
+
+
+def transcode_video(source_path: str, output_path: str, spec: Dict[str, Any], ffmpeg: str, ffprobe: Optional[str],
+                    timeout: int) -> Dict[str, Any]:
+    """Encode H.264/AAC MP4 in the spec's frame, capping the bitrate so the file fits max_bytes"""
+    width, height = spec['width'], spec['height']
+    duration = _probe_duration(ffprobe, source_path, timeout) if ffprobe else None
+    if spec.get('max_duration') and (duration is None or duration > spec['max_duration']):
+        duration = spec['max_duration']
+
+    audio_kbps = spec.get('audio_kbps', 128)
+    video_kbps = spec.get('video_kbps', 6000)
+    if duration and spec.get('max_bytes'):
+        # Leave 5% for container overhead and encoder overshoot
+        budget = int(spec['max_bytes'] * 8 * 0.95 / duration / 1000) - audio_kbps
+        video_kbps = max(MIN_VIDEO_KBPS, min(video_kbps, budget))
+
+    if spec.get('fit', 'crop') == 'pad':
+        frame = (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                 f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2")
+    else:
+        frame = f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}"
+
+    arguments = [ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-i', source_path]
+    if spec.get('max_duration'):
+        arguments += ['-t', str(spec['max_duration'])]
+    arguments += [
+        '-vf', f"{frame},setsar=1,fps={spec.get('fps', 30)}",
+        '-c:v', 'libx264', '-profile:v', 'high', '-pix_fmt', 'yuv420p', '-preset', spec.get('preset', 'medium'),
+        '-b:v', f'{video_kbps}k', '-maxrate', f'{video_kbps}k', '-bufsize', f'{video_kbps * 2}k',
+        '-c:a', 'aac', '-b:a', f'{audio_kbps}k', '-ar', '48000',
+        '-movflags', '+faststart', output_path
+    ]
+    _run(arguments, timeout)
+
+    output_size = os.path.getsize(output_path)
+    if spec.get('max_bytes') and output_size > spec['max_bytes']:
+        raise TranscodeError(f"Video is {output_size} bytes after encoding (limit {spec['max_bytes']})")
+    return {'size': output_size, 'width': width, 'height': height, 'mime_type': 'video/mp4'}
+
+
+def _probe_duration(ffprobe: str, source_path: str, timeout: int) -> Optional[float]:
+    try:
+        output = _run([
+            ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', source_path
+        ], timeout)
+        return float(json.loads(output)['format']['duration'])
+    except (TranscodeError, KeyError, ValueError):
+        return None
+
+
+def _run(arguments: List[str], timeout: int) -> bytes:
+    try:
+        result = subprocess.run(arguments, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise TranscodeError(f"{os.path.basename(arguments[0])} timed out after {timeout}s")
+    if result.returncode != 0:
+        raise TranscodeError(result.stderr.decode('utf-8', 'replace').strip() or f"{arguments[0]} failed")
+    return result.stdout
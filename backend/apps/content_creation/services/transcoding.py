@@ -0,0 +1,211 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.content_creation.models import AssetVariant, ContentAsset, MediaBlob
+from apps.content_creation.services.transcode_worker import TranscodeError, transcode_image, transcode_video
+
+VARIANTS_DIR = 'variants'
+
+# Delivery specs per platform placement: frame, codec limits and file size caps
+PLATFORM_SPECS = {
+    'meta_feed_image': {'kind': 'image', 'width': 1080, 'height': 1080, 'max_bytes': 30 * 1024 * 1024},
+    'meta_story_image': {'kind': 'image', 'width': 1080, 'height': 1920, 'max_bytes': 30 * 1024 * 1024},
+    'meta_feed_video': {
+        'kind': 'video', 'width': 1080, 'height': 1350, 'fps': 30, 'video_kbps': 8000, 'audio_kbps': 128,
+        'max_bytes': 4 * 1024 * 1024 * 1024,
+    },
+    'meta_story_video': {
+        'kind': 'video', 'width': 1080, 'height': 1920, 'fps': 30, 'video_kbps': 8000, 'audio_kbps': 128,
+        'max_bytes': 4 * 1024 * 1024 * 1024, 'max_duration': 60,
+    },
+    'tiktok_video': {
+        'kind': 'video', 'width': 1080, 'height': 1920, 'fps': 30, 'video_kbps': 6000, 'audio_kbps': 128,
+        'max_bytes': 500 * 1024 * 1024, 'max_duration': 600,
+    },
+    'snapchat_image': {'kind': 'image', 'width': 1080, 'height': 1920, 'max_bytes': 5 * 1024 * 1024},
+    'snapchat_video': {
+        'kind': 'video', 'width': 1080, 'height': 1920, 'fps': 30, 'video_kbps': 6000, 'audio_kbps': 128,
+        'max_bytes': 1024 * 1024 * 1024, 'max_duration': 180,
+    },
+}
+
+
+def _transcoding_settings() -> Dict[str, Any]:
+    return settings.CONTENT_GENERATION.get('TRANSCODING', {})
+
+
+def spec_fingerprint(spec: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+
+
+def get_transcode_pool() -> Optional[Executor]:
+    """Shared pool for encodes, or None to encode inline (WORKERS = 0).
+
+    Pool processes are spawned, not forked, so they never inherit database
+    connections or locks. Daemonic processes (Celery prefork children) cannot
+    have children, so there the pool falls back to threads; ffmpeg still runs
+    as its own process and Pillow releases the GIL while resampling.
+    """
+    global _pool
+    workers = _transcoding_settings().get('WORKERS', 2)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            if multiprocessing.current_process().daemon:
+                _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcode')
+            else:
+                _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+class Transcoder:
+    """Produces platform-spec variants of a stored asset.
+
+    Variants are cached per (blob, spec) in AssetVariant, so an asset published
+    again (or another asset with the same bytes) reuses earlier encodes. Missing
+    variants are encoded in parallel on the transcode pool.
+    """
+
+    def __init__(self, storage=None, pool: Optional[Executor] = None):
+        config = _transcoding_settings()
+        storage_alias = settings.CONTENT_GENERATION.get('MEDIA_INGEST', {}).get('STORAGE', 'generated_media')
+        self.storage = storage or storages[storage_alias]
+        self.pool = pool if pool is not None else get_transcode_pool()
+        self.ffmpeg = shutil.which(config.get('FFMPEG_BINARY', 'ffmpeg'))
+        self.ffprobe = shutil.which(config.get('FFPROBE_BINARY', 'ffprobe'))
+        self.timeout = config.get('FFMPEG_TIMEOUT_SECONDS', 600)
+
+    def variant(self, asset: ContentAsset, spec_name: str) -> AssetVariant:
+        return self.variants(asset, [spec_name])[spec_name]
+
+    def variants(self, asset: ContentAsset, spec_names: Iterable[str]) -> Dict[str, AssetVariant]:
+        """Variants of the asset for each spec, encoding only those not cached yet"""
+        cached, missing = self.cached_variants(asset, spec_names)
+        if missing:
+            cached.update(self._encode(asset.blob, missing))
+        return cached
+    
+    def cached_variants(self, asset: ContentAsset, spec_names: Iterable[str]):
+        """Variants already encoded for the asset, and the specs still missing; never encodes"""
+        specs = {name: self._spec(asset, name) for name in spec_names}
+        cached = {
+            variant.spec: variant
+            for variant in AssetVariant.objects.filter(blob=asset.blob, spec__in=specs)
+            if variant.spec_hash == spec_fingerprint(specs[variant.spec])
+        }
+        return cached, {name: spec for name, spec in specs.items() if name not in cached}
+
+    def open(self, variant: AssetVariant):
+        return self.storage.open(variant.storage_name, 'rb')
+
+    def _spec(self, asset: ContentAsset, name: str) -> Dict[str, Any]:
+        spec = PLATFORM_SPECS.get(name)
+        if spec is None:
+            raise TranscodeError(f"Unknown platform spec '{name}'")
+        if spec['kind'] != asset.type:
+            raise TranscodeError(f"Spec '{name}' is for {spec['kind']} assets, not {asset.type}")
+        if asset.blob_id is None:
+            raise TranscodeError("Asset media has not been copied into our storage yet")
+        if spec['kind'] == 'video' and self.ffmpeg is None:
+            raise TranscodeError("ffmpeg is not installed")
+        return spec
+
+    def _encode(self, blob, specs: Dict[str, Dict[str, Any]]) -> Dict[str, AssetVariant]:
+        with self._local_copy(blob) as source_path, tempfile.TemporaryDirectory() as workdir:
+            jobs = {}
+            for name, spec in specs.items():
+                output_path = os.path.join(workdir, f"{name}.{'mp4' if spec['kind'] == 'video' else 'jpg'}")
+                if spec['kind'] == 'video':
+                    call = (transcode_video, source_path, output_path, spec, self.ffmpeg, self.ffprobe, self.timeout)
+                else:
+                    call = (transcode_image, source_path, output_path, spec)
+                jobs[name] = (output_path, self.pool.submit(*call) if self.pool else None, call)
+
+            variants = {}
+            for name, (output_path, future, call) in jobs.items():
+                result = future.result() if future else call[0](*call[1:])
+                variants[name] = self._store(blob, name, specs[name], output_path, result)
+            return variants
+
+    def _store(self, blob, name: str, spec: Dict[str, Any], output_path: str, result: Dict[str, Any]) -> AssetVariant:
+        fingerprint = spec_fingerprint(spec)
+        extension = os.path.splitext(output_path)[1]
+        with open(output_path, 'rb') as output:
+            storage_name = self.storage.save(
+                f"{VARIANTS_DIR}/{blob.sha256}/{name}-{fingerprint}{extension}", File(output, name=os.path.basename(output_path))
+            )
+
+        fields = {'spec_hash': fingerprint, 'storage_name': storage_name, **{key: result[key] for key in ('size', 'mime_type', 'width', 'height')}}
+        previous = AssetVariant.objects.filter(blob=blob, spec=name).first()
+        try:
+            with transaction.atomic():
+                variant, _ = AssetVariant.objects.update_or_create(blob=blob, spec=name, defaults=fields)
+        except IntegrityError:
+            # A concurrent publish stored the same variant first
+            self.storage.delete(storage_name)
+            return AssetVariant.objects.get(blob=blob, spec=name)
+        if previous and previous.storage_name != storage_name:
+            self.storage.delete(previous.storage_name)
+        return variant
+
+    @contextmanager
+    def _local_copy(self, blob):
+        """Path to the blob's file, copying it from remote storage if needed"""
+        try:
+            path = self.storage.path(blob.storage_name)
+        except NotImplementedError:
+            path = None
+        if path:
+            yield path
+            return
+
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(blob.storage_name)[1]) as local:
+            with self.storage.open(blob.storage_name, 'rb') as source:
+                shutil.copyfileobj(source, local, 1024 * 1024)
+            local.flush()
+            yield local.name
+
+
+def claim_variant_encode(blob: MediaBlob, spec_count: int) -> bool:
+    """Take the blob's encode lease so one worker encodes its missing variants at a time"""
+    now = timezone.now()
+    lease_end = now + timedelta(seconds=_transcoding_settings().get('FFMPEG_TIMEOUT_SECONDS', 600) * max(1, spec_count))
+    return bool(
+        MediaBlob.objects.filter(pk=blob.pk)
+        .filter(Q(variants_encoding_until__isnull=True) | Q(variants_encoding_until__lt=now))
+        .update(variants_encoding_until=lease_end)
+    )
+
+
+def release_variant_encode(blob: MediaBlob):
+    MediaBlob.objects.filter(pk=blob.pk).update(variants_encoding_until=None)
+
+
+def delete_variants(storage, sha256: str):
+    """Remove every variant file encoded from a blob"""
+    prefix = f"{VARIANTS_DIR}/{sha256}"
+    try:
+        _, files = storage.listdir(prefix)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for name in files:
+        storage.delete(f"{prefix}/{name}")
@@ -0,0 +1,146 @@
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.content_creation.models import GenerationJob
+from apps.content_creation.services.concurrency import run_async
+from apps.content_creation.services.job_events import publish_job_event
+
+logger = logging.getLogger(__name__)
+
+
+def _polling_settings() -> Dict[str, Any]:
+    return settings.CONTENT_GENERATION.get('VIDEO_POLLING', {})
+
+
+def first_poll_delay(estimated_duration: Optional[int]) -> float:
+    """Seconds before the first status check of a freshly submitted render.
+
+    Renders take roughly RENDER_SECONDS_PER_VIDEO_SECOND per second of video
+    (from HeyGen's `_estimate_duration`), so there is no point asking earlier.
+    """
+    config = _polling_settings()
+    expected = (estimated_duration or 30) * config.get('RENDER_SECONDS_PER_VIDEO_SECOND', 2)
+    return min(config.get('MAX_DELAY_SECONDS', 300), max(config.get('MIN_DELAY_SECONDS', 10), expected))
+
+
+def render_seconds(job: GenerationJob) -> float:
+    """Time since the render was submitted; time spent queued or rate-limited doesn't count"""
+    return (timezone.now() - (job.submitted_at or job.created_at)).total_seconds()
+
+
+def next_poll_delay(job: GenerationJob, progress: Optional[float] = None) -> float:
+    """Seconds until the next check of a render that is still in progress.
+
+    With a progress figure the remaining time is extrapolated from the elapsed
+    time; otherwise the delay doubles per attempt from the first-poll delay.
+    """
+    config = _polling_settings()
+    min_delay = config.get('MIN_DELAY_SECONDS', 10)
+    max_delay = config.get('MAX_DELAY_SECONDS', 300)
+
+    if progress and 0 < progress < 100:
+        delay = render_seconds(job) * (100 - progress) / progress
+    else:
+        delay = first_poll_delay(job.parameters.get('estimated_duration')) * 2 ** job.poll_attempts
+    return min(max_delay, max(min_delay, delay))
+
+
+class VideoRenderPoller:
+    """Finalizes provider-side video renders.
+
+    Outstanding renders are `processing` jobs with an `external_id`; each
+    carries its own `next_poll_at`, so one periodic task checks only the due
+    ones, a batch at a time, with the status calls fanned out concurrently.
+    Vendor webhooks finalize renders through `handle_status` as well, making
+    polling the fallback.
+    """
+
+    def __init__(self, service=None):
+        if service is None:
+            from apps.content_creation.services.generation_service import get_generation_service
+            service = get_generation_service()
+        self.service = service
+
+    def poll_due(self, limit: Optional[int] = None) -> int:
+        """Check one batch of due renders; returns how many were checked"""
+        config = _polling_settings()
+        jobs = self._claim_due(limit or config.get('BATCH_SIZE', 200), config.get('LEASE_SECONDS', 120))
+        if not jobs:
+            return 0
+
+        statuses = run_async(self.service.video_provider.acheck_video_statuses([job.external_id for job in jobs]))
+        for job in jobs:
+            status = statuses.get(job.external_id)
+            if isinstance(status, Exception):
+                logger.warning("Status check for render %s failed: %s", job.external_id, status)
+                status = {'status': 'processing'}
+            try:
+                self.handle_status(job, status)
+            except Exception:
+                logger.exception("Could not finalize video job %s", job.id)
+        return len(jobs)
+
+    def handle_status(self, job: GenerationJob, status: Dict[str, Any]) -> bool:
+        """Apply a provider status to a rendering job; returns True once it is final"""
+        state = status.get('status')
+        if state == 'completed':
+            return self._finalize(job, lambda locked: self.service.complete_generation_job(locked, {
+                'file_url': status.get('download_url'),
+                'file_size': status.get('file_size'),
+                'mime_type': 'video/mp4',
+                'metadata': {
+                    'external_video_id': job.external_id,
+                    'thumbnail_url': status.get('thumbnail_url'),
+                    'duration': status.get('duration'),
+                }
+            }))
+        if state == 'failed':
+            error = status.get('error') or 'Video render failed at the provider'
+            return self._finalize(job, lambda locked: self.service._fail_job(locked, error))
+
+        max_render = _polling_settings().get('MAX_RENDER_SECONDS', 3600)
+        if render_seconds(job) > max_render:
+            return self._finalize(job, lambda locked: self.service._fail_job(locked, 'Video render timed out'))
+
+        job.poll_attempts += 1
+        job.next_poll_at = timezone.now() + timedelta(seconds=next_poll_delay(job, status.get('progress')))
+        GenerationJob.objects.filter(pk=job.pk, status='processing').update(
+            poll_attempts=job.poll_attempts, next_poll_at=job.next_poll_at
+        )
+        if status.get('progress') is not None:
+            publish_job_event(job, stage='rendering', progress=status.get('progress'))
+        return False
+
+    def _claim_due(self, limit: int, lease_seconds: int):
+        """Lease due jobs so overlapping poll runs do not check the same renders"""
+        now = timezone.now()
+        with transaction.atomic():
+            jobs = list(
+                GenerationJob.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('workspace')
+                .filter(status='processing', next_poll_at__lte=now)
+                .exclude(external_id='')
+                .order_by('next_poll_at')[:limit]
+            )
+            GenerationJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                next_poll_at=now + timedelta(seconds=lease_seconds)
+            )
+        return jobs
+
+    def _finalize(self, job: GenerationJob, apply) -> bool:
+        """Run `apply` on the job unless the poller or a webhook already finalized it"""
+        with transaction.atomic():
+            locked = (
+                GenerationJob.objects.select_for_update(of=('self',))
+                .select_related('workspace')
+                .filter(pk=job.pk, status='processing')
+                .first()
+            )
+            if locked is None:
+                return False
+            apply(locked)
+            GenerationJob.objects.filter(pk=locked.pk).update(next_poll_at=None)
+        return True
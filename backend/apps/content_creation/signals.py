@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from apps.content_creation.models import ContentAsset
+from apps.content_creation.services.blob_store import release_blob
+
+
+@receiver(post_delete, sender=ContentAsset)
+def release_asset_blob(sender, instance, **kwargs):
+    """Drop the deleted asset's reference to its stored media"""
+    if instance.blob_id:
+        release_blob(instance.blob_id)
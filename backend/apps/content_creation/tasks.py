@@ -0,0 +1,242 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+from kombu.exceptions import OperationalError
+from apps.content_creation.models import ContentAsset, GenerationJob, MediaBlob, ProductCrawl
+from apps.content_creation.services.job_events import publish_job_event
+from apps.content_creation.services.media_ingest import ingest_asset
+from apps.content_creation.services.product_crawler import ProductCrawler
+from apps.content_creation.services.rate_limiter import RateLimitExceeded
+from apps.content_creation.services.renditions import render_asset, should_render
+from apps.content_creation.services.transcoding import (
+    TranscodeError, Transcoder, claim_variant_encode, release_variant_encode
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _load_job(job_id):
+    return GenerationJob.objects.select_related('workspace').filter(pk=job_id).first()
+
+
+def _retry_rate_limited(task, error: RateLimitExceeded, job_ids, **options):
+    """Retry once the provider's window reopens.
+
+    An in-process run (broker down, or eager mode) cannot wait: its retries
+    would run back to back inside the caller. There the jobs left pending by
+    the rate limit are failed instead.
+    """
+    if not task.request.is_eager:
+        raise task.retry(countdown=error.retry_after, **options)
+
+    message = f"Provider {error.provider} is rate limited; try again later"
+    for job in GenerationJob.objects.filter(pk__in=job_ids, status='pending'):
+        job.status = 'failed'
+        job.error_message = message
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'completed_at'])
+        publish_job_event(job)
+
+
+@shared_task(bind=True, name='content_creation.run_text_generation', max_retries=None)
+def run_text_generation(self, job_id):
+    """Execute a text/script generation job on the generation.text queue"""
+    from apps.content_creation.services.generation_service import get_generation_service
+
+    job = _load_job(job_id)
+    if job is None:
+        logger.warning("text generation job %s no longer exists", job_id)
+        return
+    try:
+        get_generation_service().run_text_generation(job)
+    except RateLimitExceeded as e:
+        _retry_rate_limited(self, e, [job_id])
+
+
+@shared_task(bind=True, name='content_creation.run_image_generation', max_retries=None)
+def run_image_generation(self, job_id):
+    """Execute an image generation job on the generation.image queue"""
+    from apps.content_creation.services.generation_service import get_generation_service
+
+    job = _load_job(job_id)
+    if job is None:
+        logger.warning("image generation job %s no longer exists", job_id)
+        return
+    try:
+        get_generation_service().run_image_generation(job)
+    except RateLimitExceeded as e:
+        _retry_rate_limited(self, e, [job_id])
+
+
+@shared_task(bind=True, name='content_creation.run_video_generation', max_retries=None)
+def run_video_generation(self, job_id):
+    """Submit a video generation job to the video provider on the generation.video queue"""
+    from apps.content_creation.services.generation_service import get_generation_service
+
+    job = _load_job(job_id)
+    if job is None:
+        logger.warning("video generation job %s no longer exists", job_id)
+        return
+    try:
+        get_generation_service().run_video_generation(job)
+    except RateLimitExceeded as e:
+        _retry_rate_limited(self, e, [job_id])
+
+
+@shared_task(bind=True, name='content_creation.run_generation_batch', max_retries=None)
+def run_generation_batch(self, job_ids):
+    """Execute a batch of same-queue jobs delivered in a single broker message"""
+    from apps.content_creation.services.generation_service import get_generation_service
+
+    service = get_generation_service()
+    jobs = list(GenerationJob.objects.select_related('workspace').filter(pk__in=job_ids))
+
+    try:
+        video_jobs = [job for job in jobs if job.type == 'video']
+        if video_jobs:
+            service.run_video_generations(video_jobs)
+
+        packed_jobs = [job for job in jobs if job.type == 'text' and job.parameters.get('packed')]
+        if packed_jobs:
+            service.run_packed_text_generations(packed_jobs)
+
+        for job in jobs:
+            if job.type in ('text', 'script') and not job.parameters.get('packed'):
+                service.run_text_generation(job)
+            elif job.type == 'image':
+                service.run_image_generation(job)
+    except RateLimitExceeded as e:
+        # Rate-limited jobs are left pending; retry only those
+        remaining = [str(pk) for pk in GenerationJob.objects.filter(pk__in=job_ids, status='pending').values_list('pk', flat=True)]
+        logger.info("Provider %s rate limited, retrying %s jobs in %.1fs", e.provider, len(remaining), e.retry_after)
+        _retry_rate_limited(self, e, remaining, args=[remaining])
+
+
+@shared_task(name='content_creation.poll_video_renders')
+def poll_video_renders():
+    """Check due provider-side video renders (run periodically by celery beat)"""
+    from apps.content_creation.services.video_poller import VideoRenderPoller
+
+    poller = VideoRenderPoller()
+    batch_size = settings.CONTENT_GENERATION.get('VIDEO_POLLING', {}).get('BATCH_SIZE', 200)
+    checked = 0
+    # Keep draining while batches come back full, up to a bounded number per run
+    for _ in range(settings.CONTENT_GENERATION.get('VIDEO_POLLING', {}).get('MAX_BATCHES_PER_RUN', 10)):
+        count = poller.poll_due(batch_size)
+        checked += count
+        if count < batch_size:
+            break
+    return checked
+
+
+@shared_task(name='content_creation.ingest_asset_media')
+def ingest_asset_media(asset_id):
+    """Copy a generated asset's media from the provider into our storage"""
+
+    asset = ContentAsset.objects.filter(pk=asset_id).first()
+    if asset is None:
+        logger.warning("asset %s no longer exists", asset_id)
+        return
+    if ingest_asset(asset) and should_render(asset):
+        _send(generate_asset_renditions, [str(asset.id)])
+
+
+@shared_task(name='content_creation.generate_asset_renditions')
+def generate_asset_renditions(asset_id):
+    """Build library thumbnails (and video poster/preview) from the stored file"""
+    asset = ContentAsset.objects.select_related('blob').filter(pk=asset_id).first()
+    if asset is None:
+        logger.warning("asset %s no longer exists", asset_id)
+        return
+    render_asset(asset)
+
+
+@shared_task(name='content_creation.encode_asset_variants')
+def encode_asset_variants(asset_id, spec_names):
+    """Encode an asset's missing platform-spec variants; the caller holds the blob's encode lease"""
+    asset = ContentAsset.objects.select_related('blob').filter(pk=asset_id).first()
+    if asset is None or asset.blob is None:
+        logger.warning("asset %s no longer has stored media", asset_id)
+        return
+    blob = asset.blob
+    try:
+        Transcoder().variants(asset, spec_names)
+        errors = {spec: error for spec, error in blob.variant_errors.items() if spec not in spec_names}
+    except TranscodeError as e:
+        logger.warning("encoding %s of asset %s failed: %s", spec_names, asset_id, e)
+        errors = {**blob.variant_errors, **{spec: str(e) for spec in spec_names}}
+    finally:
+        release_variant_encode(blob)
+    MediaBlob.objects.filter(pk=blob.pk).update(variant_errors=errors)
+
+
+def queue_variant_encode(asset: ContentAsset, spec_names) -> bool:
+    """Encode in the background unless an encode of the asset's media is already running"""
+    if not claim_variant_encode(asset.blob, len(spec_names)):
+        return False
+    _send(encode_asset_variants, [str(asset.id), list(spec_names)])
+    return True
+
+
+@shared_task(name='content_creation.crawl_products')
+def crawl_products(crawl_id):
+    """Analyze a bulk crawl's product URLs on the crawling queue"""
+    crawl = ProductCrawl.objects.filter(pk=crawl_id, status__in=['pending', 'running']).first()
+    if crawl is None:
+        logger.warning("product crawl %s no longer pending", crawl_id)
+        return
+    ProductCrawler(crawl).run()
+
+
+def enqueue_product_crawl(crawl: ProductCrawl):
+    _send(crawl_products, [str(crawl.id)])
+
+
+GENERATION_TASKS = {
+    'text': run_text_generation,
+    'script': run_text_generation,
+    'image': run_image_generation,
+    'video': run_video_generation,
+}
+
+GENERATION_QUEUES = {
+    'text': 'generation.text',
+    'script': 'generation.text',
+    'image': 'generation.image',
+    'video': 'generation.video',
+}
+
+
+def enqueue_generation_job(job: GenerationJob):
+    """Send a job to the worker queue for its type.
+
+    Falls back to running the task in-process when the broker is unreachable so
+    local setups without Redis keep working.
+    """
+    task = GENERATION_TASKS.get(job.type)
+    if task is None:
+        raise ValueError(f"No worker task registered for job type '{job.type}'")
+
+    _send(task, [str(job.id)])
+
+
+def enqueue_generation_batch(jobs):
+    """Send many jobs with one broker message per worker queue"""
+    job_ids_by_queue = {}
+    for job in jobs:
+        queue = GENERATION_QUEUES.get(job.type)
+        if queue is None:
+            raise ValueError(f"No worker queue registered for job type '{job.type}'")
+        job_ids_by_queue.setdefault(queue, []).append(str(job.id))
+
+    for queue, job_ids in job_ids_by_queue.items():
+        _send(run_generation_batch, [job_ids], queue=queue)
+
+
+def _send(task, args, **options):
+    try:
+        task.apply_async(args=args, retry=False, **options)
+    except OperationalError as e:
+        logger.warning("Broker unavailable (%s), running %s in-process", e, task.name)
+        task.apply(args=args)
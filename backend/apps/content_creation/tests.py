@@ -1,10 +1,49 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from apps.workspaces.models import Workspace
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+from PIL import Image
+from apps.workspaces.models import Workspace, WorkspaceMember
 from apps.content_creation.models import (
     ContentAsset, ContentTemplate, GenerationJob, 
-    VideoProject, ProductAnalysis
+    VideoProject, ProductAnalysis, ProductCrawl, MediaBlob, AssetVariant
 )
+from apps.content_creation.services.generation_service import GenerationService, get_generation_service
+from apps.content_creation.services.result_cache import GenerationResultCache, generation_cache
+from apps.content_creation.services.providers.openai_provider import OpenAIProvider
+from apps.content_creation.services.provider_router import ProviderRouter, provider_health
+from apps.content_creation.services.rate_limiter import RateLimitExceeded, rate_limiter
+from apps.content_creation.services import job_events
+from apps.content_creation.services.providers.heygen_provider import HeyGenProvider
+from apps.content_creation.services.video_poller import VideoRenderPoller
+from apps.content_creation.services.media_ingest import HashingReader, MediaIngestor, MediaTooLarge, ingest_asset
+from apps.content_creation.services.renditions import render_asset
+from apps.content_creation.services import transcoding
+from apps.content_creation.services.transcoding import TranscodeError, Transcoder
+from apps.content_creation.services.product_analyzer import ProductAnalyzer
+from apps.content_creation.services.product_crawler import ProductCrawler
+from apps.content_creation.tasks import encode_asset_variants
+from apps.content_creation.v1.serializer.content import ContentAssetSerializer
 
 User = get_user_model()
 
@@ -79,4 +118,1550 @@ class ContentCreationModelsTest(TestCase):
         )
         self.assertEqual(analysis.title, 'Test Product')
         self.assertEqual(analysis.price, 99.99)
-        self.assertEqual(analysis.currency, 'SAR')
\ No newline at end of file
+        self.assertEqual(analysis.currency, 'SAR')
+
+# Provider URLs in these tests are placeholders; media ingestion has its own tests
+@override_settings(
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CONTENT_GENERATION={**settings.CONTENT_GENERATION, 'MEDIA_INGEST': {'ENABLED': False}}
+)
+class GenerationDispatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='dispatch@example.com',
+            email='dispatch@example.com',
+            password='testpass123'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Dispatch Workspace',
+            slug='dispatch-workspace',
+            owner=self.user
+        )
+        self.service = GenerationService()
+        generation_cache.clear_local()
+        rate_limiter.reset_local()
+
+    def test_text_job_is_queued_until_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            job = self.service.generate_text(
+                workspace_id=self.workspace.id,
+                user=self.user,
+                type='headline',
+                language='en',
+                variations_count=2
+            )
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(len(job.result_asset.metadata['content']), 2)
+
+    def test_image_job_runs_on_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self.service.generate_image(
+                workspace_id=self.workspace.id,
+                user=self.user,
+                prompt='Perfume bottle on sand',
+                variations_count=2
+            )
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result_asset.type, 'image')
+        self.assertEqual(len(job.result_asset.metadata['images']), 2)
+
+    def test_video_job_records_external_id(self):
+        project = VideoProject.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            name='Dispatch Project',
+            script='Buy our new perfume today'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            job = self.service.generate_video_from_project(project)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'processing')
+        self.assertTrue(job.parameters['external_video_id'].startswith('heygen_video_'))
+
+    def test_repeated_text_request_is_served_from_cache(self):
+        kwargs = dict(type='cta', language='en', product_context='Oud perfume', variations_count=2)
+
+        original = OpenAIProvider.generate_text
+        with mock.patch.object(OpenAIProvider, 'generate_text', autospec=True, side_effect=original) as generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                first = self.service.generate_text(workspace_id=self.workspace.id, user=self.user, **kwargs)
+            with self.captureOnCommitCallbacks(execute=True):
+                second = self.service.generate_text(workspace_id=self.workspace.id, user=self.user, **kwargs)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(generate.call_count, 1)
+        self.assertFalse(first.result_asset.metadata['cache_hit'])
+        self.assertTrue(second.result_asset.metadata['cache_hit'])
+        self.assertNotEqual(first.result_asset_id, second.result_asset_id)
+        self.assertEqual(first.result_asset.metadata['content'], second.result_asset.metadata['content'])
+
+    def test_video_variations_are_submitted_concurrently(self):
+        project = VideoProject.objects.create(
+            workspace=self.workspace,
+            user=self.user,
+            name='Variations Project',
+            script='Discover our Eid collection'
+        )
+        # One dispatch for all variations; job events published by the worker
+        # register their own callbacks, so run the dispatch by hand
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            jobs = self.service.generate_video_variations(project, count=3)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'processing')
+            self.assertIn('external_video_id', job.parameters)
+
+    def test_rate_limited_job_fails_instead_of_retrying_in_process(self):
+        limited = RateLimitExceeded('openai', 30)
+        with mock.patch.object(rate_limiter, 'acquire', side_effect=limited) as acquire:
+            with self.captureOnCommitCallbacks(execute=True):
+                job = self.service.generate_text(
+                    workspace_id=self.workspace.id, user=self.user, type='headline', language='en'
+                )
+
+        job.refresh_from_db()
+        self.assertEqual(acquire.call_count, 1)
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('rate limited', job.error_message)
+
+
+class ProviderHttpClientTest(TestCase):
+    def test_providers_share_one_pooled_session(self):
+        from apps.content_creation.services.generation_service import get_generation_service
+        from apps.content_creation.services.providers.http_client import get_provider_session
+
+        service = get_generation_service()
+        self.assertIs(service, get_generation_service())
+        session = get_provider_session()
+        self.assertIs(service.huggingface_provider.session, session)
+        self.assertIs(service.image_provider.session, session)
+        self.assertEqual(session.default_timeout, (5, 60))
+        self.assertEqual(session.get_adapter('https://router.huggingface.co')._pool_maxsize, 32)
+
+    def test_providers_use_a_new_session_after_fork(self):
+        from apps.content_creation.services.generation_service import get_generation_service
+
+        provider = get_generation_service().huggingface_provider
+        parent_session = provider.session
+
+        with mock.patch('apps.content_creation.services.providers.http_client.os.getpid', return_value=-1):
+            self.assertIsNot(provider.session, parent_session)
+
+
+class ResultCacheTest(TestCase):
+    def test_hits_are_copies(self):
+        cache = GenerationResultCache()
+        result = {'success': True, 'content': ['Eid offer']}
+        cache.set('key', result)
+        result['content'].append('changed after set')
+
+        hit = cache.get('key')
+        hit['metadata'] = {'added': 'by a caller'}
+        hit['content'].append('changed after get')
+
+        self.assertEqual(cache.get('key'), {'success': True, 'content': ['Eid offer']})
+
+
+class ProviderFanOutTest(TestCase):
+    def test_image_variations_run_concurrently(self):
+        import time
+        from apps.content_creation.services.concurrency import run_async
+        from apps.content_creation.services.providers.stability_provider import StabilityProvider
+
+        provider = StabilityProvider()
+        original = provider._generate_single_image
+
+        def slow_single_image(*args):
+            time.sleep(0.2)
+            return original(*args)
+
+        started = time.monotonic()
+        with mock.patch.object(provider, '_generate_single_image', side_effect=slow_single_image):
+            result = run_async(provider.agenerate_image('Desert sunset', variations_count=4))
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(result['success'])
+        self.assertEqual([image['seed'] for image in result['images']], [12345, 12346, 12347, 12348])
+        self.assertLess(elapsed, 0.6)
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class BatchVideoGenerationAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='batch@example.com',
+            email='batch@example.com',
+            password='testpass123'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Batch Workspace',
+            slug='batch-workspace',
+            owner=self.user
+        )
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/generate/batch_video/'
+
+    def test_batch_video_creates_projects_and_jobs_in_bulk(self):
+        items = [{'product_url': f'https://shop.example.com/products/{i}'} for i in range(3)]
+        items.append({'script': 'Ramadan offer on all perfumes', 'language': 'en'})
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(self.url, {'items': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(VideoProject.objects.filter(workspace=self.workspace, status='generating').count(), 4)
+        jobs = GenerationJob.objects.filter(workspace=self.workspace, type='video')
+        self.assertEqual(jobs.count(), 4)
+        self.assertFalse(jobs.exclude(status='processing').exists())
+
+    def test_batch_video_rejects_empty_items(self):
+        response = self.client.post(self.url, {'items': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CompleteGenerationJobTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='complete@example.com',
+            email='complete@example.com',
+            password='testpass123'
+        )
+        self.workspace = Workspace.objects.create(
+            name='Complete Workspace',
+            slug='complete-workspace',
+            owner=self.user
+        )
+        self.service = GenerationService()
+        self.result_data = {'file_url': 'https://example.com/video.mp4', 'mime_type': 'video/mp4'}
+
+    def _in_flight_job(self):
+        project = VideoProject.objects.create(
+            workspace=self.workspace, user=self.user, name='In flight', status='generating'
+        )
+        job = GenerationJob.objects.create(
+            workspace=self.workspace, user=self.user, video_project=project,
+            type='video', provider='heygen', prompt='video', status='processing'
+        )
+        return project, job
+
+    def test_completion_updates_only_the_owning_project(self):
+        other_project, _ = self._in_flight_job()
+        project, job = self._in_flight_job()
+
+        asset = self.service.complete_generation_job(job, self.result_data)
+
+        project.refresh_from_db()
+        other_project.refresh_from_db()
+        self.assertEqual(project.status, 'completed')
+        self.assertEqual(project.generated_video, asset)
+        self.assertEqual(other_project.status, 'generating')
+        self.assertIsNone(other_project.generated_video)
+
+    def test_later_variation_is_added_to_project(self):
+        project, job = self._in_flight_job()
+        variation = GenerationJob.objects.create(
+            workspace=self.workspace, user=self.user, video_project=project,
+            type='video', provider='heygen', prompt='variation', status='processing'
+        )
+
+        first = self.service.complete_generation_job(job, self.result_data)
+        second = self.service.complete_generation_job(variation, self.result_data)
+
+        project.refresh_from_db()
+        self.assertEqual(project.generated_video, first)
+        self.assertEqual(list(project.variations.all()), [second])
+
+    def test_completion_cost_does_not_grow_with_in_flight_projects(self):
+        _, job = self._in_flight_job()
+        with CaptureQueriesContext(connection) as few:
+            self.service.complete_generation_job(job, self.result_data)
+
+        for _ in range(25):
+            self._in_flight_job()
+        _, job = self._in_flight_job()
+        with CaptureQueriesContext(connection) as many:
+            self.service.complete_generation_job(job, self.result_data)
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+    def test_failure_after_asset_creation_fails_job_without_asset(self):
+        project, job = self._in_flight_job()
+
+        with mock.patch.object(self.service, '_attach_video_to_project', side_effect=RuntimeError('project gone')):
+            with self.assertRaises(RuntimeError):
+                self.service.complete_generation_job(job, self.result_data)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_message), ('failed', 'project gone'))
+        self.assertIsNone(job.result_asset)
+        self.assertFalse(ContentAsset.objects.filter(workspace=self.workspace).exists())
+
+
+class ProviderRouterTest(TestCase):
+    class FakeProvider:
+        def __init__(self, success=True):
+            self.success = success
+            self.calls = 0
+
+        def generate_text(self, prompt, **kwargs):
+            self.calls += 1
+            if self.success:
+                return {'success': True, 'content': [prompt]}
+            return {'success': False, 'error': 'upstream 503'}
+
+    def setUp(self):
+        provider_health.reset_local()
+        self.addCleanup(provider_health.reset_local)
+        self.slow = self.FakeProvider(success=False)
+        self.fallback = self.FakeProvider()
+        self.router = ProviderRouter(
+            providers={'huggingface': self.slow, 'openai': self.fallback},
+            order=['huggingface', 'openai']
+        )
+
+    def test_fails_over_to_next_provider(self):
+        result, decision = self.router.call('huggingface', lambda name, p: p.generate_text('hello'))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(decision['provider'], 'openai')
+        self.assertEqual([a['provider'] for a in decision['attempts']], ['huggingface', 'openai'])
+        self.assertEqual(decision['attempts'][0]['error'], 'upstream 503')
+
+    def test_open_circuit_skips_failing_provider(self):
+        for _ in range(5):
+            self.router.call('huggingface', lambda name, p: p.generate_text('hello'))
+        self.assertTrue(provider_health.is_open('huggingface'))
+
+        calls_before = self.slow.calls
+        result, decision = self.router.call('huggingface', lambda name, p: p.generate_text('hello'))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(self.slow.calls, calls_before)
+        self.assertEqual(decision['skipped'], [{'provider': 'huggingface', 'reason': 'circuit_open'}])
+
+    def _service_with_backup(self):
+        service = GenerationService()
+        service.text_router.providers['openai'] = self.fallback
+        service.text_router.order = ['huggingface', 'openai']
+        return service
+
+    def test_placeholder_provider_is_not_a_default_backup(self):
+        user = User.objects.create_user(username='outage@example.com', email='outage@example.com', password='x')
+        workspace = Workspace.objects.create(name='Outage', slug='outage', owner=user)
+        service = GenerationService()
+        generation_cache.clear_local()
+
+        with mock.patch.object(service.huggingface_provider, 'generate_text', return_value={'success': False, 'error': 'timeout'}):
+            with self.captureOnCommitCallbacks(execute=False):
+                job = service.generate_text(
+                    workspace_id=workspace.id, user=user, type='headline', provider='huggingface', language='en'
+                )
+            service.run_text_generation(job)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_message), ('failed', 'timeout'))
+        self.assertIsNone(job.result_asset)
+
+    def test_routing_decision_is_recorded_on_job(self):
+        user = User.objects.create_user(username='router@example.com', email='router@example.com', password='x')
+        workspace = Workspace.objects.create(name='Router', slug='router', owner=user)
+        service = self._service_with_backup()
+        generation_cache.clear_local()
+        failing = {'success': False, 'error': 'timeout'}
+
+        with mock.patch.object(service.huggingface_provider, 'generate_text', return_value=failing):
+            with self.captureOnCommitCallbacks(execute=False):
+                job = service.generate_text(
+                    workspace_id=workspace.id, user=user, type='headline', provider='huggingface', language='en'
+                )
+            service.run_text_generation(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.parameters['routing']['provider'], 'openai')
+        self.assertEqual(job.result_asset.metadata['routing']['requested'], 'huggingface')
+        self.assertEqual(job.result_asset.generated_by, 'openai')
+
+    def test_failed_over_result_is_not_cached_for_requested_provider(self):
+        user = User.objects.create_user(username='cache@example.com', email='cache@example.com', password='x')
+        workspace = Workspace.objects.create(name='Cache', slug='cache', owner=user)
+        service = self._service_with_backup()
+        generation_cache.clear_local()
+        failing = {'success': False, 'error': 'timeout'}
+        recovered = {'success': True, 'content': ['From Hugging Face']}
+
+        with mock.patch.object(service.huggingface_provider, 'generate_text', side_effect=[failing, recovered]):
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=False):
+                    job = service.generate_text(
+                        workspace_id=workspace.id, user=user, type='headline', provider='huggingface', language='en'
+                    )
+                service.run_text_generation(job)
+
+        job.refresh_from_db()
+        self.assertFalse(job.result_asset.metadata['cache_hit'])
+        self.assertEqual(job.result_asset.metadata['content'], ['From Hugging Face'])
+        self.assertEqual(job.result_asset.generated_by, 'huggingface')
+
+
+RATE_LIMITS = {
+    'PROVIDERS': {'openai': {'rate': 10, 'burst': 2}},
+    'WORKSPACE_SHARE': 0.5,
+    'MAX_WAIT_SECONDS': 0,
+}
+
+
+@override_settings(CONTENT_GENERATION={**settings.CONTENT_GENERATION, 'RATE_LIMITS': RATE_LIMITS})
+class RateLimiterTest(TestCase):
+    def setUp(self):
+        rate_limiter.reset_local()
+        self.addCleanup(rate_limiter.reset_local)
+
+    def test_burst_then_rejects_with_retry_after(self):
+        rate_limiter.acquire('openai')
+        rate_limiter.acquire('openai')
+
+        with self.assertRaises(RateLimitExceeded) as ctx:
+            rate_limiter.acquire('openai')
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+    def test_waits_for_refill_within_max_wait(self):
+        rate_limiter.acquire('openai', tokens=2)
+        rate_limiter.acquire('openai', max_wait=1)
+
+    def test_workspace_share_does_not_starve_other_workspaces(self):
+        rate_limiter.acquire('openai', workspace_id='a')
+        with self.assertRaises(RateLimitExceeded):
+            rate_limiter.acquire('openai', workspace_id='a')
+
+        rate_limiter.acquire('openai', workspace_id='b')
+
+    def test_unlimited_provider_is_not_throttled(self):
+        for _ in range(10):
+            rate_limiter.acquire('huggingface')
+
+    def test_rate_limited_job_stays_pending(self):
+        user = User.objects.create_user(username='limited@example.com', email='limited@example.com', password='x')
+        workspace = Workspace.objects.create(name='Limited', slug='limited', owner=user)
+        service = GenerationService()
+        generation_cache.clear_local()
+        rate_limiter.acquire('openai', workspace_id=workspace.id)
+
+        with mock.patch.object(service.text_provider, 'generate_text') as generate_text:
+            with self.captureOnCommitCallbacks(execute=False):
+                job = service.generate_text(
+                    workspace_id=workspace.id, user=user, type='headline', provider='openai', language='en'
+                )
+            with self.assertRaises(RateLimitExceeded):
+                service.run_text_generation(job)
+
+        generate_text.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+
+class JobEventsStreamTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='events@example.com', email='events@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Events', slug='events', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.job = GenerationJob.objects.create(
+            workspace=self.workspace, user=self.user, type='video', provider='heygen', prompt='promo'
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/jobs/events/'
+
+    def test_requires_token(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_rejects_non_members(self):
+        outsider = User.objects.create_user(username='outsider@example.com', email='outsider@example.com', password='x')
+        token = str(RefreshToken.for_user(outsider).access_token)
+        response = self.client.get(self.url, {'token': token})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_active_jobs_then_published_events(self):
+        response = await self.async_client.get(self.url, {'token': self.token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        self.assertEqual(await anext(chunks), b'retry: 3000\n\n')
+        snapshot = await anext(chunks)
+        self.assertIn(str(self.job.id).encode(), snapshot)
+
+        job_events.publish(self.workspace.id, {'job_id': str(self.job.id), 'status': 'completed'})
+        event = await asyncio.wait_for(anext(chunks), timeout=2)
+        self.assertEqual(event, b'event: job\ndata: {"job_id": "%s", "status": "completed"}\n\n' % str(self.job.id).encode())
+
+    def test_status_changes_are_published_after_commit(self):
+        with mock.patch.object(job_events, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                GenerationService()._fail_job(self.job, 'provider down')
+            publish.assert_not_called()
+            callbacks[0]()
+
+        workspace_id, payload = publish.call_args.args
+        self.assertEqual(workspace_id, self.workspace.id)
+        self.assertEqual(payload['status'], 'failed')
+        self.assertEqual(payload['error_message'], 'provider down')
+
+
+class StreamingTextGenerationAPITest(APITestCase):
+    TOKENS = ['1. Eid', ' sale on', ' perfumes\n', '2. Fresh scents', ' for Eid\n', '3. Gift', ' sets']
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stream@example.com', email='stream@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Stream', slug='stream', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/generate/stream_text/'
+        generation_cache.clear_local()
+        rate_limiter.reset_local()
+
+    def _stream_response(self, tokens):
+        lines = [
+            b'data: ' + json.dumps({'choices': [{'delta': {'content': token}}]}).encode()
+            for token in tokens
+        ]
+        response = mock.MagicMock()
+        response.__enter__.return_value = response
+        response.iter_lines.return_value = lines + [b'', b'data: [DONE]']
+        return response
+
+    def _events(self, response):
+        body = b''.join(response.streaming_content).decode()
+        events = []
+        for block in body.strip().split('\n\n'):
+            name, data = block.split('\n', 1)
+            events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+        return events
+
+    def test_streams_variations_and_persists_asset(self):
+        session = get_generation_service().huggingface_provider.session
+        with mock.patch.object(session, 'post', return_value=self._stream_response(self.TOKENS)) as post:
+            response = self.client.post(self.url, {'type': 'headline', 'product_context': 'perfume'}, format='json')
+            events = self._events(response)
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue(post.call_args.kwargs['stream'])
+        self.assertEqual(post.call_args.kwargs['json']['stream'], True)
+
+        variations = [data['text'] for name, data in events if name == 'variation']
+        self.assertEqual(variations, ['1. Eid sale on perfumes', '2. Fresh scents for Eid', '3. Gift sets'])
+        # The first variation is sent before the rest of the completion arrives
+        names = [name for name, _ in events]
+        self.assertLess(names.index('variation'), len(self.TOKENS))
+
+        name, completed = events[-1]
+        self.assertEqual(name, 'completed')
+        job = GenerationJob.objects.get(pk=completed['job_id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result_asset.metadata['content'], variations)
+
+    def test_provider_error_fails_job(self):
+        session = get_generation_service().huggingface_provider.session
+        with mock.patch.object(session, 'post', side_effect=ConnectionError('connection reset')):
+            response = self.client.post(self.url, {'type': 'cta'}, format='json')
+            events = self._events(response)
+
+        name, failed = events[-1]
+        self.assertEqual(name, 'failed')
+        self.assertEqual(GenerationJob.objects.get(pk=failed['job_id']).status, 'failed')
+
+    def test_stream_closed_before_first_event_fails_job(self):
+        events = GenerationService().stream_text(workspace_id=self.workspace.id, user=self.user, type='cta')
+        self.assertEqual(GenerationJob.objects.get(pk=events.job.pk).status, 'processing')
+
+        events.close()
+
+        job = GenerationJob.objects.get(pk=events.job.pk)
+        self.assertEqual((job.status, job.error_message), ('failed', 'Stream closed before completion'))
+
+    def test_disconnect_before_first_event_fails_job(self):
+        response = self.client.post(self.url, {'type': 'cta'}, format='json')
+        response.close()
+
+        self.assertEqual(GenerationJob.objects.get(workspace=self.workspace).status, 'failed')
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+class PackedTextGenerationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='packed@example.com', email='packed@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Packed', slug='packed', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client.force_authenticate(user=self.user)
+        generation_cache.clear_local()
+        rate_limiter.reset_local()
+        provider_health.reset_local()
+
+    def _completion(self, entries):
+        response = mock.MagicMock()
+        response.json.return_value = {
+            'choices': [{'message': {'content': json.dumps({'items': entries})}}]
+        }
+        return response
+
+    def test_packs_products_and_retries_only_unparsed_items(self):
+        products = [f'Oud perfume {i}' for i in range(5)]
+
+        def packed_tasks(payload):
+            return json.loads(payload['messages'][1]['content'].split('Tasks:\n', 1)[1])
+
+        def respond(url, **kwargs):
+            tasks = packed_tasks(kwargs['json'])
+            entries = [
+                {'id': task['id'], 'variations': [f"Headline for {task['prompt'].split('for: ')[-1]}"]}
+                for task in tasks
+            ]
+            if len(tasks) == len(products):
+                # First pass: one item comes back empty, one is missing entirely
+                entries[0]['variations'] = []
+                entries.pop()
+            return self._completion(entries)
+
+        session = get_generation_service().huggingface_provider.session
+        with mock.patch.object(session, 'post', side_effect=respond) as post:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                jobs = GenerationService().generate_text_batch(
+                    workspace_id=self.workspace.id, user=self.user, type='headline',
+                    product_contexts=products, provider='huggingface', language='en'
+                )
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+
+        self.assertEqual(post.call_count, 2)
+        retried = packed_tasks(post.call_args_list[1].kwargs['json'])
+        self.assertEqual({task['id'] for task in retried}, {str(jobs[0].id), str(jobs[-1].id)})
+
+        for job, product in zip(jobs, products):
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'completed')
+            self.assertEqual(job.result_asset.metadata['content'], [f'Headline for {product}'])
+        self.assertEqual(len({job.result_asset_id for job in jobs}), len(products))
+
+    def test_batch_text_endpoint_creates_job_per_product(self):
+        url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/generate/batch_text/'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {'type': 'cta', 'product_contexts': ['Dates box', 'Prayer mat'], 'language': 'en'}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        jobs = GenerationJob.objects.filter(pk__in=response.data['job_ids'])
+        self.assertEqual(set(jobs.values_list('status', flat=True)), {'completed'})
+
+
+class VideoRenderPollerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='poller@example.com', email='poller@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Poller', slug='poller', owner=self.user)
+        self.service = GenerationService()
+        self.poller = VideoRenderPoller(self.service)
+
+    def _rendering_job(self, external_id, due=True):
+        return GenerationJob.objects.create(
+            workspace=self.workspace, user=self.user, type='video', provider='heygen', prompt='promo',
+            status='processing', external_id=external_id, parameters={'estimated_duration': 30},
+            next_poll_at=timezone.now() + timedelta(seconds=-1 if due else 600)
+        )
+
+    def test_submission_schedules_first_poll_from_estimated_duration(self):
+        job = GenerationJob.objects.create(
+            workspace=self.workspace, user=self.user, type='video', provider='heygen', prompt='promo'
+        )
+        self.service.run_video_generations([job])
+
+        job.refresh_from_db()
+        self.assertEqual(job.external_id, job.parameters['external_video_id'])
+        expected = job.parameters['estimated_duration'] * 2
+        self.assertAlmostEqual((job.next_poll_at - timezone.now()).total_seconds(), expected, delta=5)
+        self.assertAlmostEqual((timezone.now() - job.submitted_at).total_seconds(), 0, delta=5)
+
+    @override_settings(CONTENT_GENERATION={
+        **settings.CONTENT_GENERATION,
+        'VIDEO_POLLING': {**settings.CONTENT_GENERATION['VIDEO_POLLING'], 'MAX_RENDER_SECONDS': 600},
+    })
+    def test_render_timeout_counts_from_submission(self):
+        queued_long = self._rendering_job('v-queued')
+        GenerationJob.objects.filter(pk=queued_long.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        queued_long.refresh_from_db()
+        queued_long.submitted_at = timezone.now() - timedelta(seconds=60)
+        stuck = self._rendering_job('v-stuck')
+        stuck.submitted_at = timezone.now() - timedelta(seconds=601)
+
+        self.assertFalse(self.poller.handle_status(queued_long, {'status': 'processing'}))
+        self.assertTrue(self.poller.handle_status(stuck, {'status': 'processing'}))
+
+        queued_long.refresh_from_db()
+        stuck.refresh_from_db()
+        self.assertEqual(queued_long.status, 'processing')
+        self.assertEqual((stuck.status, stuck.error_message), ('failed', 'Video render timed out'))
+
+    def test_poll_finalizes_done_renders_and_backs_off_the_rest(self):
+        done, rendering, not_due = self._rendering_job('v-done'), self._rendering_job('v-busy'), self._rendering_job('v-later', due=False)
+        statuses = {
+            'v-done': {'status': 'completed', 'download_url': 'https://cdn.example.com/v-done.mp4', 'file_size': 1024},
+            'v-busy': {'status': 'processing', 'progress': 50},
+        }
+
+        with mock.patch.object(HeyGenProvider, 'check_video_status', side_effect=lambda video_id: statuses[video_id]) as check:
+            self.assertEqual(self.poller.poll_due(), 2)
+        self.assertEqual(sorted(call.args[0] for call in check.call_args_list), ['v-busy', 'v-done'])
+
+        done.refresh_from_db()
+        self.assertEqual(done.status, 'completed')
+        self.assertEqual(done.result_asset.file_url, 'https://cdn.example.com/v-done.mp4')
+        self.assertIsNone(done.next_poll_at)
+
+        rendering.refresh_from_db()
+        self.assertEqual(rendering.status, 'processing')
+        self.assertEqual(rendering.poll_attempts, 1)
+        self.assertGreater(rendering.next_poll_at, timezone.now())
+
+        not_due.refresh_from_db()
+        self.assertEqual(not_due.poll_attempts, 0)
+
+    @override_settings(HEYGEN_WEBHOOK_SECRET='whsec')
+    def test_signed_webhook_completes_job_once(self):
+        job = self._rendering_job('v-hook', due=False)
+        body = json.dumps({
+            'event_type': 'avatar_video.success',
+            'event_data': {'video_id': 'v-hook', 'url': 'https://cdn.example.com/v-hook.mp4'}
+        }).encode()
+        signature = hmac.new(b'whsec', body, hashlib.sha256).hexdigest()
+        url = '/api/v1/content/webhooks/heygen/'
+
+        response = self.client.post(url, body, content_type='application/json', HTTP_SIGNATURE='bad')
+        self.assertEqual(response.status_code, 401)
+
+        response = self.client.post(url, body, content_type='application/json', HTTP_SIGNATURE=signature)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.result_asset.file_url, 'https://cdn.example.com/v-hook.mp4')
+
+        response = self.client.post(url, body, content_type='application/json', HTTP_SIGNATURE=signature)
+        self.assertEqual(response.json(), {'status': 'ignored'})
+        self.assertEqual(ContentAsset.objects.filter(workspace=self.workspace).count(), 1)
+
+
+class MediaIngestTest(TestCase):
+    """Streams from a local HTTP server into a temporary filesystem storage"""
+
+    PAYLOAD = os.urandom(3 * 1024 * 1024 + 17)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        payload = cls.PAYLOAD
+        cls.requests = requests = []
+        cls.state = state = {'etag': '"render-1"'}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                requests.append(self.path)
+                if self._send_headers():
+                    self.wfile.write(payload)
+
+            def do_HEAD(self):
+                self._send_headers()
+
+            def _send_headers(self):
+                # Two URLs serving the same bytes, as when a provider re-hosts a render
+                if self.path not in ('/render.mp4', '/mirror.mp4'):
+                    self.send_error(404)
+                    return False
+                self.send_response(200)
+                self.send_header('Content-Type', 'video/mp4')
+                self.send_header('Content-Length', str(len(payload)))
+                self.send_header('ETag', state['etag'])
+                self.end_headers()
+                return True
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        storages = {
+            **settings.STORAGES,
+            'generated_media': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': media_root.name, 'base_url': '/media/'},
+            },
+        }
+        overrides = override_settings(STORAGES=storages)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = media_root.name
+
+        self.state['etag'] = '"render-1"'
+        self.user = User.objects.create_user(username='ingest@example.com', email='ingest@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Ingest', slug='ingest', owner=self.user)
+
+    def _asset(self, path):
+        return ContentAsset.objects.create(
+            workspace=self.workspace, type='video', name='Render', file_url=f'{self.base_url}{path}',
+            file_size=15728640, mime_type='video/mp4'
+        )
+
+    def test_streams_media_into_storage_with_size_and_checksum(self):
+        asset = self._asset('/render.mp4')
+
+        self.assertTrue(ingest_asset(asset, MediaIngestor()))
+
+        asset.refresh_from_db()
+        stored = asset.metadata['storage']
+        self.assertEqual(asset.file_url, f"/media/{stored['name']}")
+        self.assertEqual(asset.file_size, len(self.PAYLOAD))
+        self.assertEqual(stored['sha256'], hashlib.sha256(self.PAYLOAD).hexdigest())
+        self.assertEqual(stored['source_url'], f'{self.base_url}/render.mp4')
+        with open(os.path.join(self.media_root, stored['name']), 'rb') as stored_file:
+            self.assertEqual(stored_file.read(), self.PAYLOAD)
+
+    def test_failed_download_keeps_provider_url(self):
+        asset = self._asset('/expired.mp4')
+
+        self.assertFalse(ingest_asset(asset, MediaIngestor()))
+
+        asset.refresh_from_db()
+        self.assertEqual(asset.file_url, f'{self.base_url}/expired.mp4')
+        self.assertIn('404', asset.metadata['ingest_error'])
+
+    def test_identical_media_is_stored_once(self):
+        first, second = self._asset('/render.mp4'), self._asset('/mirror.mp4')
+
+        self.assertTrue(ingest_asset(first, MediaIngestor()))
+        self.assertTrue(ingest_asset(second, MediaIngestor()))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.file_url, second.file_url)
+        self.assertEqual(first.blob.ref_count, 2)
+        stored = [name for _, _, files in os.walk(self.media_root) for name in files]
+        self.assertEqual(len(stored), 1)
+
+    def test_repeated_source_url_skips_download(self):
+        self.assertTrue(ingest_asset(self._asset('/render.mp4'), MediaIngestor()))
+        downloads = len(self.requests)
+
+        again = self._asset('/render.mp4')
+        self.assertTrue(ingest_asset(again, MediaIngestor()))
+
+        self.assertEqual(len(self.requests), downloads)
+        again.refresh_from_db()
+        self.assertEqual(again.blob.ref_count, 2)
+
+    def test_changed_file_behind_same_url_is_downloaded(self):
+        self.assertTrue(ingest_asset(self._asset('/render.mp4'), MediaIngestor()))
+        downloads = len(self.requests)
+
+        # The provider re-rendered under the same URL
+        self.state['etag'] = '"render-2"'
+        self.assertTrue(ingest_asset(self._asset('/render.mp4'), MediaIngestor()))
+
+        self.assertEqual(len(self.requests), downloads + 1)
+
+    def test_unreferenced_blobs_are_collected(self):
+        first, second = self._asset('/render.mp4'), self._asset('/mirror.mp4')
+        ingest_asset(first, MediaIngestor())
+        ingest_asset(second, MediaIngestor())
+        first.refresh_from_db()
+        blob = first.blob
+        path = os.path.join(self.media_root, blob.storage_name)
+
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        call_command('gc_media_blobs', grace_seconds=0, stdout=io.StringIO())
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        call_command('gc_media_blobs', grace_seconds=0, stdout=io.StringIO())
+        self.assertFalse(MediaBlob.objects.filter(pk=blob.pk).exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_reader_enforces_max_bytes_without_buffering(self):
+        reader = HashingReader(iter([b'a' * 10, b'b' * 10]), max_bytes=15)
+        self.assertEqual(reader.read(8), b'a' * 8)
+        self.assertEqual(reader.read(8), b'a' * 2)
+        self.assertEqual(reader.read(8), b'')
+        self.assertIsInstance(reader.error, MediaTooLarge)
+
+    def test_oversized_download_removes_only_its_own_file(self):
+        asset = self._asset('/render.mp4')
+        existing = os.path.join(self.media_root, 'generated', str(self.workspace.id), f'{asset.id}.mp4')
+        os.makedirs(os.path.dirname(existing))
+        with open(existing, 'wb') as f:
+            f.write(b'earlier copy')
+
+        ingest = {**settings.CONTENT_GENERATION['MEDIA_INGEST'], 'MAX_BYTES': 1024}
+        with override_settings(CONTENT_GENERATION={**settings.CONTENT_GENERATION, 'MEDIA_INGEST': ingest}):
+            self.assertFalse(ingest_asset(asset, MediaIngestor()))
+
+        asset.refresh_from_db()
+        self.assertIn('larger than 1024 bytes', asset.metadata['ingest_error'])
+        stored = [name for _, _, files in os.walk(self.media_root) for name in files]
+        self.assertEqual(stored, [f'{asset.id}.mp4'])
+        with open(existing, 'rb') as f:
+            self.assertEqual(f.read(), b'earlier copy')
+
+
+class RenditionTest(TestCase):
+    """Builds renditions from blobs in a temporary filesystem storage"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(STORAGES={
+            **settings.STORAGES,
+            'generated_media': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': media_root.name, 'base_url': '/media/'},
+            },
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.storage = storages['generated_media']
+
+        self.user = User.objects.create_user(username='renditions@example.com', email='renditions@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Renditions', slug='renditions', owner=self.user)
+
+    def _stored_asset(self, asset_type='image', sha256='a' * 64):
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1000), (200, 30, 30)).save(buffer, 'JPEG', quality=95)
+        name = self.storage.save('generated/original.jpg', ContentFile(buffer.getvalue()))
+        blob = MediaBlob.objects.create(sha256=sha256, storage_name=name, size=buffer.tell(), mime_type='image/jpeg', ref_count=1)
+        return ContentAsset.objects.create(
+            workspace=self.workspace, type=asset_type, name='Original', file_url=self.storage.url(name),
+            file_size=blob.size, mime_type='image/jpeg', blob=blob
+        )
+
+    def test_image_gets_webp_thumbnails(self):
+        asset = self._stored_asset()
+
+        self.assertTrue(render_asset(asset))
+
+        asset.refresh_from_db()
+        thumbnails = asset.renditions['thumbnails']
+        self.assertEqual([(t['width'], t['height']) for t in thumbnails], [(256, 128), (640, 320)])
+        for thumbnail in thumbnails:
+            self.assertLess(thumbnail['size'], asset.file_size)
+            with self.storage.open(thumbnail['name']) as stored:
+                self.assertEqual(Image.open(stored).format, 'WEBP')
+        self.assertEqual(ContentAssetSerializer(asset).data['renditions'], asset.renditions)
+
+    def test_assets_sharing_a_blob_reuse_renditions(self):
+        first = self._stored_asset()
+        render_asset(first)
+        second = ContentAsset.objects.create(
+            workspace=self.workspace, type='image', name='Copy', file_url=first.file_url, blob=first.blob
+        )
+
+        with mock.patch.object(Image, 'open') as image_open:
+            self.assertTrue(render_asset(second))
+
+        image_open.assert_not_called()
+        self.assertEqual(
+            [t['url'] for t in second.renditions['thumbnails']], [t['url'] for t in first.renditions['thumbnails']]
+        )
+
+    def test_video_without_ffmpeg_records_error(self):
+        asset = self._stored_asset(asset_type='video')
+        renditions = {**settings.CONTENT_GENERATION['RENDITIONS'], 'FFMPEG_BINARY': 'missing-ffmpeg-binary'}
+
+        with override_settings(CONTENT_GENERATION={**settings.CONTENT_GENERATION, 'RENDITIONS': renditions}):
+            self.assertFalse(render_asset(asset))
+
+        asset.refresh_from_db()
+        self.assertIn('ffmpeg', asset.renditions['error'])
+
+    def test_garbage_collection_removes_renditions(self):
+        asset = self._stored_asset()
+        render_asset(asset)
+        names = [t['name'] for t in asset.renditions['thumbnails']]
+
+        asset.delete()
+        call_command('gc_media_blobs', grace_seconds=0, stdout=io.StringIO())
+
+        self.assertFalse(any(self.storage.exists(name) for name in names))
+
+
+class TranscodingTest(APITestCase):
+    """Encodes image variants with Pillow on the real process pool"""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        overrides = override_settings(STORAGES={
+            **settings.STORAGES,
+            'generated_media': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': media_root.name, 'base_url': '/media/'},
+            },
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.storage = storages['generated_media']
+
+        self.user = User.objects.create_user(username='transcode@example.com', email='transcode@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Transcode', slug='transcode', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+
+        buffer = io.BytesIO()
+        Image.effect_noise((2000, 1000), 64).convert('RGB').save(buffer, 'JPEG', quality=95)
+        name = self.storage.save('generated/original.jpg', ContentFile(buffer.getvalue()))
+        blob = MediaBlob.objects.create(sha256='b' * 64, storage_name=name, size=buffer.tell(), mime_type='image/jpeg', ref_count=1)
+        self.asset = ContentAsset.objects.create(
+            workspace=self.workspace, type='image', name='Original', file_url=self.storage.url(name), blob=blob
+        )
+
+    def test_encodes_each_spec_once(self):
+        variants = Transcoder().variants(self.asset, ['meta_feed_image', 'snapchat_image'])
+
+        self.assertEqual((variants['meta_feed_image'].width, variants['meta_feed_image'].height), (1080, 1080))
+        with self.storage.open(variants['snapchat_image'].storage_name) as stored:
+            self.assertEqual(Image.open(stored).size, (1080, 1920))
+
+        pool = mock.Mock()
+        again = Transcoder(pool=pool).variants(self.asset, ['meta_feed_image', 'snapchat_image'])
+        pool.submit.assert_not_called()
+        self.assertEqual({v.pk for v in again.values()}, {v.pk for v in variants.values()})
+
+    def test_quality_is_lowered_to_fit_size_limit(self):
+        unlimited = Transcoder().variant(self.asset, 'meta_feed_image')
+        spec = {**transcoding.PLATFORM_SPECS['meta_feed_image'], 'max_bytes': unlimited.size // 2}
+
+        with mock.patch.dict(transcoding.PLATFORM_SPECS, {'meta_feed_image': spec}):
+            limited = Transcoder().variant(self.asset, 'meta_feed_image')
+
+        self.assertLessEqual(limited.size, spec['max_bytes'])
+        self.assertEqual(AssetVariant.objects.filter(blob=self.asset.blob).count(), 1)
+        self.assertFalse(self.storage.exists(unlimited.storage_name))
+
+    def test_rejects_spec_for_other_media_type(self):
+        with self.assertRaises(TranscodeError):
+            Transcoder().variant(self.asset, 'tiktok_video')
+
+    def test_variants_endpoint_queues_missing_encodes(self):
+        self.client.force_authenticate(user=self.user)
+        url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/assets/{self.asset.id}/variants/'
+        Transcoder().variant(self.asset, 'meta_feed_image')
+
+        with mock.patch.object(encode_asset_variants, 'apply_async') as send:
+            response = self.client.post(url, {'specs': ['meta_feed_image', 'meta_story_image']}, format='json')
+            # The encode is already queued; polling does not queue it twice
+            self.client.post(url, {'specs': ['meta_story_image']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual([v['spec'] for v in response.data['variants']], ['meta_feed_image'])
+        self.assertEqual((response.data['pending'], response.data['errors']), (['meta_story_image'], {}))
+        send.assert_called_once_with(args=[str(self.asset.id), ['meta_story_image']], retry=False)
+
+        encode_asset_variants(str(self.asset.id), ['meta_story_image'])
+        response = self.client.post(url, {'specs': ['meta_story_image']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['variants'][0]['spec'], 'meta_story_image')
+        self.assertTrue(response.data['variants'][0]['url'].startswith('/media/variants/'))
+
+    def test_encode_errors_are_reported_on_poll(self):
+        self.client.force_authenticate(user=self.user)
+        url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/assets/{self.asset.id}/variants/'
+
+        with mock.patch.object(Transcoder, '_encode', side_effect=TranscodeError('source is corrupt')):
+            with self.settings(CELERY_TASK_ALWAYS_EAGER=True):
+                self.client.post(url, {'specs': ['meta_story_image']}, format='json')
+        with mock.patch.object(encode_asset_variants, 'apply_async'):
+            response = self.client.post(url, {'specs': ['meta_story_image']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['errors'], {'meta_story_image': 'source is corrupt'})
+
+
+class ProductCrawlTest(APITestCase):
+    """Bulk crawl against a local store reachable under two host names"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.state = state = {'active': {}, 'peak': {}, 'flaky': 0}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host = self.headers['Host'].split(':')[0]
+                with lock:
+                    state['active'][host] = state['active'].get(host, 0) + 1
+                    state['peak'][host] = max(state['peak'].get(host, 0), state['active'][host])
+                try:
+                    time.sleep(0.02)
+                    if self.path == '/products/flaky':
+                        state['flaky'] += 1
+                        if state['flaky'] == 1:
+                            self.send_error(503)
+                            return
+                    elif not self.path.startswith('/products/') or self.path == '/products/missing':
+                        self.send_error(404)
+                        return
+                    body = (
+                        f'<html><body><h1>Product {self.path.rsplit("/", 1)[-1]}</h1>'
+                        f'<span class="price">SAR 149.50</span></body></html>'
+                    ).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with lock:
+                        state['active'][host] -= 1
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.port = cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        overrides = override_settings(
+            CONTENT_GENERATION={
+                **settings.CONTENT_GENERATION,
+                'PRODUCT_CRAWL': {
+                    **settings.CONTENT_GENERATION['PRODUCT_CRAWL'],
+                    'GLOBAL_CONCURRENCY': 3,
+                    'PER_DOMAIN_CONCURRENCY': 2,
+                    'DOMAIN_DELAY_SECONDS': 0,
+                    'RETRY_BACKOFF_SECONDS': 0,
+                    'BATCH_SIZE': 7,
+                },
+            },
+            CELERY_TASK_ALWAYS_EAGER=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(username='crawl@example.com', email='crawl@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Crawl', slug='crawl', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/product-crawls/'
+
+    def test_bulk_crawl_upserts_analyses(self):
+        urls = [f'http://{host}:{self.port}/products/{index}' for host in ('127.0.0.1', 'localhost') for index in range(15)]
+        urls += [f'http://127.0.0.1:{self.port}/products/flaky', f'http://127.0.0.1:{self.port}/products/missing']
+        ProductAnalysis.objects.create(workspace=self.workspace, product_url=urls[0], title='Already analyzed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'urls': urls + urls[:3]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        crawl = ProductCrawl.objects.get(pk=response.data['id'])
+        self.assertEqual(
+            (crawl.status, crawl.total, crawl.skipped, crawl.succeeded, crawl.failed),
+            ('completed', 32, 1, 30, 1)
+        )
+        self.assertIn('404', crawl.errors[urls[-1]])
+        self.assertEqual(self.state['flaky'], 2)
+        self.assertEqual(self.state['peak'], {'127.0.0.1': 2, 'localhost': 2})
+
+        analysis = ProductAnalysis.objects.get(workspace=self.workspace, product_url=urls[20])
+        self.assertEqual((analysis.title, float(analysis.price), analysis.crawl_id), ('Product 5', 149.5, crawl.id))
+        self.assertEqual(ProductAnalysis.objects.get(product_url=urls[0]).title, 'Already analyzed')
+
+        listing = self.client.get(f'{self.url}{crawl.id}/analyses/')
+        self.assertEqual(listing.data['count'], 30)
+
+    def test_refresh_overwrites_existing_analysis(self):
+        url = f'http://127.0.0.1:{self.port}/products/7'
+        ProductAnalysis.objects.create(workspace=self.workspace, product_url=url, title='Stale')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'urls': [url], 'refresh': True}, format='json')
+
+        self.assertEqual(ProductAnalysis.objects.filter(workspace=self.workspace).count(), 1)
+        self.assertEqual(ProductAnalysis.objects.get(product_url=url).title, 'Product 7')
+
+
+class StructuredDataTest(TestCase):
+    URL = 'https://store.example.sa/products/oud'
+
+    def test_json_ld_skips_the_dom(self):
+        page = b"""<html><head><script type="application/ld+json">
+        {"@context": "https://schema.org", "@graph": [
+            {"@type": "BreadcrumbList", "name": "Home"},
+            {"@type": "Product", "name": "Royal Oud &amp; Amber", "image": ["/img/oud.jpg", {"url": "https://cdn.example.sa/oud-2.jpg"}],
+             "brand": {"@type": "Brand", "name": "Arabian Oud"}, "sku": "OUD-1",
+             "offers": {"@type": "AggregateOffer", "lowPrice": "1,250.00", "priceCurrency": "sar",
+                        "availability": "https://schema.org/InStock"}}
+        ]}</script></head><body><p>Not the description</p></body></html>"""
+
+        with mock.patch.object(ProductAnalyzer, '_scrape_with_selectors') as scrape:
+            data = ProductAnalyzer().parse_product(page, self.URL)
+
+        scrape.assert_not_called()
+        self.assertEqual(data['source'], 'structured_data')
+        self.assertEqual((data['title'], data['price'], data['currency'], data['brand']), ('Royal Oud & Amber', 1250.0, 'SAR', 'Arabian Oud'))
+        self.assertEqual(data['images'], ['https://store.example.sa/img/oud.jpg', 'https://cdn.example.sa/oud-2.jpg'])
+        self.assertEqual(data['availability'], 'instock')
+
+    def test_microdata_product(self):
+        page = b"""<div itemscope itemtype="https://schema.org/Product">
+            <h1 itemprop="name">Dates Box</h1><img itemprop="image" src="/dates.jpg">
+            <div itemprop="offers" itemscope itemtype="https://schema.org/Offer">
+                <meta itemprop="priceCurrency" content="SAR"><span itemprop="price" content="89.90">89.90 SAR</span>
+            </div></div>"""
+
+        data = ProductAnalyzer().parse_product(page, self.URL)
+
+        self.assertEqual(data['source'], 'structured_data')
+        self.assertEqual((data['title'], data['price'], data['currency']), ('Dates Box', 89.9, 'SAR'))
+        self.assertEqual(data['images'], ['https://store.example.sa/dates.jpg'])
+
+    def test_selectors_fill_missing_fields(self):
+        page = b"""<html><head><meta property="og:title" content="Abaya Classic">
+            <meta property="og:image" content="https://cdn.example.sa/abaya.jpg"></head>
+            <body><h1>Abaya</h1><span class="price">SAR 320</span></body></html>"""
+
+        data = ProductAnalyzer().parse_product(page, self.URL)
+
+        self.assertEqual(data['source'], 'structured_data+selectors')
+        self.assertEqual((data['title'], data['price']), ('Abaya Classic', 320.0))
+        self.assertEqual(data['images'], ['https://cdn.example.sa/abaya.jpg'])
+
+    def test_declared_charset_is_honoured(self):
+        page = (
+            '<html><head><meta charset="windows-1256"><script type="application/ld+json">'
+            '{"@type": "Product", "name": "عطر العود الملكي", "image": "/oud.jpg", "offers": {"price": "450"}}'
+            '</script></head><body><h1>عطر العود الملكي</h1></body></html>'
+        ).encode('windows-1256')
+
+        data = ProductAnalyzer().parse_product(page, self.URL)
+
+        self.assertEqual((data['title'], data['price']), ('عطر العود الملكي', 450.0))
+
+
+class ProductParserTest(TestCase):
+    def test_parsers_agree_on_saved_pages(self):
+        from apps.content_creation.management.commands.benchmark_product_parsing import (
+            FIXTURE_URLS, FIXTURES_DIR, baseline_analyzer
+        )
+
+        fast, soup, baseline = ProductAnalyzer(parser='lxml'), ProductAnalyzer(parser='html.parser'), baseline_analyzer()
+        for platform, url in FIXTURE_URLS.items():
+            with open(os.path.join(FIXTURES_DIR, f'{platform}.html'), 'rb') as f:
+                page = f.read()
+            with self.subTest(platform=platform):
+                data = fast._scrape_with_selectors(page, url)
+                self.assertTrue(data['title'])
+                self.assertIsNotNone(data['price'])
+                self.assertTrue(data['images'])
+                self.assertEqual(data, soup._scrape_with_selectors(page, url))
+                self.assertEqual(data, baseline._scrape_with_selectors(page, url))
+
+    def test_undeclared_charset_is_sniffed(self):
+        page = '<html><body><h1>عود ملكي</h1><span class="price">300 SAR</span></body></html>'.encode('utf-8')
+
+        data = ProductAnalyzer(parser='lxml')._scrape_with_selectors(page, 'https://shop.example.com/p/1')
+
+        self.assertEqual((data['title'], data['price']), ('عود ملكي', 300.0))
+
+
+class StoreCatalogTest(APITestCase):
+    """A Shopify store on localhost and an HTML-only store with a sitemap on 127.0.0.1"""
+
+    PRODUCTS = [
+        {
+            'id': index, 'handle': f'item-{index}', 'title': f'Item {index}', 'body_html': '<p>Soft &amp; light</p>',
+            'vendor': 'Linen Co', 'product_type': 'Shirts', 'tags': ['linen', 'summer'],
+            'variants': [{'sku': f'SKU-{index}', 'price': '120.00', 'available': False}, {'price': '99.50', 'available': True}],
+            'images': [{'src': f'//cdn.example.com/item-{index}.jpg'}],
+        }
+        for index in range(5)
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.requests = requests_seen = []
+        products = cls.PRODUCTS
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host = self.headers['Host'].split(':')[0]
+                port = self.server.server_port
+                path, _, query = self.path.partition('?')
+                requests_seen.append((host, self.path))
+                params = dict(item.split('=') for item in query.split('&') if item)
+                if host == 'localhost' and path == '/products.json':
+                    size, page = int(params['limit']), int(params.get('page', 1))
+                    self._send('application/json', json.dumps({'products': products[(page - 1) * size:page * size]}))
+                elif host == 'localhost' and path.endswith('.json') and path.startswith('/products/'):
+                    handle = path[len('/products/'):-len('.json')]
+                    product = next((item for item in products if item['handle'] == handle), None)
+                    if product is None:
+                        self.send_error(404)
+                    else:
+                        self._send('application/json', json.dumps({'product': {**product, 'tags': 'linen, summer'}}))
+                elif host == '127.0.0.1' and path == '/sitemap.xml':
+                    self._send('application/xml', (
+                        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        f'<sitemap><loc>http://127.0.0.1:{port}/sitemap_pages.xml</loc></sitemap>'
+                        f'<sitemap><loc>http://127.0.0.1:{port}/sitemap_products.xml</loc></sitemap></sitemapindex>'
+                    ))
+                elif host == '127.0.0.1' and path == '/sitemap_products.xml':
+                    locs = ''.join(f'<url><loc>http://127.0.0.1:{port}/oud-{index}/p{index}</loc></url>' for index in range(3))
+                    self._send('application/xml', f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>')
+                elif host == '127.0.0.1' and (path.startswith('/oud-') or (path.startswith('/products/') and not path.endswith('.json'))):
+                    self._send('text/html', f'<html><body><h1>Page {path}</h1><span class="price">SAR 75</span></body></html>')
+                else:
+                    self.send_error(404)
+
+            def _send(self, content_type, body):
+                body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.port = cls.server.server_port
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        overrides = override_settings(
+            CONTENT_GENERATION={
+                **settings.CONTENT_GENERATION,
+                'PRODUCT_CRAWL': {
+                    **settings.CONTENT_GENERATION['PRODUCT_CRAWL'],
+                    'CATALOG_PAGE_SIZE': 2,
+                    'DOMAIN_DELAY_SECONDS': 0,
+                    'RETRY_BACKOFF_SECONDS': 0,
+                },
+            },
+            CELERY_TASK_ALWAYS_EAGER=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.requests.clear()
+        self.user = User.objects.create_user(username='store@example.com', email='store@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Store', slug='store', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/v1/workspaces/{self.workspace.id}/content/v1/product-crawls/'
+
+    def test_store_sync_reads_products_json(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'store_url': f'http://localhost:{self.port}/collections/all'}, format='json')
+
+        crawl = ProductCrawl.objects.get(pk=response.data['id'])
+        self.assertEqual((crawl.status, crawl.total, crawl.succeeded, crawl.failed), ('completed', 5, 5, 0))
+        self.assertEqual(self.requests, [('localhost', f'/products.json?limit=2&page={page}') for page in (1, 2, 3)])
+
+        analysis = ProductAnalysis.objects.get(product_url=f'http://localhost:{self.port}/products/item-3')
+        self.assertEqual(
+            (analysis.title, analysis.description, float(analysis.price), analysis.brand, analysis.category),
+            ('Item 3', 'Soft & light', 99.5, 'Linen Co', 'Shirts')
+        )
+        self.assertEqual(analysis.images, ['http://cdn.example.com/item-3.jpg'])
+        self.assertEqual((analysis.analysis_data['source'], analysis.analysis_data['availability']), ('shopify_api', 'instock'))
+
+    def test_store_without_catalog_api_crawls_sitemap(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'store_url': f'http://127.0.0.1:{self.port}/'}, format='json')
+
+        crawl = ProductCrawl.objects.get(pk=response.data['id'])
+        self.assertEqual((crawl.status, crawl.total, crawl.succeeded), ('completed', 3, 3))
+        self.assertNotIn(('127.0.0.1', '/sitemap_pages.xml'), self.requests)
+        analysis = ProductAnalysis.objects.get(product_url=f'http://127.0.0.1:{self.port}/oud-1/p1')
+        self.assertEqual((analysis.title, float(analysis.price)), ('Page /oud-1/p1', 75.0))
+
+    def test_product_urls_prefer_product_json(self):
+        shopify = [f'http://localhost:{self.port}/products/item-{index}' for index in range(3)]
+        html_store = [f'http://127.0.0.1:{self.port}/products/oud-{index}' for index in range(3)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'urls': shopify + html_store}, format='json')
+
+        self.assertEqual(ProductAnalysis.objects.get(product_url=shopify[1]).analysis_data['source'], 'shopify_api')
+        self.assertEqual(ProductAnalysis.objects.get(product_url=html_store[1]).title, 'Page /products/oud-1')
+        # One probe, confirmed by the catalog endpoint, tells the crawler the HTML store has no product JSON
+        self.assertEqual(
+            [path for host, path in self.requests if host == '127.0.0.1' and '.json' in path],
+            ['/products/oud-0.json', '/products.json?limit=1']
+        )
+        self.assertFalse([path for host, path in self.requests if host == 'localhost' and not path.endswith('.json')])
+
+        data = ProductAnalyzer()._scrape_product_data(shopify[2])
+        self.assertEqual((data['title'], data['tags'], data['sku']), ('Item 2', ['linen', 'summer'], 'SKU-2'))
+
+    def test_missing_product_json_does_not_disable_the_store(self):
+        urls = [f'http://localhost:{self.port}/products/{handle}' for handle in ('gone', 'item-0', 'item-1')]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {'urls': urls}, format='json')
+
+        for url in urls[1:]:
+            self.assertEqual(ProductAnalysis.objects.get(product_url=url).analysis_data['source'], 'shopify_api')
+        self.assertIn(('localhost', '/products.json?limit=1'), self.requests)
+        self.assertIn(('localhost', '/products/item-1.json'), self.requests)
+
+    def test_request_needs_urls_or_store(self):
+        response = self.client.post(self.url, {'urls': ['https://a.example/p/1'], 'store_url': 'https://a.example'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductCacheTest(APITestCase):
+    """Refreshes revalidate with conditional GETs and skip parsing unchanged pages"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.state = state = {'version': 1, 'requests': []}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                state['requests'].append((self.path, self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')))
+                etag = f'"v{state["version"]}"'
+                if self.path.startswith('/etag/') and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                body = f'<html><body><h1>Mug v{state["version"]}</h1><span class="price">SAR 40</span></body></html>'.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                if self.path.startswith('/etag/'):
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', 'Wed, 14 Oct 2026 08:00:00 GMT')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        overrides = override_settings(
+            CONTENT_GENERATION={
+                **settings.CONTENT_GENERATION,
+                'PRODUCT_CRAWL': {**settings.CONTENT_GENERATION['PRODUCT_CRAWL'], 'DOMAIN_DELAY_SECONDS': 0},
+            },
+            CELERY_TASK_ALWAYS_EAGER=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.state.update(version=1, requests=[])
+        self.user = User.objects.create_user(username='cache@example.com', email='cache@example.com', password='x')
+        self.workspace = Workspace.objects.create(name='Cache', slug='cache', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+
+    def _analyze(self, url, **kwargs):
+        analyzer = ProductAnalyzer()
+        with mock.patch.object(analyzer, 'parse_product', wraps=analyzer.parse_product) as parse:
+            analysis = analyzer.analyze_product(str(self.workspace.id), url, **kwargs)
+        return analysis, parse.call_count
+
+    def test_refresh_sends_conditional_get(self):
+        url = f'{self.base}/etag/mug'
+        analysis, parsed = self._analyze(url)
+        self.assertEqual((analysis.title, analysis.etag, parsed), ('Mug v1', '"v1"', 1))
+
+        # Fresh enough: no request at all
+        self._analyze(url, refresh=True, max_age=3600)
+        self.assertEqual(len(self.state['requests']), 1)
+
+        first_fetch = analysis.fetched_at
+        analysis, parsed = self._analyze(url, refresh=True, max_age=0)
+        self.assertEqual(self.state['requests'][-1], ('/etag/mug', '"v1"', 'Wed, 14 Oct 2026 08:00:00 GMT'))
+        self.assertEqual((analysis.title, parsed), ('Mug v1', 0))
+        self.assertGreater(ProductAnalysis.objects.get(pk=analysis.pk).fetched_at, first_fetch)
+
+        self.state['version'] = 2
+        analysis, parsed = self._analyze(url, refresh=True, max_age=0)
+        self.assertEqual((analysis.title, analysis.etag, parsed), ('Mug v2', '"v2"', 1))
+        self.assertEqual(ProductAnalysis.objects.get(pk=analysis.pk).title, 'Mug v2')
+
+    def test_identical_body_is_not_reparsed(self):
+        url = f'{self.base}/plain/mug'
+        self._analyze(url)
+
+        analysis, parsed = self._analyze(url, refresh=True, max_age=0)
+
+        self.assertEqual(self.state['requests'][-1], ('/plain/mug', None, None))
+        self.assertEqual((analysis.title, parsed), ('Mug v1', 0))
+
+    def test_refresh_crawl_counts_unchanged_pages(self):
+        urls = [f'{self.base}/etag/{index}' for index in range(4)] + [f'{self.base}/plain/{index}' for index in range(2)]
+        ProductCrawler(ProductCrawl.objects.create(workspace=self.workspace, urls=urls)).run()
+        self.state['requests'].clear()
+
+        crawl = ProductCrawl.objects.create(workspace=self.workspace, urls=urls, refresh=True)
+        ProductCrawler(crawl).run()
+
+        self.assertEqual((crawl.succeeded, crawl.unchanged, crawl.failed), (6, 6, 0))
+        self.assertEqual(sorted(etag for path, etag, _ in self.state['requests'] if path.startswith('/etag/')), ['"v1"'] * 4)
+        self.assertEqual(ProductAnalysis.objects.filter(crawl=crawl).count(), 6)
+
+        self.state['version'] = 2
+        crawl = ProductCrawl.objects.create(workspace=self.workspace, urls=urls, refresh=True)
+        ProductCrawler(crawl).run()
+
+        self.assertEqual((crawl.succeeded, crawl.unchanged), (6, 0))
+        self.assertEqual(ProductAnalysis.objects.get(product_url=urls[0]).title, 'Mug v2')
@@ -2,8 +2,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from apps.content_creation.v1.views.content import (
     ContentAssetViewSet, ContentTemplateViewSet, GenerationJobViewSet,
-    VideoProjectViewSet, ProductAnalysisViewSet, GenerationAPIViewSet
+    VideoProjectViewSet, ProductAnalysisViewSet, ProductCrawlViewSet, GenerationAPIViewSet
 )
+from apps.content_creation.v1.views.events import job_events
 
 # Create router for viewsets
 router = DefaultRouter()
@@ -12,8 +13,11 @@ router.register(r'templates', ContentTemplateViewSet, basename='content-template
 router.register(r'jobs', GenerationJobViewSet, basename='generation-jobs')
 router.register(r'video-projects', VideoProjectViewSet, basename='video-projects')
 router.register(r'product-analysis', ProductAnalysisViewSet, basename='product-analysis')
+router.register(r'product-crawls', ProductCrawlViewSet, basename='product-crawls')
 router.register(r'generate', GenerationAPIViewSet, basename='generation-api')
 
 urlpatterns = [
+    # Before the router so 'events' is not taken for a job id
+    path('v1/jobs/events/', job_events, name='generation-job-events'),
     path('v1/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,8 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
 from apps.content_creation.models import (
     ContentAsset, ContentTemplate, GenerationJob, 
-    VideoProject, ProductAnalysis
+    VideoProject, ProductAnalysis, ProductCrawl, AssetVariant
 )
+from apps.content_creation.services.transcoding import PLATFORM_SPECS
 
 
 class ContentAssetSerializer(serializers.ModelSerializer):
@@ -10,10 +12,29 @@ class ContentAssetSerializer(serializers.ModelSerializer):
         model = ContentAsset
         fields = [
             'id', 'workspace', 'type', 'name', 'file_url', 'file_size',
-            'mime_type', 'metadata', 'generated_by', 'generation_prompt',
+            'mime_type', 'metadata', 'renditions', 'generated_by', 'generation_prompt',
             'language', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'renditions', 'created_at', 'updated_at']
+
+
+class AssetVariantSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = AssetVariant
+        fields = ['id', 'spec', 'url', 'size', 'mime_type', 'width', 'height', 'created_at']
+        read_only_fields = fields
+    
+    def get_url(self, obj):
+        return self.context['storage'].url(obj.storage_name)
+
+
+class AssetVariantRequestSerializer(serializers.Serializer):
+    specs = serializers.ListField(
+        child=serializers.ChoiceField(choices=sorted(PLATFORM_SPECS)),
+        min_length=1
+    )
 
 
 class ContentTemplateSerializer(serializers.ModelSerializer):
@@ -60,9 +81,40 @@ class ProductAnalysisSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'workspace', 'product_url', 'title', 'description',
             'price', 'currency', 'images', 'features', 'category',
-            'brand', 'analysis_data', 'created_at'
+            'brand', 'analysis_data', 'fetched_at', 'created_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'fetched_at', 'created_at']
+
+
+class ProductCrawlSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductCrawl
+        fields = [
+            'id', 'workspace', 'store_url', 'refresh', 'status', 'total', 'succeeded',
+            'failed', 'skipped', 'unchanged', 'errors', 'error_message', 'created_at',
+            'updated_at', 'started_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+
+class ProductCrawlRequestSerializer(serializers.Serializer):
+    urls = serializers.ListField(
+        child=serializers.URLField(),
+        required=False,
+        min_length=1,
+        max_length=settings.CONTENT_GENERATION.get('PRODUCT_CRAWL', {}).get('MAX_URLS', 10000)
+    )
+    store_url = serializers.URLField(required=False, max_length=500)
+    refresh = serializers.BooleanField(default=False)
+    
+    def validate_urls(self, value):
+        # Keep the order, drop repeats
+        return list(dict.fromkeys(value))
+    
+    def validate(self, data):
+        if bool(data.get('urls')) == bool(data.get('store_url')):
+            raise serializers.ValidationError("Provide either urls or store_url")
+        return data
 
 
 class VideoGenerationRequestSerializer(serializers.Serializer):
@@ -80,6 +132,10 @@ class VideoGenerationRequestSerializer(serializers.Serializer):
         return data
 
 
+class BatchVideoGenerationRequestSerializer(serializers.Serializer):
+    items = VideoGenerationRequestSerializer(many=True, allow_empty=False, max_length=500)
+
+
 class TextGenerationRequestSerializer(serializers.Serializer):
     type = serializers.ChoiceField(choices=[
         ('headline', 'Headline'),
@@ -99,6 +155,13 @@ class TextGenerationRequestSerializer(serializers.Serializer):
     variations_count = serializers.IntegerField(min_value=1, max_value=10, default=3)
 
 
+class BatchTextGenerationRequestSerializer(TextGenerationRequestSerializer):
+    product_context = None
+    product_contexts = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False, max_length=1000
+    )
+
+
 class ImageGenerationRequestSerializer(serializers.Serializer):
     prompt = serializers.CharField(max_length=1000)
     style = serializers.ChoiceField(choices=[
@@ -1,21 +1,28 @@
+import json
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db import models
+from django.db import models, transaction
 from apps.workspaces.permissions.permission import WorkspacePermission
 from apps.content_creation.models import (
     ContentAsset, ContentTemplate, GenerationJob, 
-    VideoProject, ProductAnalysis
+    VideoProject, ProductAnalysis, ProductCrawl
 )
 from apps.content_creation.v1.serializer.content import (
     ContentAssetSerializer, ContentTemplateSerializer, GenerationJobSerializer,
     VideoProjectSerializer, ProductAnalysisSerializer, VideoGenerationRequestSerializer,
-    TextGenerationRequestSerializer, ImageGenerationRequestSerializer
+    TextGenerationRequestSerializer, ImageGenerationRequestSerializer,
+    BatchVideoGenerationRequestSerializer, BatchTextGenerationRequestSerializer,
+    AssetVariantSerializer, AssetVariantRequestSerializer,
+    ProductCrawlSerializer, ProductCrawlRequestSerializer
 )
-from apps.content_creation.services.generation_service import GenerationService
+from apps.content_creation.services.generation_service import get_generation_service
 from apps.content_creation.services.product_analyzer import ProductAnalyzer
+from apps.content_creation.services.transcoding import Transcoder, TranscodeError
+from apps.content_creation.tasks import enqueue_product_crawl, queue_variant_encode
 
 
 class ContentAssetViewSet(viewsets.ModelViewSet):
@@ -29,6 +36,34 @@ class ContentAssetViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         workspace_id = self.kwargs.get('workspace_id')
         serializer.save(workspace_id=workspace_id)
+    
+    @action(detail=True, methods=['post'])
+    def variants(self, request, workspace_id=None, pk=None):
+        """Cached platform-spec variants of the asset; missing ones are encoded in the background.
+        
+        Responds 202 with the specs still pending (and their last encode error,
+        if any) until every requested variant exists; poll again to collect them.
+        """
+        asset = self.get_object()
+        serializer = AssetVariantRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        try:
+            transcoder = Transcoder()
+            variants, missing = transcoder.cached_variants(asset, serializer.validated_data['specs'])
+        except TranscodeError as e:
+            return Response({'error': str(e)}, status=400)
+        
+        data = {'variants': AssetVariantSerializer(variants.values(), many=True, context={'storage': transcoder.storage}).data}
+        if not missing:
+            return Response(data)
+        
+        queue_variant_encode(asset, sorted(missing))
+        errors = asset.blob.variant_errors
+        data['pending'] = sorted(missing)
+        data['errors'] = {spec: errors[spec] for spec in data['pending'] if spec in errors}
+        return Response(data, status=status.HTTP_202_ACCEPTED)
 
 
 class ContentTemplateViewSet(viewsets.ModelViewSet):
@@ -108,7 +143,7 @@ class VideoProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         
         try:
-            generation_service = GenerationService()
+            generation_service = get_generation_service()
             job = generation_service.generate_video_from_project(project)
             
             return Response({
@@ -129,7 +164,7 @@ class VideoProjectViewSet(viewsets.ModelViewSet):
         variations_count = request.data.get('variations_count', 1)
         
         try:
-            generation_service = GenerationService()
+            generation_service = get_generation_service()
             jobs = generation_service.generate_video_variations(project, variations_count)
             
             return Response({
@@ -157,6 +192,40 @@ class ProductAnalysisViewSet(viewsets.ModelViewSet):
         serializer.save(workspace_id=workspace_id)
 
 
+class ProductCrawlViewSet(viewsets.ReadOnlyModelViewSet):
+    """Bulk product analysis: URLs, or a whole store's catalog, are crawled on the crawling queue"""
+    serializer_class = ProductCrawlSerializer
+    permission_classes = [IsAuthenticated, WorkspacePermission]
+    
+    def get_queryset(self):
+        workspace_id = self.kwargs.get('workspace_id')
+        return ProductCrawl.objects.filter(workspace_id=workspace_id).defer('urls')
+    
+    def create(self, request, workspace_id=None):
+        serializer = ProductCrawlRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        with transaction.atomic():
+            crawl = ProductCrawl.objects.create(
+                workspace_id=workspace_id,
+                urls=serializer.validated_data.get('urls', []),
+                store_url=serializer.validated_data.get('store_url'),
+                refresh=serializer.validated_data['refresh'],
+                total=len(serializer.validated_data.get('urls', [])),
+                created_by=request.user
+            )
+            transaction.on_commit(lambda: enqueue_product_crawl(crawl))
+        
+        return Response(ProductCrawlSerializer(crawl).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def analyses(self, request, workspace_id=None, pk=None):
+        """Analyses written by this crawl, paginated"""
+        crawl = self.get_object()
+        page = self.paginate_queryset(crawl.analyses.order_by('product_url'))
+        return self.get_paginated_response(ProductAnalysisSerializer(page, many=True).data)
+
+
 class GenerationAPIViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, WorkspacePermission]
     
@@ -168,7 +237,7 @@ class GenerationAPIViewSet(viewsets.ViewSet):
             return Response(serializer.errors, status=400)
         
         try:
-            generation_service = GenerationService()
+            generation_service = get_generation_service()
             
             # Create video project
             project_data = {
@@ -200,6 +269,34 @@ class GenerationAPIViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def batch_video(self, request, workspace_id=None):
+        """Generate videos for many product URLs/scripts in one request"""
+        serializer = BatchVideoGenerationRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        try:
+            generation_service = get_generation_service()
+            projects, jobs = generation_service.generate_videos_bulk(
+                workspace_id=workspace_id,
+                user=request.user,
+                items=serializer.validated_data['items']
+            )
+            
+            return Response({
+                'project_ids': [project.id for project in projects],
+                'job_ids': [job.id for job in jobs],
+                'count': len(jobs),
+                'message': f'Generating {len(jobs)} videos'
+            })
+            
+        except Exception as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['post'])
     def generate_text(self, request, workspace_id=None):
         """Generate text content (headlines, descriptions, CTAs, scripts)"""
@@ -208,7 +305,7 @@ class GenerationAPIViewSet(viewsets.ViewSet):
             return Response(serializer.errors, status=400)
         
         try:
-            generation_service = GenerationService()
+            generation_service = get_generation_service()
             job = generation_service.generate_text(
                 workspace_id=workspace_id,
                 user=request.user,
@@ -227,6 +324,63 @@ class GenerationAPIViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['post'])
+    def batch_text(self, request, workspace_id=None):
+        """Generate text content for many products in one request"""
+        serializer = BatchTextGenerationRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        try:
+            generation_service = get_generation_service()
+            jobs = generation_service.generate_text_batch(
+                workspace_id=workspace_id,
+                user=request.user,
+                **serializer.validated_data
+            )
+            
+            return Response({
+                'job_ids': [job.id for job in jobs],
+                'count': len(jobs),
+                'message': f'Generating text for {len(jobs)} products'
+            })
+            
+        except Exception as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=False, methods=['post'])
+    def stream_text(self, request, workspace_id=None):
+        """Generate text content, streaming variations as server-sent events"""
+        serializer = TextGenerationRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        
+        try:
+            generation_service = get_generation_service()
+            events = generation_service.stream_text(
+                workspace_id=workspace_id,
+                user=request.user,
+                **serializer.validated_data
+            )
+            
+            # Mapped on the stream itself so the response closes it, failing the job on disconnect
+            response = StreamingHttpResponse(
+                events.map(lambda event: f"event: {event.pop('event')}\ndata: {json.dumps(event)}\n\n"),
+                content_type='text/event-stream'
+            )
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+            
+        except Exception as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['post'])
     def generate_image(self, request, workspace_id=None):
         """Generate images for display ads"""
@@ -235,7 +389,7 @@ class GenerationAPIViewSet(viewsets.ViewSet):
             return Response(serializer.errors, status=400)
         
         try:
-            generation_service = GenerationService()
+            generation_service = get_generation_service()
             job = generation_service.generate_image(
                 workspace_id=workspace_id,
                 user=request.user,
@@ -260,10 +414,17 @@ class GenerationAPIViewSet(viewsets.ViewSet):
         product_url = request.data.get('product_url')
         if not product_url:
             return Response({'error': 'product_url is required'}, status=400)
+        # refresh revalidates an existing analysis older than max_age seconds
+        refresh = str(request.data.get('refresh', '')).lower() in ('1', 'true')
+        max_age = request.data.get('max_age')
+        try:
+            max_age = int(max_age) if max_age not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'max_age must be a number of seconds'}, status=400)
         
         try:
             analyzer = ProductAnalyzer()
-            analysis = analyzer.analyze_product(workspace_id, product_url)
+            analysis = analyzer.analyze_product(workspace_id, product_url, refresh=refresh, max_age=max_age)
             
             serializer = ProductAnalysisSerializer(analysis)
             return Response(serializer.data)
@@ -0,0 +1,72 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from apps.workspaces.models import WorkspaceMember
+from apps.content_creation.models import GenerationJob
+from apps.content_creation.services.job_events import JobEventSubscription, job_event_payload
+
+
+def _format_event(payload) -> str:
+    return f"event: job\ndata: {json.dumps(payload)}\n\n"
+
+
+async def _authenticate(request):
+    """Resolve the JWT from the Authorization header or the `token` query param.
+
+    EventSource cannot send headers, so browsers pass the access token in the URL.
+    """
+    raw_token = request.GET.get('token')
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        raw_token = header.split(' ', 1)[1]
+    if not raw_token:
+        return None
+
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def job_events(request, workspace_id):
+    """Server-sent events stream of generation job status changes in a workspace.
+
+    Starts with the workspace's pending/processing jobs, then pushes every
+    status transition as it is published. Needs an ASGI server.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await _authenticate(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentication credentials were not provided or are invalid'}, status=401)
+    if not await WorkspaceMember.objects.filter(workspace_id=workspace_id, user=user).aexists():
+        return JsonResponse({'error': 'Not a member of this workspace'}, status=403)
+
+    heartbeat = settings.CONTENT_GENERATION.get('JOB_EVENTS_HEARTBEAT_SECONDS', 15)
+
+    async def stream():
+        async with JobEventSubscription(workspace_id) as subscription:
+            yield "retry: 3000\n\n"
+            active_jobs = GenerationJob.objects.filter(
+                workspace_id=workspace_id, status__in=['pending', 'processing']
+            ).order_by('created_at')
+            async for job in active_jobs:
+                yield _format_event(job_event_payload(job))
+
+            while True:
+                event = await subscription.get(timeout=heartbeat)
+                if event is None:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                else:
+                    yield _format_event(event)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,59 @@
+import hashlib
+import hmac
+import json
+import logging
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from apps.content_creation.models import GenerationJob
+from apps.content_creation.services.video_poller import VideoRenderPoller
+
+logger = logging.getLogger(__name__)
+
+HEYGEN_EVENT_STATUSES = {
+    'avatar_video.success': 'completed',
+    'avatar_video.fail': 'failed',
+}
+
+
+def _valid_signature(secret: str, body: bytes, signature: str) -> bool:
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+@csrf_exempt
+@require_POST
+def heygen_webhook(request):
+    """Render completion callback from HeyGen; finalizes the job without waiting for the poller"""
+    secret = getattr(settings, 'HEYGEN_WEBHOOK_SECRET', '')
+    if not secret:
+        return JsonResponse({'error': 'webhook_not_configured'}, status=503)
+    if not _valid_signature(secret, request.body, request.headers.get('Signature', '')):
+        return JsonResponse({'error': 'invalid_signature'}, status=401)
+
+    try:
+        payload = json.loads(request.body)
+        event_type = payload['event_type']
+        event_data = payload.get('event_data') or {}
+        video_id = event_data['video_id']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'invalid_payload'}, status=400)
+
+    state = HEYGEN_EVENT_STATUSES.get(event_type)
+    if state is None:
+        return JsonResponse({'status': 'ignored'})
+
+    job = GenerationJob.objects.select_related('workspace').filter(external_id=video_id, status='processing').first()
+    if job is None:
+        # Unknown render, or already finalized by the poller
+        return JsonResponse({'status': 'ignored'})
+
+    VideoRenderPoller().handle_status(job, {
+        'status': state,
+        'download_url': event_data.get('url'),
+        'thumbnail_url': event_data.get('thumbnail_url'),
+        'duration': event_data.get('duration'),
+        'error': event_data.get('msg'),
+    })
+    return JsonResponse({'status': 'ok'})